@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Compare tokens processed per epoch for fixed, dynamic and bucketed padding.
+"""
+
+import argparse
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.corpus import load_corpus
+from src.data.batching import LengthBucketBatchSampler
+from src.vlm.core.tokenizer import SanskritTokenizer
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark padding strategies")
+    parser.add_argument("--corpus", type=str, default=None, help="Verse file, one per line")
+    parser.add_argument("--batch_size", type=int, default=8, help="Fixed batch size")
+    parser.add_argument("--max_tokens", type=int, default=4096, help="Token budget per batch")
+    parser.add_argument("--max_length", type=int, default=512, help="Maximum sequence length")
+    args = parser.parse_args()
+    
+    # Mix single pādas, full verses and pairs of verses for a realistic spread
+    verses = load_corpus(args.corpus)
+    texts = []
+    for verse in verses:
+        words = verse.split()
+        texts += [" ".join(words[:4]), verse, verse + " " + verse]
+    texts = texts * 50
+    
+    tokenizer = SanskritTokenizer()
+    lengths = tokenizer.batch_encode_fast(
+        texts, max_length=args.max_length)["attention_mask"].sum(axis=1)
+    real = int(lengths.sum())
+    
+    def padded(batches):
+        return sum(int(lengths[b].max()) * len(b) for b in batches)
+    
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(texts))
+    random_batches = [order[i:i + args.batch_size] for i in range(0, len(order), args.batch_size)]
+    bucketed = list(LengthBucketBatchSampler(lengths, batch_size=args.batch_size))
+    budgeted = list(LengthBucketBatchSampler(lengths, max_tokens=args.max_tokens))
+    
+    print(f"Real tokens:             {real:,}")
+    print(f"Pad to max_length:       {len(texts) * args.max_length:,}")
+    print(f"Pad to longest in batch: {padded(random_batches):,}")
+    print(f"Length-bucketed:         {padded(bucketed):,}")
+    print(f"Token budget {args.max_tokens}:       {padded(budgeted):,} "
+          f"in {len(budgeted)} batches")
+
+if __name__ == "__main__":
+    main()
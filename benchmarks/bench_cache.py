@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Benchmark the analysis caches: hit rates and speedup over recomputing every occurrence.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import load_corpus
+from src.utils.cache import cache_stats, clear_caches
+from src.vlm.core.tokenizer import SanskritTokenizer
+from src.vlm.grammar.ashtadhyayi import AshtadhyayiEngine
+
+def timed(fn, items, repeats, reset=None):
+    """Total time of ``repeats`` runs over items, calling ``reset`` before each."""
+    total = 0.0
+    for _ in range(repeats):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        total += time.perf_counter() - start
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis caches")
+    parser.add_argument("--corpus", type=str, default=None, help="Hymn collection, one verse per line")
+    parser.add_argument("--epochs", type=int, default=3, help="Passes over the corpus")
+    parser.add_argument("--repeats", type=int, default=100, help="Cold-cache timing runs")
+    args = parser.parse_args()
+
+    verses = load_corpus(args.corpus) * args.epochs
+    tokenizer = SanskritTokenizer()
+    processor = tokenizer.sandhi_processor
+    engine = AshtadhyayiEngine()
+    print(f"{len(verses) // args.epochs} verses x {args.epochs} epochs")
+
+    cases = [
+        ("sandhi.reverse", verses, processor.automaton.split, processor.reverse),
+        ("tokenizer.tokenize", verses, tokenizer._tokenize_uncached, tokenizer._tokenize),
+        ("ashtadhyayi.analyses", verses, engine._analyze_uncached, engine._analyze_words),
+    ]
+    for name, items, uncached, cached in cases:
+        baseline = timed(uncached, items, args.repeats)
+        with_cache = timed(cached, items, args.repeats, reset=lambda: clear_caches())
+        # Hit rate of a single cold pass
+        clear_caches()
+        for cache in (processor.split_cache, tokenizer.token_cache, engine.analysis_cache):
+            cache.reset_stats()
+        timed(cached, items, 1)
+        stats = cache_stats()[name]
+        print(f"{name:>20}: hit rate {stats.hit_rate:6.1%}, {stats.entries} entries, "
+              f"speedup {baseline / with_cache:.1f}x")
+
+    baseline = timed(lambda v: engine._parse(v, *engine._analyze_uncached(v)), verses, args.repeats)
+    with_cache = timed(engine.parse_sentence, verses, args.repeats, reset=lambda: clear_caches())
+    print(f"{'parse_sentence':>20}: speedup {baseline / with_cache:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Benchmark rule derivations per second with precomputed precedence versus scanning every rule.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_rules import synthetic_rules
+from benchmarks.corpus import load_corpus
+from src.vlm.grammar.ashtadhyayi import AshtadhyayiEngine
+
+def scan_derive(engine, form, max_steps=64):
+    """Derivation that checks every rule at every step and picks the best rank."""
+    fired = set()
+    for _ in range(max_steps):
+        best = None
+        for rule in engine.compiled.rules:
+            if rule.replacement is None or rule.rule_id in fired:
+                continue
+            if best is not None and rule.rank > best[0].rank:
+                continue
+            result = rule.apply(form)
+            if result != form:
+                best = (rule, result)
+        if best is None:
+            break
+        fired.add(best[0].rule_id)
+        form = best[1]
+    return form
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rule derivations")
+    parser.add_argument("--rules", type=int, default=4000, help="Number of synthetic sūtras")
+    parser.add_argument("--words", type=int, default=2000, help="Words derived")
+    parser.add_argument("--scan_words", type=int, default=50, help="Words derived by the scanning baseline")
+    args = parser.parse_args()
+
+    words = [w for line in load_corpus() for w in line.split()]
+    words = (words * (args.words // max(len(words), 1) + 1))[:args.words]
+
+    engine = AshtadhyayiEngine()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ashtadhyayi.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(synthetic_rules(args.rules), f, ensure_ascii=False)
+        engine.load_rules(path)
+
+    # Compile every regex up front so neither side pays for it in the timing
+    for rule in engine.compiled.rules:
+        rule.pattern
+
+    start = time.perf_counter()
+    steps = sum(len(engine.derive(word, trace=True)[1]) for word in words)
+    indexed = time.perf_counter() - start
+    print(f"Precedence index: {len(words) / indexed:,.0f} derivations/sec "
+          f"({steps / len(words):.1f} rules fired per word)")
+
+    sample = words[:args.scan_words]
+    start = time.perf_counter()
+    scanned = [scan_derive(engine, word) for word in sample]
+    scan = time.perf_counter() - start
+    assert scanned == [engine.derive(word) for word in sample]
+    print(f"Scanning all rules: {len(sample) / scan:,.0f} derivations/sec")
+    print(f"Speedup: {(len(words) / indexed) / (len(sample) / scan):.1f}x")
+
+if __name__ == "__main__":
+    main()
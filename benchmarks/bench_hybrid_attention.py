@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Benchmark HybridAttention without a mask, with a dense rule mask and with a BlockMask.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import torch
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.vlm.core.masking import BlockMask
+from src.vlm.reasoning.hybrid_attention import HybridAttention
+
+def timed(fn, repeats):
+    """Mean seconds per call after one warm-up call."""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HybridAttention mask paths")
+    parser.add_argument("--batch_size", type=int, default=8, help="Sequences per batch")
+    parser.add_argument("--length", type=int, default=512, help="Sequence length")
+    parser.add_argument("--dim", type=int, default=256, help="Model width")
+    parser.add_argument("--heads", type=int, default=8, help="Attention heads")
+    parser.add_argument("--block", type=int, nargs=2, default=[8, 48], help="Pāda block length range")
+    parser.add_argument("--repeats", type=int, default=10, help="Timed calls per path")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    rng = random.Random(0)
+    attention = HybridAttention(args.dim, args.heads).eval()
+    x = torch.randn(args.batch_size, args.length, args.dim)
+
+    lengths = []
+    for _ in range(args.batch_size):
+        row, total = [], 0
+        while total < args.length:
+            row.append(min(rng.randint(*args.block), args.length - total))
+            total += row[-1]
+        lengths.append(row)
+    block = BlockMask.from_lengths(lengths, total=args.length)
+    dense = block.to_dense()
+
+    rows = [
+        ("no mask", lambda: attention(x, x, x), 0),
+        ("dense mask", lambda: attention(x, x, x, dense), dense.numel() * dense.element_size()),
+        ("dense (built per call)", lambda: attention(x, x, x, block.to_dense()), dense.numel() * dense.element_size()),
+        ("block mask", lambda: attention(x, x, x, block), block.query_segments.numel() * 8),
+    ]
+    blocks = sum(len(row) for row in lengths)
+    print(f"{args.batch_size} x {args.length} tokens, {blocks} blocks of {args.block[0]}-{args.block[1]} tokens")
+    with torch.no_grad():
+        baseline = None
+        for name, fn, mask_bytes in rows:
+            seconds = timed(fn, args.repeats)
+            baseline = baseline or seconds
+            print(f"{name:>24}: {1000 * seconds:8.2f} ms/forward ({baseline / seconds:4.1f}x vs no mask), "
+                  f"mask {mask_bytes / 1024:8.1f} KiB")
+
+if __name__ == "__main__":
+    main()
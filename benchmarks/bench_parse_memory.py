@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Measure the memory held by a large batch of parses: per-word dicts versus ParsedSentence.
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.vlm.grammar.ashtadhyayi import AshtadhyayiEngine
+
+def dict_parse(engine, text):
+    """The per-word dict parse that ParsedSentence replaces."""
+    analysis = {"sentence": text, "words": []}
+    for word_analysis in engine._analyze_words(text)[1]:
+        entry = {"text": word_analysis.word}
+        if word_analysis.pos is None:
+            entry["pos"] = "unknown"
+        else:
+            for field, value in word_analysis.word_class.attributes.items():
+                if field in engine.PARSE_FIELDS:
+                    entry[field] = value
+        analysis["words"].append(entry)
+    return analysis
+
+def measure(parse, sentences):
+    """Return (retained bytes, peak bytes, seconds) for parsing every sentence."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = [parse(text) for text in sentences]
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return retained, peak, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse result memory")
+    parser.add_argument("--sentences", type=int, default=100_000, help="Sentences parsed")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    stems = ["rāma", "deva", "vana", "sītā", "gaccha", "rakṣa", "agni", "yajña", "soma", "indra"]
+    endings = ["", "ḥ", "m", "ti", "nti", "ām", "ā", "a"]
+    sentences = [" ".join(rng.choice(stems) + rng.choice(endings) for _ in range(rng.randint(3, 12)))
+                 for _ in range(args.sentences)]
+    words = sum(len(s.split()) for s in sentences)
+
+    engine = AshtadhyayiEngine()
+    # Every sentence is analysed afresh, so only the parse results stay alive
+    engine.analysis_cache.resize(maxsize=0)
+
+    rows = [
+        ("dict per word", lambda text: dict_parse(engine, text)),
+        ("ParsedSentence", engine.parse_sentence),
+    ]
+    baseline = None
+    for name, parse in rows:
+        retained, peak, elapsed = measure(parse, sentences)
+        baseline = baseline or retained
+        print(f"{name:>15}: retained {retained / 2**20:7.1f} MiB ({retained / words:5.1f} B/word), "
+              f"peak {peak / 2**20:7.1f} MiB, {args.sentences / elapsed:,.0f} sentences/sec, "
+              f"{baseline / retained:.1f}x smaller")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Benchmark parallel corpus tokenization across worker counts.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import load_corpus
+from src.data.pipeline import tokenize_corpus
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tokenize_corpus scaling")
+    parser.add_argument("--corpus", type=str, default=None, help="Verse file, one per line")
+    parser.add_argument("--verses", type=int, default=400_000, help="Verses in the synthetic corpus")
+    parser.add_argument("--files", type=int, default=8, help="Number of corpus files")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts")
+    args = parser.parse_args()
+    
+    verses = load_corpus(args.corpus, min_lines=args.verses)[:args.verses]
+    per_file = len(verses) // args.files
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, f"part_{i}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(verses[i * per_file:(i + 1) * per_file]) + "\n")
+            paths.append(path)
+        
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            stats = tokenize_corpus(paths, os.path.join(tmp, "ids.txt"),
+                                    num_workers=workers, shard_bytes=1 << 20, progress=None)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            lines = sum(s.lines for s in stats)
+            print(f"{workers} worker(s): {lines / elapsed:,.0f} verses/sec, "
+                  f"speedup {baseline / elapsed:.2f}x over {len(stats)} shards")
+
+if __name__ == "__main__":
+    main()
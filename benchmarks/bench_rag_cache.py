@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Benchmark the RAG generator caches: hit rates and latency of retrieval plus context formatting on a workload of repeated, respelled queries, and context packing from stored token ids against tokenizing retrieved passages per request.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_lexical import make_documents
+from benchmarks.corpus import load_corpus
+from src.vlm.rag.context import Passage, format_passage, pack_context, tokenize_passages
+from src.vlm.rag.generator import RAGGenerator
+from src.vlm.rag.retriever import IndicRetriever
+
+def respell(query, rng):
+    """A variant of the query that normalizes to the same cache key."""
+    variant = rng.integers(4)
+    if variant == 1:
+        return "  " + query.replace(" ", "   ") + " "
+    if variant == 2:
+        return query.upper()
+    if variant == 3:
+        return query + " ।"
+    return query
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the RAG generator caches")
+    parser.add_argument("--corpus", type=str, default=None, help="Text file with one verse per line")
+    parser.add_argument("--num_docs", type=int, default=50000, help="Indexed documents")
+    parser.add_argument("--distinct_queries", type=int, default=500, help="Distinct queries in the workload")
+    parser.add_argument("--requests", type=int, default=3000, help="Requests, drawn Zipf-distributed")
+    parser.add_argument("--num_docs_per_query", type=int, default=5, help="Documents retrieved per request")
+    parser.add_argument("--max_tokens", type=int, default=128, help="Context token budget")
+    args = parser.parse_args()
+
+    documents = make_documents(load_corpus(args.corpus), args.num_docs, args.num_docs * 4, seed=0)
+    retriever = IndicRetriever()
+    retriever.index_documents([{"text": text, "metadata": {"source": "bench", "verse": str(i)}}
+                               for i, text in enumerate(documents)])
+
+    rng = np.random.default_rng(1)
+    pool = [" ".join(documents[i].split()[:3]) for i in rng.choice(args.num_docs, args.distinct_queries)]
+    popularity = 1.0 / np.arange(1, len(pool) + 1)
+    workload = [respell(pool[i], rng)
+                for i in rng.choice(len(pool), args.requests, p=popularity / popularity.sum())]
+
+    for label, size in (("uncached", 0), ("cached", None)):
+        generator = RAGGenerator(None, retriever,
+                                 query_cache_size=size if size is not None else 4096,
+                                 context_cache_size=size if size is not None else 16384)
+        start = time.perf_counter()
+        for query in workload:
+            ids, _ = generator.retrieve(query, num_docs=args.num_docs_per_query)
+            generator.contexts(ids)
+        elapsed = time.perf_counter() - start
+        stats = generator.cache_stats()
+        print(f"{label:>9}: {1000 * elapsed / len(workload):6.2f} ms/request, "
+              f"query hit rate {stats['queries'].hit_rate:6.1%}, "
+              f"context hit rate {stats['contexts'].hit_rate:6.1%}")
+
+    # Packing a context per request, with the retrieval results already cached
+    results = [generator.retrieve(query, num_docs=args.num_docs_per_query)[0] for query in workload]
+    separator = generator.tokenizer.sep_token_id
+    start = time.perf_counter()
+    for ids in results:
+        documents = [retriever.documents[i] for i in ids]
+        passages = [Passage("".join(format_passage(document)), tokens, body_start)
+                    for document, (tokens, body_start) in zip(documents, tokenize_passages(generator.tokenizer, documents))]
+        pack_context(passages, args.max_tokens, separator)
+    tokenizing = time.perf_counter() - start
+    start = time.perf_counter()
+    for ids in results:
+        generator._pack_context(ids, args.max_tokens)
+    stored = time.perf_counter() - start
+    print(f"packing: {1e6 * tokenizing / len(results):7.1f} us/request tokenizing passages, "
+          f"{1e6 * stored / len(results):7.1f} us/request from stored ids")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Benchmark dense retrieval: recall@k of IVF search against exact flat search, queries/sec, index load time, and per-query versus batched retrieval.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import load_corpus
+from src.vlm.rag.embedder import HashingEmbedder
+from src.vlm.rag.index import FlatIndex, IVFIndex, load_index
+from src.vlm.rag.retriever import IndicRetriever
+
+def make_documents(verses, count, seed):
+    """Distinct pseudo-verses mixing the words of the corpus."""
+    words = sorted({word for verse in verses for word in verse.split()})
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(words, size=rng.integers(6, 14))) for _ in range(count)]
+
+def recall(found, exact):
+    """Fraction of the exact top-k ids that were found."""
+    return np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found.tolist(), exact.tolist())])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dense retrieval")
+    parser.add_argument("--corpus", type=str, default=None, help="Text file with one verse per line")
+    parser.add_argument("--num_docs", type=int, default=50000, help="Indexed documents")
+    parser.add_argument("--num_queries", type=int, default=500, help="Search queries")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimension")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--nlist", type=int, default=256, help="IVF clusters")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64], help="IVF clusters scanned")
+    parser.add_argument("--batch_queries", type=int, default=2000, help="Queries for the retriever API comparison")
+    args = parser.parse_args()
+
+    verses = load_corpus(args.corpus)
+    documents = make_documents(verses, args.num_docs, seed=0)
+    embedder = HashingEmbedder(dim=args.dim)
+    start = time.perf_counter()
+    vectors = embedder.embed(documents)
+    print(f"embed {args.num_docs:,} documents: {time.perf_counter() - start:.2f} s")
+    # Queries are partial documents
+    rng = np.random.default_rng(1)
+    queries = embedder.embed([" ".join(documents[i].split()[:4])
+                              for i in rng.choice(args.num_docs, args.num_queries)])
+
+    flat = FlatIndex(args.dim)
+    flat.add(vectors)
+    ivf = IVFIndex(args.dim, nlist=args.nlist)
+    start = time.perf_counter()
+    ivf.add(vectors)
+    print(f"train and fill IVF ({args.nlist} lists): {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    _, exact = flat.search(queries, args.k)
+    elapsed = time.perf_counter() - start
+    print(f"{'index':<16} {'recall@' + str(args.k):>10} {'queries/s':>10}")
+    print(f"{'flat (exact)':<16} {1.0:>10.3f} {args.num_queries / elapsed:>10.0f}")
+    for nprobe in args.nprobe:
+        start = time.perf_counter()
+        _, found = ivf.search(queries, args.k, nprobe=nprobe)
+        elapsed = time.perf_counter() - start
+        print(f"{f'ivf nprobe={nprobe}':<16} {recall(found, exact):>10.3f} {args.num_queries / elapsed:>10.0f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        ivf.save(directory)
+        for label, mmap in (("eager", False), ("mmap", True)):
+            start = time.perf_counter()
+            loaded = load_index(directory, mmap=mmap)
+            load_time = time.perf_counter() - start
+            start = time.perf_counter()
+            loaded.search(queries[:1], args.k)
+            first = time.perf_counter() - start
+            print(f"load ({label}): {1000 * load_time:7.1f} ms, first query {1000 * first:6.1f} ms")
+
+    # Retriever API: a loop of retrieve() calls against one retrieve_batch()
+    retriever = IndicRetriever(embedder=embedder, lexical=False)
+    retriever.index_documents([{"text": text} for text in documents])
+    texts = [" ".join(documents[i].split()[:4]) for i in rng.choice(args.num_docs, args.batch_queries)]
+    start = time.perf_counter()
+    for text in texts:
+        retriever.retrieve(text, k=args.k, mode="dense")
+    loop_time = time.perf_counter() - start
+    for hydrate in (False, True):
+        start = time.perf_counter()
+        retriever.retrieve_batch(texts, k=args.k, mode="dense", hydrate=hydrate)
+        batch_time = time.perf_counter() - start
+        print(f"{args.batch_queries} queries: retrieve loop {args.batch_queries / loop_time:7.0f} q/s, "
+              f"retrieve_batch{' (hydrated)' if hydrate else ''} {args.batch_queries / batch_time:7.0f} q/s "
+              f"({loop_time / batch_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Benchmark loading a large rule file cold (parse + compile) and from its binary cache.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.vlm.grammar.ashtadhyayi import AshtadhyayiEngine
+
+LETTERS = "aāiīuūṛeokgcjṭḍtdnpbmyrlvśṣsh"
+
+def synthetic_rules(num_rules, seed=0):
+    """Build a rule file with ``num_rules`` sūtras in eight adhyāyas."""
+    rng = random.Random(seed)
+    rules = AshtadhyayiEngine().rules
+    for number in range(num_rules):
+        adhyaya = number % 8 + 1
+        suffix = "".join(rng.choice(LETTERS) for _ in range(rng.randint(1, 4)))
+        if number % 50 == 0:
+            spec = {"pattern": f"([{suffix}])([aāiī])", "replacement": r"\1y\2"}
+        else:
+            spec = {"pattern": f"{suffix}$", "replacement": suffix + "ḥ"}
+        spec["id"] = f"{adhyaya}.{number % 4 + 1}.{number // 32 + 1}"
+        rules.setdefault(f"adhyaya_{adhyaya}", {})[f"sutra_{number}"] = spec
+    return {"rules": rules, "meta_rules": AshtadhyayiEngine().meta_rules}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rule file loading")
+    parser.add_argument("--rules", type=int, default=4000, help="Number of synthetic sūtras")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed loads per mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ashtadhyayi.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(synthetic_rules(args.rules), f, ensure_ascii=False)
+        cache_path = os.path.join(tmp, "ashtadhyayi.cache")
+
+        timings = {}
+        for mode, use_cache in (("cold", False), ("cached", True)):
+            engine = AshtadhyayiEngine()
+            engine.load_rules(path, cache_path=cache_path, use_cache=use_cache)
+            best = float("inf")
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                engine.load_rules(path, cache_path=cache_path, use_cache=use_cache)
+                best = min(best, time.perf_counter() - start)
+            timings[mode] = best
+            print(f"{mode:>6}: {best * 1000:.1f} ms for {len(engine.compiled)} rules")
+
+        # What every start used to pay: parse and compile every regex up front
+        engine = AshtadhyayiEngine()
+        start = time.perf_counter()
+        engine.load_rules(path, use_cache=False)
+        re.purge()
+        for rule in engine.compiled.rules:
+            rule.pattern
+        eager = time.perf_counter() - start
+        print(f" eager: {eager * 1000:.1f} ms (parse + compile all regexes)")
+
+        print(f"Cache speedup: {timings['cold'] / timings['cached']:.1f}x over lazy cold, "
+              f"{eager / timings['cached']:.1f}x over eager")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Benchmark sandhi splitting throughput on long, Ṛgveda-length inputs.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import load_corpus
+from src.vlm.grammar.sandhi import SandhiProcessor
+
+def legacy_reverse(processor, combined_text):
+    """Quadratic character-by-character splitter kept for comparison."""
+    result = []
+    current_word = ""
+    for ch in combined_text:
+        current_word += ch
+        for ending in processor.word_endings:
+            if current_word.endswith(ending):
+                for j in range(max(0, len(current_word) - 3), len(current_word)):
+                    substring = current_word[j:]
+                    for result_pattern in processor.rules:
+                        if substring.endswith(result_pattern):
+                            result.append(current_word)
+                            current_word = ""
+                            break
+                if current_word == "":
+                    break
+    if current_word:
+        result.append(current_word)
+    return result or [combined_text]
+
+def throughput(fn, text, repeat):
+    """Return the best characters/sec over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return len(text) / best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sandhi splitting")
+    parser.add_argument("--corpus", type=str, default=None, help="Verse file, one per line")
+    parser.add_argument("--chars", type=int, default=2_000_000, help="Input length in characters")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the automaton")
+    args = parser.parse_args()
+    
+    processor = SandhiProcessor()
+    verses = load_corpus(args.corpus)
+    text = " ".join(verses)
+    while len(text) < args.chars:
+        text = text + " " + text
+    text = text[:args.chars]
+    
+    print(f"Input: {len(text):,} characters")
+    fast = throughput(processor.reverse, text, args.repeat)
+    print(f"Automaton reverse: {fast:,.0f} chars/sec")
+    
+    if not args.skip_legacy:
+        assert processor.reverse(text) == legacy_reverse(processor, text)
+        slow = throughput(lambda t: legacy_reverse(processor, t), text, args.repeat)
+        print(f"Legacy reverse:    {slow:,.0f} chars/sec")
+        print(f"Speedup:           {fast / slow:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Benchmark many concurrent short queries: one generate call per request versus continuous batching.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import torch
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.vlm.core.model import VLMCore, VLMCoreConfig
+from src.vlm.serving.engine import ContinuousBatchingEngine
+
+async def arrivals(requests, rate):
+    """Yield requests with exponential inter-arrival times (all at once when rate is 0)."""
+    rng = random.Random(0)
+    for request in requests:
+        if rate:
+            await asyncio.sleep(rng.expovariate(rate))
+        yield request
+
+async def serve_sequential(model, requests, rate):
+    """One generate call per request, in arrival order."""
+    queue = asyncio.Queue()
+    ttft, tokens = [], 0
+
+    async def produce():
+        async for request in arrivals(requests, rate):
+            await queue.put((time.perf_counter(), request))
+        await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    loop = asyncio.get_running_loop()
+    while (item := await queue.get()) is not None:
+        arrival, (prompt, max_new_tokens) = item
+        sequence = await loop.run_in_executor(None, lambda: model.generate(
+            torch.tensor([prompt]), max_length=max_new_tokens + 1, eos_token_id=-1))
+        # Without streaming the first token arrives with the last one
+        ttft.append(time.perf_counter() - arrival)
+        tokens += sequence.size(1) - 1
+    await producer
+    return tokens, ttft
+
+async def serve_batched(model, requests, rate, max_batch_size):
+    async with ContinuousBatchingEngine(model, max_batch_size=max_batch_size, eos_token_id=-1) as engine:
+        streams = []
+        async for prompt, max_new_tokens in arrivals(requests, rate):
+            streams.append(engine.submit(prompt, max_new_tokens=max_new_tokens))
+        await asyncio.gather(*(stream.result() for stream in streams))
+        summary = engine.metrics.summary()
+    ttft = [stream.metrics.time_to_first_token for stream in streams]
+    return summary["tokens"], ttft, summary
+
+def report(name, tokens, ttft, elapsed):
+    ttft = sorted(ttft)
+    print(f"{name:>20}: {tokens / elapsed:8.1f} tok/s, TTFT mean {1000 * sum(ttft) / len(ttft):7.1f} ms, "
+          f"p95 {1000 * ttft[int(0.95 * (len(ttft) - 1))]:7.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark continuous batching")
+    parser.add_argument("--requests", type=int, default=128, help="Number of queries")
+    parser.add_argument("--rate", type=float, default=0.0, help="Arrivals per second (0: all at once)")
+    parser.add_argument("--max_batch_size", type=int, default=32, help="Rows decoded together")
+    parser.add_argument("--hidden_size", type=int, default=256, help="Model width")
+    parser.add_argument("--layers", type=int, default=4, help="Encoder and decoder layers")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    config = VLMCoreConfig(vocab_size=8000, hidden_size=args.hidden_size, num_hidden_layers=args.layers,
+                           num_attention_heads=args.hidden_size // 64, intermediate_size=4 * args.hidden_size,
+                           max_position_embeddings=128)
+    model = VLMCore(config).eval()
+    rng = random.Random(0)
+    requests = [([rng.randrange(3, config.vocab_size) for _ in range(rng.randint(8, 48))], rng.randint(8, 32))
+                for _ in range(args.requests)]
+
+    start = time.perf_counter()
+    tokens, ttft = asyncio.run(serve_sequential(model, requests, args.rate))
+    report("generate per request", tokens, ttft, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    tokens, ttft, summary = asyncio.run(serve_batched(model, requests, args.rate, args.max_batch_size))
+    report("continuous batching", tokens, ttft, time.perf_counter() - start)
+    print(f"{'':>20}  mean batch {summary['mean_batch_size']:.1f} rows, "
+          f"queue time p95 {1000 * summary['queue_time_p95']:.1f} ms")
+
+if __name__ == "__main__":
+    main()
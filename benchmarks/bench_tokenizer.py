@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""
+Benchmark SanskritTokenizer encoding throughput on a verse corpus.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import load_corpus
+from src.vlm.core.tokenizer import SanskritTokenizer
+
+def timed(fn):
+    """Run ``fn`` once and return (result, seconds)."""
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Sanskrit tokenization")
+    parser.add_argument("--corpus", type=str, default=None, help="Verse file, one per line")
+    parser.add_argument("--verses", type=int, default=20_000, help="Number of verses to encode")
+    parser.add_argument("--max_length", type=int, default=512, help="Maximum sequence length")
+    args = parser.parse_args()
+    
+    tokenizer = SanskritTokenizer()
+    verses = load_corpus(args.corpus, min_lines=args.verses)[:args.verses]
+    print(f"Verses: {len(verses):,}")
+    
+    fast, fast_time = timed(lambda: tokenizer.batch_encode_fast(
+        verses, max_length=args.max_length))
+    print(f"batch_encode_fast: {len(verses) / fast_time:,.0f} verses/sec")
+    
+    slow, slow_time = timed(lambda: tokenizer(
+        verses, max_length=args.max_length, padding=True, truncation=True))
+    print(f"tokenizer(...):    {len(verses) / slow_time:,.0f} verses/sec")
+    print(f"Speedup:           {slow_time / fast_time:.1f}x")
+    
+    assert fast["input_ids"].tolist() == slow["input_ids"]
+    
+    # Sequence length against one token per codepoint
+    phonemes = int(fast["attention_mask"].sum()) - 2 * len(verses)
+    codepoints = sum(len(verse) for verse in verses)
+    print(f"Tokens per verse:  {phonemes / len(verses):.1f} phonemes "
+          f"vs {codepoints / len(verses):.1f} codepoints "
+          f"({100 * (1 - phonemes / codepoints):.1f}% shorter)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Sample Vedic corpus shared by the benchmark scripts.
+"""
+
+from typing import List, Optional
+
+# Ṛgveda 1.1 (the Agni hymn), one pāda-group per line in IAST
+RIGVEDA_1_1 = [
+    "agnim īḷe purohitaṃ yajñasya devam ṛtvijam hotāraṃ ratnadhātamam",
+    "agniḥ pūrvebhir ṛṣibhir īḍyo nūtanair uta sa devāṃ eha vakṣati",
+    "agninā rayim aśnavat poṣam eva dive dive yaśasaṃ vīravattamam",
+    "agne yaṃ yajñam adhvaraṃ viśvataḥ paribhūr asi sa id deveṣu gacchati",
+    "agnir hotā kavikratuḥ satyaś citraśravastamaḥ devo devebhir ā gamat",
+    "yad aṅga dāśuṣe tvam agne bhadraṃ kariṣyasi tavet tat satyam aṅgiraḥ",
+    "upa tvāgne dive dive doṣāvastar dhiyā vayam namo bharanta emasi",
+    "rājantam adhvarāṇāṃ gopām ṛtasya dīdivim vardhamānaṃ sve dame",
+    "sa naḥ piteva sūnave agne sūpāyano bhava sacasvā naḥ svastaye",
+]
+
+
+def load_corpus(path: Optional[str] = None, min_lines: int = 0) -> List[str]:
+    """Load benchmark verses, one per line.
+    
+    Args:
+        path: Optional text file with one verse per line; defaults to Ṛgveda 1.1
+        min_lines: Repeat the verses until at least this many lines are returned
+        
+    Returns:
+        List of verses
+    """
+    if path:
+        with open(path, encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+    else:
+        lines = list(RIGVEDA_1_1)
+    
+    verses = list(lines)
+    while len(verses) < min_lines:
+        verses.extend(lines)
+    return verses
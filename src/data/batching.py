@@ -0,0 +1,153 @@
+from typing import Dict, Iterator, List, Optional, Sequence
+import math
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+
+class DynamicPaddingCollator:
+    """Collate function that pads each batch to its longest item.
+
+    Items are dicts holding at least a 1-D ``input_ids`` tensor (any integer
+    dtype, e.g. the uint16 views of MemmapVedicDataset). ``attention_mask``
+    and ``labels`` are derived when an item does not provide them, and any
+    other 1-D fields (such as ``position_ids``) are padded with zeros.
+
+    Square [L, L] fields, such as the block-diagonal ``attention_mask`` of
+    PackedVedicDataset, are padded to [width, width] with zeros (masked), so
+    packed items go through the same collator.
+    """
+
+    def __init__(self, pad_token_id: int = 0, label_pad_token_id: int = -100,
+                 pad_to_multiple_of: Optional[int] = None):
+        """Initialize the collator.
+
+        Args:
+            pad_token_id: Id used to pad ``input_ids``
+            label_pad_token_id: Id used to pad ``labels`` (ignored by the loss)
+            pad_to_multiple_of: Optionally round the padded length up to a multiple
+        """
+        self.pad_token_id = pad_token_id
+        self.label_pad_token_id = label_pad_token_id
+        self.pad_to_multiple_of = pad_to_multiple_of
+
+    def __call__(self, items: List[Dict[str, torch.Tensor]]) -> Dict[str, torch.Tensor]:
+        """Pad and stack a list of items into a batch."""
+        lengths = [len(item["input_ids"]) for item in items]
+        width = max(lengths, default=0)
+        if self.pad_to_multiple_of:
+            width = math.ceil(width / self.pad_to_multiple_of) * self.pad_to_multiple_of
+
+        pad_values = {
+            "input_ids": self.pad_token_id,
+            "labels": self.label_pad_token_id,
+            "attention_mask": 0,
+        }
+        keys = list(items[0].keys()) if items else ["input_ids"]
+        for key in ("attention_mask", "labels"):
+            if key not in keys:
+                keys.append(key)
+
+        batch = {}
+        for key in keys:
+            if key in items[0] and items[0][key].dim() == 2:
+                out = torch.zeros((len(items), width, width), dtype=items[0][key].dtype)
+                for row, (item, length) in enumerate(zip(items, lengths)):
+                    out[row, :length, :length] = item[key][:length, :length]
+                batch[key] = out
+                continue
+            out = torch.full((len(items), width), pad_values.get(key, 0), dtype=torch.long)
+            for row, (item, length) in enumerate(zip(items, lengths)):
+                if key in item:
+                    out[row, :length] = item[key][:length]
+                elif key == "attention_mask":
+                    out[row, :length] = 1
+                else:
+                    out[row, :length] = item["input_ids"]
+            batch[key] = out
+        return batch
+
+class LengthBucketBatchSampler(Sampler[List[int]]):
+    """Batch sampler that groups items of similar length.
+
+    Indices are shuffled, cut into pools of ``bucket_size`` items, sorted by
+    length inside each pool and then cut into batches, so every batch holds
+    sequences of similar length while the epoch order stays random. Batches
+    either have a fixed ``batch_size`` or are filled up to a ``max_tokens``
+    budget of padded tokens (batch size x longest item).
+    """
+
+    def __init__(self, lengths: Sequence[int], batch_size: Optional[int] = None,
+                 max_tokens: Optional[int] = None, bucket_size: Optional[int] = None,
+                 shuffle: bool = True, drop_last: bool = False, seed: int = 0):
+        """Initialize the sampler.
+
+        Args:
+            lengths: Length of every dataset item
+            batch_size: Maximum number of items per batch
+            max_tokens: Maximum padded tokens per batch
+            bucket_size: Items sorted together; defaults to 100 batches' worth
+            shuffle: Whether to shuffle items and batches every epoch
+            drop_last: Whether to drop a final batch smaller than ``batch_size``
+            seed: Base random seed, combined with the epoch
+        """
+        if batch_size is None and max_tokens is None:
+            raise ValueError("Either batch_size or max_tokens must be set")
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.bucket_size = bucket_size or 100 * (batch_size or 64)
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+        self._batches = None
+
+    def set_epoch(self, epoch: int):
+        """Set the epoch used to seed the shuffle."""
+        if epoch != self.epoch:
+            self.epoch = epoch
+            self._batches = None
+
+    def _build_batches(self) -> List[List[int]]:
+        """Form this epoch's batches."""
+        rng = np.random.default_rng(self.seed + self.epoch)
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+
+        batches = []
+        for start in range(0, len(order), self.bucket_size):
+            pool = order[start:start + self.bucket_size]
+            pool = pool[np.argsort(self.lengths[pool], kind="stable")]
+
+            batch, longest = [], 0
+            for index in pool.tolist():
+                length = int(self.lengths[index])
+                longest_if_added = max(longest, length)
+                full = self.batch_size is not None and len(batch) == self.batch_size
+                over = (self.max_tokens is not None and batch
+                        and longest_if_added * (len(batch) + 1) > self.max_tokens)
+                if full or over:
+                    batches.append(batch)
+                    batch, longest_if_added = [], length
+                batch.append(index)
+                longest = longest_if_added
+            if batch:
+                batches.append(batch)
+
+        if self.drop_last and self.batch_size is not None:
+            batches = [b for b in batches if len(b) == self.batch_size]
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        return batches
+
+    def __iter__(self) -> Iterator[List[int]]:
+        """Yield this epoch's batches and advance to the next epoch."""
+        batches = self._batches if self._batches is not None else self._build_batches()
+        self._batches = None
+        self.epoch += 1
+        return iter(batches)
+
+    def __len__(self) -> int:
+        """Number of batches in the coming epoch."""
+        if self._batches is None:
+            self._batches = self._build_batches()
+        return len(self._batches)
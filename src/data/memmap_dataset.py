@@ -0,0 +1,140 @@
+from typing import Dict, Iterable, Optional, Sequence
+import os
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+# Token ids are stored as uint16, which covers the phonemic vocabulary
+TOKEN_DTYPE = np.uint16
+
+def _paths(prefix: str):
+    """Return the (tokens, offsets) file paths for a compiled dataset."""
+    return prefix + ".bin", prefix + ".idx.npy"
+
+def compile_token_ids(token_ids: Iterable[Sequence[int]], output_prefix: str) -> int:
+    """Write pre-tokenized sequences to the flat binary dataset format.
+
+    The format is one ``<prefix>.bin`` file holding every token id back to back
+    as uint16, and one ``<prefix>.idx.npy`` file with the int64 start offset of
+    each sequence (plus the final end offset).
+
+    Args:
+        token_ids: Iterable of token id sequences, e.g. ``read_token_ids(path)``
+        output_prefix: Path prefix for the output files
+
+    Returns:
+        int: Number of sequences written
+    """
+    tokens_path, offsets_path = _paths(output_prefix)
+    limit = np.iinfo(TOKEN_DTYPE).max
+    offsets = [0]
+
+    with open(tokens_path, "wb") as out:
+        for ids in token_ids:
+            array = np.asarray(ids, dtype=np.int64)
+            if len(array) and (array.min() < 0 or array.max() > limit):
+                raise ValueError(f"Token ids must fit in {np.dtype(TOKEN_DTYPE).name}")
+            out.write(array.astype(TOKEN_DTYPE).tobytes())
+            offsets.append(offsets[-1] + len(array))
+
+    np.save(offsets_path, np.asarray(offsets, dtype=np.int64))
+    return len(offsets) - 1
+
+def compile_vedic_dataset(texts: Iterable[str], tokenizer, output_prefix: str,
+                          batch_size: int = 4096) -> int:
+    """Tokenize texts once and write them to the flat binary dataset format.
+
+    Args:
+        texts: Iterable of text strings from Vedic sources
+        tokenizer: SanskritTokenizer used for encoding
+        output_prefix: Path prefix for the output files
+        batch_size: Texts encoded per ``batch_encode_fast`` call
+
+    Returns:
+        int: Number of sequences written
+    """
+    def encoded():
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) == batch_size:
+                yield from tokenizer.batch_encode_fast(batch, padding=False)["input_ids"]
+                batch = []
+        if batch:
+            yield from tokenizer.batch_encode_fast(batch, padding=False)["input_ids"]
+
+    return compile_token_ids(encoded(), output_prefix)
+
+class MemmapVedicDataset(Dataset):
+    """Dataset over a compiled, memory-mapped token file.
+
+    Items are zero-copy ``torch.from_numpy`` views into the mapped file, so
+    nothing is re-tokenized per epoch and DataLoader workers share the pages
+    through the OS cache. Items are unpadded, variable-length uint16 tensors
+    and are meant to be batched by a padding collate function.
+    """
+
+    def __init__(self, prefix: str, max_length: Optional[int] = 512):
+        """Initialize the dataset.
+
+        Args:
+            prefix: Path prefix passed to the compile step
+            max_length: Maximum sequence length; longer items are truncated
+        """
+        self.prefix = prefix
+        self.max_length = max_length
+        self._tokens = None
+        self._offsets = None
+
+    def _open(self):
+        """Map the files; done lazily so each worker maps its own view."""
+        tokens_path, offsets_path = _paths(self.prefix)
+        self._offsets = np.load(offsets_path, mmap_mode="r")
+        if os.path.getsize(tokens_path):
+            # Copy-on-write mapping: writable for torch, shared until written
+            self._tokens = np.memmap(tokens_path, dtype=TOKEN_DTYPE, mode="c")
+        else:
+            self._tokens = np.zeros(0, dtype=TOKEN_DTYPE)
+
+    def __getstate__(self):
+        """Drop the mappings when pickled to spawned workers."""
+        state = self.__dict__.copy()
+        state["_tokens"] = None
+        state["_offsets"] = None
+        return state
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """Start offset of every sequence, plus the final end offset."""
+        if self._offsets is None:
+            self._open()
+        return self._offsets
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Length of every item after truncation."""
+        lengths = np.diff(self.offsets)
+        if self.max_length is not None:
+            lengths = np.minimum(lengths, self.max_length)
+        return lengths
+
+    def __len__(self) -> int:
+        """Get dataset length."""
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> Dict[str, torch.Tensor]:
+        """Get dataset item.
+
+        Args:
+            idx: Item index
+
+        Returns:
+            Dict with the item's ``input_ids`` as a uint16 view of the file
+        """
+        offsets = self.offsets
+        if idx < 0:
+            idx += len(self)
+        start, end = int(offsets[idx]), int(offsets[idx + 1])
+        if self.max_length is not None:
+            end = min(end, start + self.max_length)
+        return {"input_ids": torch.from_numpy(self._tokens[start:end])}
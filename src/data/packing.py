@@ -0,0 +1,104 @@
+from typing import Dict, List
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from src.vlm.core.masking import block_diagonal_mask
+
+def pack_lengths(lengths, max_length: int) -> List[List[int]]:
+    """Group items into bins of at most ``max_length`` tokens.
+
+    Uses best-fit decreasing: items are placed longest first into the bin with
+    the least remaining room that still fits them. Bins are indexed by their
+    remaining capacity, so each placement costs at most ``max_length`` steps.
+
+    Args:
+        lengths: Length of every item (items longer than ``max_length`` are
+            truncated by the caller and occupy a full bin)
+        max_length: Capacity of a packed sequence
+
+    Returns:
+        List of bins, each a list of item indices
+    """
+    lengths = np.minimum(np.asarray(lengths, dtype=np.int64), max_length)
+    bins: List[List[int]] = []
+    by_room: List[List[int]] = [[] for _ in range(max_length + 1)]
+
+    for index in np.argsort(-lengths, kind="stable").tolist():
+        length = int(lengths[index])
+        for room in range(length, max_length + 1):
+            if by_room[room]:
+                slot = by_room[room].pop()
+                break
+        else:
+            slot = len(bins)
+            bins.append([])
+            room = max_length
+        bins[slot].append(index)
+        by_room[room - length].append(slot)
+
+    return bins
+
+class PackedVedicDataset(Dataset):
+    """Packs several tokenized verses into fixed-length sequences.
+
+    Each source item already ends with ``</s>``, so packed verses stay
+    separated by it. Every packed item carries per-verse ``position_ids``
+    (restarting at 0 for each verse), ``sequence_ids`` (1-based verse number
+    within the pack, 0 for padding) and a block-diagonal ``attention_mask``
+    of shape [L, L], so verses never attend across their boundaries.
+    """
+
+    def __init__(self, dataset: Dataset, max_length: int = 512, pad_token_id: int = 0,
+                 label_pad_token_id: int = -100):
+        """Initialize the packed dataset.
+
+        Args:
+            dataset: Source dataset of unpadded items with ``input_ids`` and a
+                ``lengths`` array (VedicDataset with padding=False or
+                MemmapVedicDataset)
+            max_length: Length of every packed sequence
+            pad_token_id: Id used to pad ``input_ids``
+            label_pad_token_id: Id used to pad ``labels``
+        """
+        self.dataset = dataset
+        self.max_length = max_length
+        self.pad_token_id = pad_token_id
+        self.label_pad_token_id = label_pad_token_id
+        self.bins = pack_lengths(dataset.lengths, max_length)
+
+    def __len__(self) -> int:
+        """Get dataset length."""
+        return len(self.bins)
+
+    def __getitem__(self, idx: int) -> Dict[str, torch.Tensor]:
+        """Get a packed item.
+
+        Args:
+            idx: Item index
+
+        Returns:
+            Dict of tensors for model input
+        """
+        length = self.max_length
+        input_ids = torch.full((length,), self.pad_token_id, dtype=torch.long)
+        position_ids = torch.zeros(length, dtype=torch.long)
+        sequence_ids = torch.zeros(length, dtype=torch.long)
+
+        offset = 0
+        for number, index in enumerate(self.bins[idx], start=1):
+            ids = self.dataset[index]["input_ids"][:length - offset]
+            n = len(ids)
+            input_ids[offset:offset + n] = ids
+            position_ids[offset:offset + n] = torch.arange(n)
+            sequence_ids[offset:offset + n] = number
+            offset += n
+
+        labels = input_ids.masked_fill(sequence_ids == 0, self.label_pad_token_id)
+        return {
+            "input_ids": input_ids,
+            "attention_mask": block_diagonal_mask(sequence_ids),
+            "position_ids": position_ids,
+            "sequence_ids": sequence_ids,
+            "labels": labels,
+        }
@@ -0,0 +1,192 @@
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from src.vlm.core.tokenizer import SanskritTokenizer
+
+# Per-process tokenizer, created once by the pool initializer
+_worker_tokenizer = None
+
+@dataclass
+class ShardStats:
+    """Progress and throughput counters for one tokenized shard."""
+
+    path: str
+    start: int
+    end: int
+    lines: int = 0
+    tokens: int = 0
+    seconds: float = 0.0
+
+    @property
+    def lines_per_second(self) -> float:
+        """Verses tokenized per second."""
+        return self.lines / self.seconds if self.seconds else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        """Tokens produced per second."""
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+def plan_shards(paths: Sequence[str], shard_bytes: int) -> List[Tuple[str, int, int]]:
+    """Split input files into byte ranges of roughly ``shard_bytes``.
+
+    A line belongs to the shard that contains its first byte, so shard edges
+    do not need to be aligned to line boundaries.
+
+    Args:
+        paths: Input text files, one verse per line
+        shard_bytes: Target shard size in bytes
+
+    Returns:
+        List of (path, start, end) byte ranges in corpus order
+    """
+    shards = []
+    for path in paths:
+        size = os.path.getsize(path)
+        start = 0
+        while start < size:
+            end = min(start + shard_bytes, size)
+            shards.append((path, start, end))
+            start = end
+    return shards
+
+def _init_worker():
+    """Give each worker process its own tokenizer and sandhi processor."""
+    global _worker_tokenizer
+    _worker_tokenizer = SanskritTokenizer()
+
+def _read_shard(path: str, start: int, end: int) -> List[str]:
+    """Read the non-empty lines whose first byte lies in [start, end)."""
+    lines = []
+    with open(path, "rb") as f:
+        position = start
+        if start:
+            # Skip the tail of a line owned by the previous shard
+            f.seek(start - 1)
+            position = start - 1 + len(f.readline())
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            text = line.decode("utf-8").strip()
+            if text:
+                lines.append(text)
+    return lines
+
+def _tokenize_shard(task) -> ShardStats:
+    """Tokenize one shard and write its ids to a temporary file."""
+    index, (path, start, end), tmp_path, batch_size = task
+    tokenizer = _worker_tokenizer or SanskritTokenizer()
+
+    started = time.perf_counter()
+    stats = ShardStats(path=path, start=start, end=end)
+    lines = _read_shard(path, start, end)
+
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        for i in range(0, len(lines), batch_size):
+            encoded = tokenizer.batch_encode_fast(lines[i:i + batch_size], padding=False)
+            for ids in encoded["input_ids"]:
+                out.write(" ".join(map(str, ids.tolist())))
+                out.write("\n")
+                stats.tokens += len(ids)
+
+    stats.lines = len(lines)
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+def _print_progress(done: int, total: int, stats: ShardStats):
+    """Default progress reporter."""
+    print(f"[{done}/{total}] {stats.path}[{stats.start}:{stats.end}] "
+          f"{stats.lines} lines, {stats.tokens} tokens, "
+          f"{stats.tokens_per_second:,.0f} tokens/sec")
+
+def tokenize_corpus(
+    paths: Sequence[str],
+    output_path: str,
+    num_workers: Optional[int] = None,
+    shard_bytes: int = 8 * 1024 * 1024,
+    batch_size: int = 1024,
+    progress: Optional[Callable[[int, int, ShardStats], None]] = _print_progress,
+) -> List[ShardStats]:
+    """Tokenize text files in parallel into a single id file.
+
+    Input files are split into byte-range shards that are tokenized by a
+    process pool, each worker holding its own tokenizer. Every shard is written
+    to a temporary file and the shards are concatenated in corpus order, so
+    ``output_path`` has one line of space-separated token ids per non-empty
+    input line, in the original order.
+
+    Args:
+        paths: Input text files, one verse per line
+        output_path: File that receives the token ids
+        num_workers: Worker processes; defaults to the CPU count, and 0 or 1
+            tokenizes in the current process
+        shard_bytes: Target shard size in bytes
+        batch_size: Verses encoded per ``batch_encode_fast`` call
+        progress: Callback ``(shards_done, total_shards, stats)``, or None
+
+    Returns:
+        List of ShardStats in corpus order
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    shards = plan_shards(paths, shard_bytes)
+    # A private directory next to the output, so concurrent runs cannot
+    # clobber or remove each other's shards
+    tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(output_path) + ".shards.",
+                               dir=os.path.dirname(output_path) or ".")
+    tasks = [
+        (i, shard, os.path.join(tmp_dir, f"{i:06d}"), batch_size)
+        for i, shard in enumerate(shards)
+    ]
+
+    results: List[Optional[ShardStats]] = [None] * len(tasks)
+    try:
+        if num_workers <= 1:
+            _init_worker()
+            completed = map(_tokenize_shard, tasks)
+            for done, (task, stats) in enumerate(zip(tasks, completed), start=1):
+                results[task[0]] = stats
+                if progress:
+                    progress(done, len(tasks), stats)
+        else:
+            with multiprocessing.Pool(num_workers, initializer=_init_worker) as pool:
+                indexed = pool.imap_unordered(_indexed_tokenize_shard, tasks)
+                for done, (index, stats) in enumerate(indexed, start=1):
+                    results[index] = stats
+                    if progress:
+                        progress(done, len(tasks), stats)
+
+        # Stitch the shards together in their original order
+        with open(output_path, "wb") as out:
+            for task in tasks:
+                with open(task[2], "rb") as shard_file:
+                    shutil.copyfileobj(shard_file, out)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return results
+
+def _indexed_tokenize_shard(task):
+    """Tokenize a shard and tag the result with its position."""
+    return task[0], _tokenize_shard(task)
+
+def read_token_ids(path: str):
+    """Iterate over the id lists written by :func:`tokenize_corpus`.
+
+    Args:
+        path: Output file of ``tokenize_corpus``
+
+    Yields:
+        List of token ids per verse
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield [int(token) for token in line.split()]
@@ -0,0 +1,133 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+import json
+import os
+import random
+import torch
+from torch.utils.data import IterableDataset, get_worker_info
+
+class StreamingVedicDataset(IterableDataset):
+    """Streaming dataset over sharded Vedic text files on disk.
+
+    Reads ``.txt`` (one verse per line) and ``.jsonl`` (one JSON object with a
+    text field per line) files lazily, shuffles through a bounded buffer and
+    tokenizes on the fly, so memory stays flat regardless of corpus size.
+    Each DataLoader worker reads a disjoint share of the corpus: whole files
+    when there are enough of them, otherwise every n-th line.
+    """
+
+    def __init__(
+        self,
+        data: Union[str, Sequence[str]],
+        tokenizer,
+        max_length: int = 512,
+        shuffle_buffer: int = 10000,
+        seed: int = 0,
+        text_field: str = "text",
+        encode_batch_size: int = 256,
+        extensions: Sequence[str] = (".txt", ".jsonl"),
+    ):
+        """Initialize the dataset.
+
+        Args:
+            data: Directory to scan recursively, or an explicit list of files
+            tokenizer: Tokenizer for processing texts
+            max_length: Maximum sequence length
+            shuffle_buffer: Items held for shuffling; 0 disables shuffling
+            seed: Base random seed, combined with the epoch and worker id
+            text_field: Field holding the text in JSONL records
+            encode_batch_size: Texts encoded per ``batch_encode_fast`` call
+            extensions: File extensions picked up when scanning a directory
+        """
+        if isinstance(data, str):
+            self.files = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(data)
+                for name in names
+                if name.endswith(tuple(extensions))
+            )
+        else:
+            self.files = list(data)
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.text_field = text_field
+        self.encode_batch_size = encode_batch_size
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int):
+        """Set the epoch used to seed the shuffle."""
+        self.epoch = epoch
+
+    def _worker_share(self):
+        """Return (files, line_stride, line_offset) for the current worker."""
+        info = get_worker_info()
+        if info is None or info.num_workers == 1:
+            return self.files, 1, 0
+        if len(self.files) >= info.num_workers:
+            return self.files[info.id::info.num_workers], 1, 0
+        return self.files, info.num_workers, info.id
+
+    def _texts(self, files: List[str], stride: int, offset: int) -> Iterator[str]:
+        """Read the texts of this worker's share, one at a time."""
+        line_number = 0
+        for path in files:
+            is_jsonl = path.endswith(".jsonl")
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    line_number += 1
+                    if (line_number - 1) % stride != offset:
+                        continue
+                    if is_jsonl:
+                        line = json.loads(line).get(self.text_field, "")
+                    if line:
+                        yield line
+
+    def _encoded(self, texts: Iterator[str]) -> Iterator[Dict[str, torch.Tensor]]:
+        """Tokenize texts in small batches and yield unpadded items."""
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) == self.encode_batch_size:
+                yield from self._encode_batch(batch)
+                batch = []
+        if batch:
+            yield from self._encode_batch(batch)
+
+    def _encode_batch(self, batch: List[str]) -> Iterator[Dict[str, torch.Tensor]]:
+        """Encode one batch of texts."""
+        encoded = self.tokenizer.batch_encode_fast(
+            batch, max_length=self.max_length, padding=False, return_tensors="pt"
+        )
+        for input_ids, attention_mask in zip(encoded["input_ids"], encoded["attention_mask"]):
+            yield {
+                "input_ids": input_ids,
+                "attention_mask": attention_mask,
+                "labels": input_ids.clone(),
+            }
+
+    def __iter__(self) -> Iterator[Dict[str, torch.Tensor]]:
+        """Stream this worker's items through the shuffle buffer."""
+        files, stride, offset = self._worker_share()
+        items = self._encoded(self._texts(files, stride, offset))
+        if not self.shuffle_buffer:
+            yield from items
+            return
+
+        info = get_worker_info()
+        worker_id = info.id if info is not None else 0
+        rng = random.Random(self.seed + 1000003 * self.epoch + worker_id)
+
+        buffer = []
+        for item in items:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(item)
+                continue
+            index = rng.randrange(len(buffer))
+            yield buffer[index]
+            buffer[index] = item
+        rng.shuffle(buffer)
+        yield from buffer
@@ -1,4 +1,5 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
+import numpy as np
 import torch
 from torch.utils.data import Dataset
 
@@ -9,18 +10,33 @@ class VedicDataset(Dataset):
     for training the VLM model.
     """
     
-    def __init__(self, texts: List[str], tokenizer, max_length: int = 512):
+    def __init__(self, texts: List[str], tokenizer, max_length: int = 512,
+                 padding: Union[bool, str] = "max_length"):
         """Initialize the dataset.
         
         Args:
             texts: List of text strings from Vedic sources
             tokenizer: Tokenizer for processing texts
             max_length: Maximum sequence length
+            padding: "max_length" pads every item to ``max_length``; False
+                returns unpadded items for a dynamic padding collate function
         """
         self.texts = texts
         self.tokenizer = tokenizer
         self.max_length = max_length
+        self.padding = padding
+        self._lengths = None
         
+    @property
+    def lengths(self) -> np.ndarray:
+        """Token length of every item after truncation, computed once."""
+        if self._lengths is None:
+            # Count ids per text without building a padded [N, max_length] batch;
+            # every item gets <s> and </s> on top of its truncated phonemes
+            _, lengths = self.tokenizer._phoneme_ids(self.texts)
+            self._lengths = np.minimum(lengths, max(self.max_length - 2, 0)) + 2
+        return self._lengths
+    
     def __len__(self) -> int:
         """Get dataset length."""
         return len(self.texts)
@@ -39,7 +55,7 @@ class VedicDataset(Dataset):
         # Tokenize the text
         encodings = self.tokenizer(text, 
                                   max_length=self.max_length,
-                                  padding="max_length",
+                                  padding=self.padding,
                                   truncation=True,
                                   return_tensors="pt")
         
@@ -56,7 +56,7 @@ def test_sentence_parsing():
     ]
     
     for sentence in test_sentences:
-        analysis = engine.parse_sentence(sentence)
+        analysis = engine.parse_sentence(sentence).to_dict()
         print(f"Sentence: {sentence}")
         print("Analysis:")
         for i, word_analysis in enumerate(analysis["words"]):
@@ -7,6 +7,8 @@ from transformers import AdamW, get_linear_schedule_with_warmup
 from vlm.core.model import VLMCore
 from vlm.core.tokenizer import SanskritTokenizer
 from data.vedic_dataset import VedicDataset
+from data.batching import DynamicPaddingCollator, LengthBucketBatchSampler
+from data.streaming import StreamingVedicDataset
 from data.processor import VedicTextProcessor
 from utils.config import VLMConfig
 
@@ -28,21 +30,55 @@ def parse_args():
     parser.add_argument(
         "--epochs", type=int, default=3, help="Number of training epochs"
     )
+    parser.add_argument(
+        "--num_workers", type=int, default=0, help="DataLoader worker processes"
+    )
+    parser.add_argument(
+        "--steps_per_epoch", type=int, default=1000,
+        help="Scheduler steps per epoch when streaming from --data_dir"
+    )
+    parser.add_argument(
+        "--max_tokens", type=int, default=None,
+        help="Padded-token budget per batch (overrides the fixed batch size)"
+    )
     return parser.parse_args()
 
-def load_data(data_dir, tokenizer, max_length=512, batch_size=8):
+def load_data(data_dir, tokenizer, max_length=512, batch_size=8, max_tokens=None,
+              num_workers=0):
     """Load and prepare training data."""
-    # TODO: Implement data loading from Vedic texts
-    # For now, use dummy text for structure
+    collate_fn = DynamicPaddingCollator(tokenizer.pad_token_id)
+    
+    # Stream sharded .txt/.jsonl files from data_dir when it exists
+    if os.path.isdir(data_dir):
+        dataset = StreamingVedicDataset(data_dir, tokenizer, max_length)
+        return DataLoader(
+            dataset,
+            batch_size=batch_size,
+            collate_fn=collate_fn,
+            num_workers=num_workers
+        )
+    
+    # Otherwise use dummy text for structure
     texts = ["Sample Vedic text" for _ in range(10)]
     
-    # Create dataset and dataloader
-    dataset = VedicDataset(texts, tokenizer, max_length)
-    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
+    # Create dataset and dataloader; batches group similar lengths and are
+    # padded only to their longest item
+    dataset = VedicDataset(texts, tokenizer, max_length, padding=False)
+    sampler = LengthBucketBatchSampler(
+        dataset.lengths,
+        batch_size=None if max_tokens else batch_size,
+        max_tokens=max_tokens
+    )
+    dataloader = DataLoader(
+        dataset,
+        batch_sampler=sampler,
+        collate_fn=collate_fn,
+        num_workers=num_workers
+    )
     
     return dataloader
 
-def train(model, dataloader, config, output_dir):
+def train(model, dataloader, config, output_dir, steps_per_epoch=None):
     """Train the VLM model."""
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     model.to(device)
@@ -55,7 +91,10 @@ def train(model, dataloader, config, output_dir):
         weight_decay=config.weight_decay
     )
     
-    total_steps = len(dataloader) * config.num_train_epochs
+    # Streaming loaders have no length, so their epoch size is given explicitly
+    if steps_per_epoch is None:
+        steps_per_epoch = len(dataloader)
+    total_steps = steps_per_epoch * config.num_train_epochs
     scheduler = get_linear_schedule_with_warmup(
         optimizer,
         num_warmup_steps=config.warmup_steps,
@@ -66,6 +105,9 @@ def train(model, dataloader, config, output_dir):
     for epoch in range(config.num_train_epochs):
         model.train()
         total_loss = 0
+        num_batches = 0
+        if hasattr(dataloader.dataset, "set_epoch"):
+            dataloader.dataset.set_epoch(epoch)
         
         for batch in dataloader:
             # Move batch to device
@@ -85,9 +127,10 @@ def train(model, dataloader, config, output_dir):
             optimizer.zero_grad()
             
             total_loss += loss.item()
+            num_batches += 1
         
         # Print epoch results
-        avg_loss = total_loss / len(dataloader)
+        avg_loss = total_loss / max(num_batches, 1)
         print(f"Epoch {epoch+1}/{config.num_train_epochs} - Avg Loss: {avg_loss:.4f}")
     
     # Save the model
@@ -110,10 +153,15 @@ def main():
     # Load data
     dataloader = load_data(args.data_dir, tokenizer, 
                          max_length=config.max_position_embeddings,
-                         batch_size=args.batch_size)
+                         batch_size=args.batch_size,
+                         max_tokens=args.max_tokens,
+                         num_workers=args.num_workers)
     
     # Train model
-    model = train(model, dataloader, config, args.output_dir)
+    steps_per_epoch = None
+    if isinstance(dataloader.dataset, StreamingVedicDataset):
+        steps_per_epoch = args.steps_per_epoch
+    model = train(model, dataloader, config, args.output_dir, steps_per_epoch)
     
     print("Training complete!")
 
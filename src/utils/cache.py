@@ -0,0 +1,236 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+import os
+import sys
+import threading
+import time
+import weakref
+
+@dataclass
+class CacheStats:
+    """Counters of one cache (or the sum of several caches with one name).
+
+    ``bytes`` is only tracked for caches with a memory cap; ``expirations``
+    counts entries dropped because their time to live ran out.
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __add__(self, other: "CacheStats") -> "CacheStats":
+        return CacheStats(
+            self.hits + other.hits,
+            self.misses + other.misses,
+            self.evictions + other.evictions,
+            self.entries + other.entries,
+            self.bytes + other.bytes,
+            self.expirations + other.expirations,
+        )
+
+def approx_size(key: Any, value: Any) -> int:
+    """Approximate memory held by a cache entry.
+
+    Counts the key and value and, one level deep, the items of tuples, lists
+    and slotted objects' list/tuple fields, which covers the analyses cached
+    here without walking shared structures such as compiled rules.
+    """
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    for obj in (key, value):
+        if isinstance(obj, (tuple, list)):
+            size += sum(sys.getsizeof(item) for item in obj)
+        for slot in getattr(type(obj), "__slots__", ()):
+            field = getattr(obj, slot, None)
+            if isinstance(field, (tuple, list, str)):
+                size += sys.getsizeof(field)
+    return size
+
+# Every live cache, for process-wide stats, configuration and fork handling
+_registry: "weakref.WeakSet[LRUCache]" = weakref.WeakSet()
+
+class LRUCache:
+    """Thread-safe, size-bounded least-recently-used cache.
+
+    Bounded by an entry count, an approximate memory cap, or both. With a
+    ``ttl``, entries also expire that many seconds after they were stored;
+    expired entries count as misses and are dropped when looked up. The lock
+    is recreated in forked children (such as DataLoader workers), which keep
+    the parent's entries as a warm start, and pickling keeps only the
+    configuration, so each worker process fills its own cache.
+    """
+
+    def __init__(self, maxsize: Optional[int] = 65536, max_bytes: Optional[int] = None,
+                 name: str = "cache", sizeof: Callable[[Any, Any], int] = approx_size,
+                 ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries (None for unbounded)
+            max_bytes: Maximum approximate memory of the entries (None for unbounded)
+            name: Name under which stats are reported
+            sizeof: Function estimating the memory of a ``(key, value)`` entry
+            ttl: Seconds an entry stays valid after it is stored (None for no expiry)
+            clock: Time source for ``ttl``
+        """
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.name = name
+        self.sizeof = sizeof
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        # key -> (value, size, expiry time or None)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Plain counters: they are updated on every lookup
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._bytes = 0
+        _registry.add(self)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and (entry[2] is None or entry[2] > self.clock())
+
+    def _lookup(self, key: Hashable) -> Optional[tuple]:
+        """Find a live entry and count the lookup. Caller holds the lock."""
+        entry = self._data.get(key)
+        if entry is not None and entry[2] is not None and entry[2] <= self.clock():
+            del self._data[key]
+            self._bytes -= entry[1]
+            self._expirations += 1
+            entry = None
+        if entry is None:
+            self._misses += 1
+            return None
+        self._data.move_to_end(key)
+        self._hits += 1
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value, marking it as recently used."""
+        with self._lock:
+            entry = self._lookup(key)
+            return default if entry is None else entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        """Insert or replace a value, evicting least recently used entries."""
+        size = self.sizeof(key, value) if self.max_bytes is not None else 0
+        expires = None if self.ttl is None else self.clock() + self.ttl
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size, expires)
+            self._bytes += size
+            if self.maxsize is not None and len(self._data) > self.maxsize or \
+                    self.max_bytes is not None and self._bytes > self.max_bytes:
+                self._evict()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, computing and storing it on a miss.
+
+        ``compute`` runs outside the lock, so concurrent misses on the same key
+        may compute it twice; the results are assumed to be equal.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry[0]
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def _evict(self):
+        """Drop entries until both bounds hold. Caller holds the lock."""
+        data = self._data
+        while data and (
+            (self.maxsize is not None and len(data) > self.maxsize)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, (_, size, _) = data.popitem(last=False)
+            self._bytes -= size
+            self._evictions += 1
+
+    def resize(self, maxsize: Optional[int] = None, max_bytes: Optional[int] = None):
+        """Change the bounds, evicting entries if they are now exceeded."""
+        with self._lock:
+            if max_bytes is not None and self.max_bytes is None:
+                # Entries were not measured while there was no memory cap
+                self._data = OrderedDict(
+                    (key, (value, self.sizeof(key, value), expires))
+                    for key, (value, _, expires) in self._data.items()
+                )
+                self._bytes = sum(entry[1] for entry in self._data.values())
+            self.maxsize = maxsize
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """Drop every entry (stats are kept)."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the counters."""
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, len(self._data), self._bytes,
+                              self._expirations)
+
+    def reset_stats(self):
+        """Zero the hit, miss, eviction and expiration counters."""
+        with self._lock:
+            self._hits = self._misses = self._evictions = self._expirations = 0
+
+    def __getstate__(self):
+        """Pickle the configuration only; entries stay in their process."""
+        return {"maxsize": self.maxsize, "max_bytes": self.max_bytes,
+                "name": self.name, "sizeof": self.sizeof, "ttl": self.ttl}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __repr__(self):
+        return f"LRUCache({self.name!r}, entries={len(self._data)}, maxsize={self.maxsize})"
+
+def cache_stats() -> Dict[str, CacheStats]:
+    """Return the stats of all live caches in this process, summed per name."""
+    totals: Dict[str, CacheStats] = {}
+    for cache in list(_registry):
+        totals[cache.name] = totals.get(cache.name, CacheStats()) + cache.stats()
+    return totals
+
+def configure_caches(name: Optional[str] = None, maxsize: Optional[int] = None,
+                     max_bytes: Optional[int] = None):
+    """Set the bounds of all live caches, or only of those with a given name."""
+    for cache in list(_registry):
+        if name is None or cache.name == name:
+            cache.resize(maxsize=maxsize, max_bytes=max_bytes)
+
+def clear_caches(name: Optional[str] = None):
+    """Empty all live caches, or only those with a given name."""
+    for cache in list(_registry):
+        if name is None or cache.name == name:
+            cache.clear()
+
+def _after_fork_in_child():
+    """Give every cache a fresh lock: another thread may have held it at fork time."""
+    for cache in list(_registry):
+        cache._lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
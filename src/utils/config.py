@@ -30,7 +30,7 @@ class VLMConfig:
     
     # Grammar validation
     enable_grammar_validation: bool = True
-    grammar_rules_path: Optional[str] = None
+    grammar_rules_path: Optional[str] = None  # JSON/YAML rule file, compiled and cached on first load
     
     # RAG
     retriever_index_path: Optional[str] = None
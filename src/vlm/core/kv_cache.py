@@ -0,0 +1,163 @@
+from typing import List, Optional, Sequence, Tuple
+import torch
+
+class KVCache:
+    """Key/value cache for incremental decoding with VLMCore.
+
+    Decoder self-attention keys and values live in preallocated buffers of
+    shape [B, H, capacity, Dh] per layer and are written in place, so each
+    decoding step costs O(length) rather than re-running the whole prefix.
+    Every row keeps its own length, which lets rows at different positions
+    share a batch (continuous batching); ``select`` and ``merge`` drop and
+    add rows. Cross-attention keys and values are projected from the encoder
+    output once per prompt and reused at every step.
+    """
+
+    def __init__(
+        self,
+        keys: List[torch.Tensor],
+        values: List[torch.Tensor],
+        cross_keys: List[torch.Tensor],
+        cross_values: List[torch.Tensor],
+        encoder_bias: Optional[torch.Tensor],
+        lengths: torch.Tensor,
+    ):
+        """Wrap cache tensors.
+
+        Args:
+            keys: Self-attention key buffers per layer [B, H, capacity, Dh]
+            values: Self-attention value buffers per layer [B, H, capacity, Dh]
+            cross_keys: Cross-attention keys per layer [B, H, S, Dh]
+            cross_values: Cross-attention values per layer [B, H, S, Dh]
+            encoder_bias: Additive bias over encoder positions [B, 1, 1, S], or None
+            lengths: Tokens already cached per row [B]
+        """
+        self.keys = keys
+        self.values = values
+        self.cross_keys = cross_keys
+        self.cross_values = cross_values
+        self.encoder_bias = encoder_bias
+        self.lengths = lengths
+
+    @classmethod
+    def allocate(cls, cross_keys: List[torch.Tensor], cross_values: List[torch.Tensor],
+                 encoder_bias: Optional[torch.Tensor], capacity: int) -> "KVCache":
+        """Create an empty cache for the given cross-attention projections."""
+        batch, heads, _, head_dim = cross_keys[0].shape
+        like = cross_keys[0]
+        keys = [like.new_zeros(batch, heads, capacity, head_dim) for _ in cross_keys]
+        values = [like.new_zeros(batch, heads, capacity, head_dim) for _ in cross_keys]
+        lengths = torch.zeros(batch, dtype=torch.long, device=like.device)
+        return cls(keys, values, cross_keys, cross_values, encoder_bias, lengths)
+
+    @property
+    def batch_size(self) -> int:
+        return self.lengths.size(0)
+
+    @property
+    def capacity(self) -> int:
+        return self.keys[0].size(2)
+
+    def reserve(self, num_new: int):
+        """Make room for ``num_new`` more tokens in every row, doubling if needed."""
+        needed = int(self.lengths.max()) + num_new if self.batch_size else num_new
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, 2 * self.capacity)
+        self.keys = [_pad_dim(k, 2, capacity) for k in self.keys]
+        self.values = [_pad_dim(v, 2, capacity) for v in self.values]
+
+    def positions(self, num_new: int) -> torch.Tensor:
+        """Absolute positions [B, num_new] of the next tokens of every row."""
+        return self.lengths[:, None] + torch.arange(num_new, device=self.lengths.device)
+
+    def write(self, layer: int, key: torch.Tensor, value: torch.Tensor,
+              positions: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Store new keys/values of one layer and return the used part of the buffers.
+
+        Args:
+            layer: Decoder layer index
+            key: New keys [B, H, L, Dh]
+            value: New values [B, H, L, Dh]
+            positions: Positions of the new tokens [B, L], from ``positions``
+
+        Returns:
+            tuple: Keys and values [B, H, used, Dh] with ``used`` the longest
+            row after the write; ``self_bias`` masks the unused slots
+        """
+        rows = torch.arange(key.size(0), device=key.device)[:, None]
+        # Advanced indexing over (row, position) puts the head dimension last
+        self.keys[layer][rows, :, positions] = key.transpose(1, 2)
+        self.values[layer][rows, :, positions] = value.transpose(1, 2)
+        used = int(positions.max()) + 1 if positions.numel() else 0
+        return self.keys[layer][:, :, :used], self.values[layer][:, :, :used]
+
+    def self_bias(self, positions: torch.Tensor, dtype: torch.dtype) -> torch.Tensor:
+        """Causal bias [B, 1, L, used] letting each new token see its row's prefix."""
+        used = int(positions.max()) + 1 if positions.numel() else 0
+        key_positions = torch.arange(used, device=positions.device)
+        allowed = key_positions[None, None, :] <= positions[:, :, None]
+        bias = torch.zeros(allowed.shape, dtype=dtype, device=positions.device)
+        return bias.masked_fill(~allowed, torch.finfo(dtype).min)[:, None]
+
+    def advance(self, num_new: int):
+        """Mark ``num_new`` tokens of every row as cached."""
+        self.lengths = self.lengths + num_new
+
+    def select(self, rows: Sequence[int]) -> "KVCache":
+        """Return a cache holding only the given rows, in that order."""
+        index = torch.as_tensor(rows, dtype=torch.long, device=self.lengths.device)
+        pick = lambda tensors: [t.index_select(0, index) for t in tensors]
+        return KVCache(
+            pick(self.keys),
+            pick(self.values),
+            pick(self.cross_keys),
+            pick(self.cross_values),
+            None if self.encoder_bias is None else self.encoder_bias.index_select(0, index),
+            self.lengths.index_select(0, index),
+        )
+
+    @classmethod
+    def merge(cls, caches: Sequence["KVCache"]) -> "KVCache":
+        """Concatenate caches along the batch.
+
+        Buffers are padded to the largest capacity and encoder length; padded
+        encoder positions are masked through the encoder bias.
+        """
+        caches = [cache for cache in caches if cache.batch_size]
+        if len(caches) == 1:
+            return caches[0]
+        capacity = max(cache.capacity for cache in caches)
+        source = max(cache.cross_keys[0].size(2) for cache in caches)
+        like = caches[0].cross_keys[0]
+        dtype = like.dtype if like.is_floating_point() else torch.float32
+
+        biases = []
+        for cache in caches:
+            bias = cache.encoder_bias
+            if bias is None:
+                bias = like.new_zeros(cache.batch_size, 1, 1, cache.cross_keys[0].size(2), dtype=dtype)
+            biases.append(_pad_dim(bias, 3, source, torch.finfo(bias.dtype).min))
+
+        num_layers = len(caches[0].keys)
+        join = lambda name, size: [
+            torch.cat([_pad_dim(getattr(cache, name)[layer], 2, size) for cache in caches])
+            for layer in range(num_layers)
+        ]
+        return cls(
+            join("keys", capacity),
+            join("values", capacity),
+            join("cross_keys", source),
+            join("cross_values", source),
+            torch.cat(biases),
+            torch.cat([cache.lengths for cache in caches]),
+        )
+
+def _pad_dim(tensor: torch.Tensor, dim: int, size: int, value: float = 0.0) -> torch.Tensor:
+    """Pad one dimension of a tensor at the end up to ``size``."""
+    missing = size - tensor.size(dim)
+    if missing <= 0:
+        return tensor
+    shape = list(tensor.shape)
+    shape[dim] = missing
+    return torch.cat([tensor, tensor.new_full(shape, value)], dim=dim)
@@ -0,0 +1,180 @@
+from typing import Optional
+import torch
+
+def block_diagonal_mask(sequence_ids: torch.Tensor) -> torch.Tensor:
+    """Build a block-diagonal attention mask for packed sequences.
+
+    Args:
+        sequence_ids: Segment id of every position [B, L] (or [L]); positions
+            sharing an id attend to each other and id 0 marks padding
+
+    Returns:
+        torch.Tensor: Boolean mask [B, L, L] (or [L, L]), True where attention is allowed
+    """
+    same = sequence_ids.unsqueeze(-1) == sequence_ids.unsqueeze(-2)
+    return same & (sequence_ids != 0).unsqueeze(-1)
+
+def segment_positions(sequence_ids: torch.Tensor) -> torch.Tensor:
+    """Position of every token within its packed sequence.
+
+    Args:
+        sequence_ids: Segment id of every position [B, L]
+
+    Returns:
+        torch.Tensor: Positions [B, L], restarting at 0 wherever the id changes
+    """
+    index = torch.arange(sequence_ids.size(-1), device=sequence_ids.device).expand_as(sequence_ids)
+    starts = torch.ones_like(sequence_ids, dtype=torch.bool)
+    starts[..., 1:] = sequence_ids[..., 1:] != sequence_ids[..., :-1]
+    return index - torch.where(starts, index, 0).cummax(dim=-1).values
+
+def to_attention_bias(mask: Optional[torch.Tensor], dtype: torch.dtype = torch.float32) -> Optional[torch.Tensor]:
+    """Normalize an attention mask into an additive bias.
+
+    Accepted formats:
+        - [B, S] padding masks (1/True keeps a key position)
+        - [B, L, S] masks, such as the block-diagonal masks of packed sequences
+        - [B, H, L, S] per-head masks
+        - BlockMask segment ids or a CSRMask (materialized as a dense
+          [B, L, S] mask)
+
+    Boolean and integer masks are treated as keep-masks and converted to 0 /
+    large-negative values; floating point masks are already additive biases.
+
+    Args:
+        mask: Attention mask in one of the formats above, or None
+        dtype: Floating point dtype of the returned bias
+
+    Returns:
+        torch.Tensor: Bias broadcastable to [B, H, L, S], or None
+    """
+    if mask is None:
+        return None
+    if isinstance(mask, (BlockMask, CSRMask)):
+        mask = mask.to_dense()
+
+    if mask.dim() == 2:
+        mask = mask[:, None, None, :]
+    elif mask.dim() == 3:
+        mask = mask[:, None, :, :]
+    elif mask.dim() != 4:
+        raise ValueError(f"Unsupported attention mask shape {tuple(mask.shape)}")
+
+    if mask.is_floating_point():
+        return mask.to(dtype)
+
+    bias = torch.zeros(mask.shape, dtype=dtype, device=mask.device)
+    return bias.masked_fill(~mask.bool(), torch.finfo(dtype).min)
+
+class BlockMask:
+    """Block-structured attention mask kept as per-position segment ids.
+
+    A query attends to the keys of its own segment, and segment 0 marks
+    padding, as in ``block_diagonal_mask``. Sandhi-boundary or pāda-level
+    blocks are described in O(L + S) memory instead of a dense [B, L, S]
+    tensor, and attention can run block by block (see HybridAttention).
+    """
+
+    def __init__(self, query_segments: torch.Tensor, key_segments: Optional[torch.Tensor] = None):
+        """Wrap segment ids.
+
+        Args:
+            query_segments: Segment id of every query position [B, L]
+            key_segments: Segment id of every key position [B, S]; the query
+                ids when None (self-attention)
+        """
+        self.query_segments = query_segments
+        self.key_segments = query_segments if key_segments is None else key_segments
+
+    @classmethod
+    def from_boundaries(cls, boundaries: torch.Tensor, padding: Optional[torch.Tensor] = None) -> "BlockMask":
+        """Build self-attention blocks that start at marked positions.
+
+        Args:
+            boundaries: True where a new block starts [B, L], e.g. at sandhi
+                boundaries or pāda starts; position 0 always starts a block
+            padding: Optional [B, L] keep-mask; dropped positions get segment 0
+
+        Returns:
+            BlockMask: Mask with segments numbered from 1 in every row
+        """
+        starts = boundaries.bool().clone()
+        starts[:, 0] = True
+        segments = starts.long().cumsum(dim=1)
+        if padding is not None:
+            segments = segments.masked_fill(~padding.bool(), 0)
+        return cls(segments)
+
+    @classmethod
+    def from_lengths(cls, lengths, total: Optional[int] = None) -> "BlockMask":
+        """Build self-attention blocks of the given lengths, one row per list.
+
+        Args:
+            lengths: Block lengths of every row, e.g. pāda lengths of a verse
+            total: Row length (the longest row when None); the rest is padding
+
+        Returns:
+            BlockMask: Mask with segments numbered from 1 in every row
+        """
+        total = total or max(sum(row) for row in lengths)
+        segments = torch.zeros(len(lengths), total, dtype=torch.long)
+        for b, row in enumerate(lengths):
+            block_ids = torch.repeat_interleave(torch.arange(1, len(row) + 1), torch.as_tensor(row, dtype=torch.long))
+            segments[b, :len(block_ids)] = block_ids
+        return cls(segments)
+
+    @property
+    def shape(self):
+        batch, length = self.query_segments.shape
+        return (batch, length, self.key_segments.size(1))
+
+    def to_dense(self) -> torch.Tensor:
+        """Boolean [B, L, S] mask, True where attention is allowed."""
+        same = self.query_segments.unsqueeze(-1) == self.key_segments.unsqueeze(-2)
+        return same & (self.query_segments != 0).unsqueeze(-1)
+
+class CSRMask:
+    """Sparse attention mask in compressed sparse row format.
+
+    Row ``b * L + i`` lists the key positions query ``i`` of batch row ``b``
+    may attend to, in increasing order. Attention over a CSRMask (see
+    HybridAttention) only touches the allowed pairs, so it costs O(nnz)
+    instead of O(L x S).
+    """
+
+    def __init__(self, indptr: torch.Tensor, indices: torch.Tensor, shape):
+        """Wrap CSR arrays.
+
+        Args:
+            indptr: Row offsets into ``indices`` [B * L + 1]
+            indices: Allowed key positions of every row, concatenated [nnz]
+            shape: Dense shape (B, L, S)
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_dense(cls, mask: torch.Tensor) -> "CSRMask":
+        """Compress a boolean [B, L, S] mask."""
+        batch, length, source = mask.shape
+        rows, indices = mask.reshape(batch * length, source).nonzero(as_tuple=True)
+        indptr = torch.zeros(batch * length + 1, dtype=torch.long, device=mask.device)
+        indptr[1:] = torch.bincount(rows, minlength=batch * length).cumsum(0)
+        return cls(indptr, indices, mask.shape)
+
+    @property
+    def nnz(self) -> int:
+        return self.indices.numel()
+
+    def row_indices(self) -> torch.Tensor:
+        """Flat query row (``b * L + i``) of every stored entry [nnz]."""
+        counts = self.indptr[1:] - self.indptr[:-1]
+        return torch.repeat_interleave(torch.arange(len(counts), device=counts.device), counts)
+
+    def to_dense(self) -> torch.Tensor:
+        """Boolean [B, L, S] mask, True where attention is allowed."""
+        batch, length, source = self.shape
+        dense = torch.zeros(batch * length, source, dtype=torch.bool, device=self.indices.device)
+        dense[self.row_indices(), self.indices] = True
+        return dense.view(batch, length, source)
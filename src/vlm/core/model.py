@@ -1,26 +1,399 @@
+from typing import Optional, Tuple
 import torch
 import torch.nn as nn
-from transformers import PreTrainedModel
+import torch.nn.functional as F
+from transformers import PretrainedConfig, PreTrainedModel
+from transformers.modeling_outputs import Seq2SeqLMOutput
+
+from src.vlm.core.kv_cache import KVCache
+from src.vlm.core.masking import BlockMask, block_diagonal_mask, segment_positions, to_attention_bias
+from src.vlm.core.sampling import select_next_tokens
+
+class VLMCoreConfig(PretrainedConfig):
+    """Hugging Face configuration of the VLM core encoder-decoder."""
+
+    model_type = "vlm"
+
+    def __init__(
+        self,
+        vocab_size=50000,
+        hidden_size=768,
+        num_hidden_layers=12,
+        num_attention_heads=12,
+        intermediate_size=3072,
+        hidden_dropout_prob=0.1,
+        attention_probs_dropout_prob=0.1,
+        max_position_embeddings=512,
+        initializer_range=0.02,
+        layer_norm_eps=1e-5,
+        pad_token_id=0,
+        bos_token_id=1,
+        eos_token_id=2,
+        decoder_start_token_id=1,
+        **kwargs
+    ):
+        self.vocab_size = vocab_size
+        self.hidden_size = hidden_size
+        self.num_hidden_layers = num_hidden_layers
+        self.num_attention_heads = num_attention_heads
+        self.intermediate_size = intermediate_size
+        self.hidden_dropout_prob = hidden_dropout_prob
+        self.attention_probs_dropout_prob = attention_probs_dropout_prob
+        self.max_position_embeddings = max_position_embeddings
+        self.initializer_range = initializer_range
+        self.layer_norm_eps = layer_norm_eps
+        kwargs.setdefault("is_encoder_decoder", True)
+        super().__init__(
+            pad_token_id=pad_token_id,
+            bos_token_id=bos_token_id,
+            eos_token_id=eos_token_id,
+            decoder_start_token_id=decoder_start_token_id,
+            **kwargs
+        )
+
+    @classmethod
+    def from_vlm_config(cls, config) -> "VLMCoreConfig":
+        """Build a model configuration from the project-wide VLMConfig."""
+        return cls(
+            vocab_size=config.vocab_size,
+            hidden_size=config.hidden_size,
+            num_hidden_layers=config.num_hidden_layers,
+            num_attention_heads=config.num_attention_heads,
+            intermediate_size=config.intermediate_size,
+            hidden_dropout_prob=config.hidden_dropout_prob,
+            attention_probs_dropout_prob=config.attention_probs_dropout_prob,
+            max_position_embeddings=config.max_position_embeddings,
+        )
+
+class Attention(nn.Module):
+    """Multi-head attention on top of ``F.scaled_dot_product_attention``."""
+
+    def __init__(self, config):
+        super().__init__()
+        self.num_heads = config.num_attention_heads
+        self.head_dim = config.hidden_size // config.num_attention_heads
+        self.dropout = config.attention_probs_dropout_prob
+        self.query = nn.Linear(config.hidden_size, config.hidden_size)
+        self.key = nn.Linear(config.hidden_size, config.hidden_size)
+        self.value = nn.Linear(config.hidden_size, config.hidden_size)
+        self.output = nn.Linear(config.hidden_size, config.hidden_size)
+
+    def _heads(self, x: torch.Tensor) -> torch.Tensor:
+        """[B, L, D] -> [B, H, L, Dh]"""
+        batch, length, _ = x.shape
+        return x.view(batch, length, self.num_heads, self.head_dim).transpose(1, 2)
+
+    def project_kv(self, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Keys and values [B, H, S, Dh] of the attended sequence."""
+        return self._heads(self.key(x)), self._heads(self.value(x))
+
+    def attend(self, x: torch.Tensor, key: torch.Tensor, value: torch.Tensor,
+               bias: Optional[torch.Tensor] = None, is_causal: bool = False) -> torch.Tensor:
+        """Attend from ``x`` [B, L, D] to projected keys and values."""
+        out = F.scaled_dot_product_attention(
+            self._heads(self.query(x)), key, value,
+            attn_mask=bias,
+            dropout_p=self.dropout if self.training else 0.0,
+            is_causal=is_causal,
+        )
+        batch, _, length, _ = out.shape
+        return self.output(out.transpose(1, 2).reshape(batch, length, -1))
+
+class FeedForward(nn.Module):
+    def __init__(self, config):
+        super().__init__()
+        self.fc1 = nn.Linear(config.hidden_size, config.intermediate_size)
+        self.fc2 = nn.Linear(config.intermediate_size, config.hidden_size)
+        self.dropout = nn.Dropout(config.hidden_dropout_prob)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.fc2(self.dropout(F.gelu(self.fc1(x))))
+
+class EncoderLayer(nn.Module):
+    """Pre-LayerNorm transformer encoder layer."""
+
+    def __init__(self, config):
+        super().__init__()
+        self.self_attn = Attention(config)
+        self.self_attn_layer_norm = nn.LayerNorm(config.hidden_size, eps=config.layer_norm_eps)
+        self.ffn = FeedForward(config)
+        self.ffn_layer_norm = nn.LayerNorm(config.hidden_size, eps=config.layer_norm_eps)
+        self.dropout = nn.Dropout(config.hidden_dropout_prob)
+
+    def forward(self, hidden: torch.Tensor, bias: Optional[torch.Tensor]) -> torch.Tensor:
+        h = self.self_attn_layer_norm(hidden)
+        hidden = hidden + self.dropout(self.self_attn.attend(h, *self.self_attn.project_kv(h), bias))
+        return hidden + self.dropout(self.ffn(self.ffn_layer_norm(hidden)))
+
+class DecoderLayer(nn.Module):
+    """Pre-LayerNorm transformer decoder layer with cross-attention."""
+
+    def __init__(self, config):
+        super().__init__()
+        self.self_attn = Attention(config)
+        self.self_attn_layer_norm = nn.LayerNorm(config.hidden_size, eps=config.layer_norm_eps)
+        self.cross_attn = Attention(config)
+        self.cross_attn_layer_norm = nn.LayerNorm(config.hidden_size, eps=config.layer_norm_eps)
+        self.ffn = FeedForward(config)
+        self.ffn_layer_norm = nn.LayerNorm(config.hidden_size, eps=config.layer_norm_eps)
+        self.dropout = nn.Dropout(config.hidden_dropout_prob)
+
+    def forward(self, hidden, self_kv, self_bias, cross_kv, cross_bias, is_causal=False):
+        """Run the layer on already projected self- and cross-attention keys/values.
+
+        ``self_kv`` is a callable mapping the normalized hidden states to
+        self-attention keys and values, so the cached path can write them
+        into the KV cache before attending.
+        """
+        h = self.self_attn_layer_norm(hidden)
+        hidden = hidden + self.dropout(self.self_attn.attend(h, *self_kv(h), self_bias, is_causal))
+        h = self.cross_attn_layer_norm(hidden)
+        hidden = hidden + self.dropout(self.cross_attn.attend(h, *cross_kv, cross_bias))
+        return hidden + self.dropout(self.ffn(self.ffn_layer_norm(hidden)))
 
 class VLMCore(PreTrainedModel):
     """Core Vedic Language Model architecture.
-    
+
     A transformer-based encoder-decoder model trained on the Vedic corpus,
     with phonemic tokenization and specialized attention mechanisms.
+
+    Generation runs incrementally: the encoder output and the cross-attention
+    keys/values are computed once per prompt, and decoder self-attention keys
+    and values are kept in a KVCache so each step only processes the newest
+    token.
     """
-    
+
+    config_class = VLMCoreConfig
+    base_model_prefix = "vlm"
+    main_input_name = "input_ids"
+    _supports_sdpa = True
+
     def __init__(self, config):
+        # The project-wide VLMConfig is accepted as well
+        if not isinstance(config, PretrainedConfig):
+            config = VLMCoreConfig.from_vlm_config(config)
         super().__init__(config)
-        # TODO: Implement model architecture
-        self.encoder = None  # Transformer encoder
-        self.decoder = None  # Transformer decoder
-        
-    def forward(self, input_ids, attention_mask=None, decoder_input_ids=None, **kwargs):
-        """Forward pass for the VLM core model."""
-        # TODO: Implement forward pass
-        pass
-    
-    def generate(self, input_ids, max_length=100, **kwargs):
-        """Generate text using the VLM core."""
-        # TODO: Implement generation logic
-        pass
+        self.shared = nn.Embedding(config.vocab_size, config.hidden_size, padding_idx=config.pad_token_id)
+        self.encoder_positions = nn.Embedding(config.max_position_embeddings, config.hidden_size)
+        self.decoder_positions = nn.Embedding(config.max_position_embeddings, config.hidden_size)
+        self.encoder = nn.ModuleList([EncoderLayer(config) for _ in range(config.num_hidden_layers)])
+        self.decoder = nn.ModuleList([DecoderLayer(config) for _ in range(config.num_hidden_layers)])
+        self.encoder_layer_norm = nn.LayerNorm(config.hidden_size, eps=config.layer_norm_eps)
+        self.decoder_layer_norm = nn.LayerNorm(config.hidden_size, eps=config.layer_norm_eps)
+        self.dropout = nn.Dropout(config.hidden_dropout_prob)
+        self.post_init()
+
+    def get_input_embeddings(self):
+        return self.shared
+
+    def set_input_embeddings(self, value):
+        self.shared = value
+
+    def _embed(self, input_ids, position_ids, positions):
+        if position_ids is None:
+            position_ids = torch.arange(input_ids.size(-1), device=input_ids.device).expand_as(input_ids)
+        return self.dropout(self.shared(input_ids) + positions(position_ids))
+
+    def _logits(self, hidden: torch.Tensor) -> torch.Tensor:
+        # Output projection is tied to the shared embedding
+        return F.linear(self.decoder_layer_norm(hidden), self.shared.weight)
+
+    def encode(self, input_ids, attention_mask=None, position_ids=None) -> torch.Tensor:
+        """Run the encoder.
+
+        Args:
+            input_ids: Token ids [B, S]
+            attention_mask: [B, S] padding mask or [B, S, S] block-diagonal mask
+            position_ids: Optional positions [B, S] (per-verse for packed input)
+
+        Returns:
+            torch.Tensor: Encoder hidden states [B, S, D]
+        """
+        hidden = self._embed(input_ids, position_ids, self.encoder_positions)
+        bias = to_attention_bias(attention_mask, hidden.dtype)
+        for layer in self.encoder:
+            hidden = layer(hidden, bias)
+        return self.encoder_layer_norm(hidden)
+
+    def _decode(self, decoder_input_ids, encoder_hidden, self_bias, cross_bias, position_ids=None):
+        """Run the decoder over whole sequences without a cache."""
+        hidden = self._embed(decoder_input_ids, position_ids, self.decoder_positions)
+        is_causal = self_bias is None
+        for layer in self.decoder:
+            cross_kv = layer.cross_attn.project_kv(encoder_hidden)
+            hidden = layer(hidden, layer.self_attn.project_kv, self_bias, cross_kv, cross_bias, is_causal)
+        return self._logits(hidden)
+
+    def _shift_right(self, labels: torch.Tensor, position_ids: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """Decoder inputs for ``labels``; packed verses each restart with the start token."""
+        shifted = labels.new_full(labels.shape, self.config.decoder_start_token_id)
+        shifted[:, 1:] = labels[:, :-1]
+        shifted = shifted.masked_fill(shifted == -100, self.config.pad_token_id)
+        if position_ids is not None:
+            shifted = shifted.masked_fill(position_ids == 0, self.config.decoder_start_token_id)
+        return shifted
+
+    def forward(self, input_ids=None, attention_mask=None, decoder_input_ids=None,
+                decoder_attention_mask=None, labels=None, position_ids=None,
+                encoder_outputs=None, sequence_ids=None, decoder_sequence_ids=None, **kwargs):
+        """Forward pass for the VLM core model.
+
+        ``attention_mask`` may be a [B, S] padding mask or a [B, S, S]
+        block-diagonal mask from packed sequences (with matching
+        ``position_ids``). A block-diagonal mask also keeps decoder tokens
+        inside their own verse, for both self- and cross-attention: directly
+        when the decoder is packed like the encoder, otherwise through
+        ``decoder_sequence_ids`` matched against ``sequence_ids``.
+
+        Args:
+            input_ids: Encoder token ids [B, S]
+            attention_mask: Encoder attention mask
+            decoder_input_ids: Decoder token ids [B, L]; shifted ``labels`` when omitted
+            decoder_attention_mask: Optional [B, L] decoder padding mask
+            labels: Target ids [B, L], -100 where ignored
+            position_ids: Optional positions of packed input
+            encoder_outputs: Precomputed encoder hidden states
+            sequence_ids: Packed sequence of every encoder position [B, S]
+                (0 for padding)
+            decoder_sequence_ids: Packed sequence of every decoder position
+                [B, L]; needed with a packed ``attention_mask`` when the
+                decoder length differs from the encoder's
+
+        Returns:
+            Seq2SeqLMOutput: Logits, plus the loss when ``labels`` are given
+
+        Raises:
+            ValueError: If a packed mask cannot be matched to the decoder
+        """
+        if encoder_outputs is None:
+            encoder_outputs = self.encode(input_ids, attention_mask, position_ids)
+        elif not isinstance(encoder_outputs, torch.Tensor):
+            encoder_outputs = encoder_outputs[0]
+        packed = attention_mask is not None and attention_mask.dim() == 3
+        length = (decoder_input_ids if decoder_input_ids is not None else labels).size(1)
+        # A decoder packed like the encoder shares its mask and positions
+        shared = packed and attention_mask.size(1) == length
+        if packed and not shared:
+            if sequence_ids is None or decoder_sequence_ids is None:
+                raise ValueError(f"Packed attention_mask covers {attention_mask.size(1)} encoder positions "
+                                 f"but the decoder has {length}; pass sequence_ids and decoder_sequence_ids")
+            decoder_positions = segment_positions(decoder_sequence_ids)
+        else:
+            decoder_positions = position_ids if packed else None
+        if decoder_input_ids is None:
+            decoder_input_ids = self._shift_right(labels, decoder_positions)
+
+        dtype = encoder_outputs.dtype
+        if packed:
+            causal = torch.ones(length, length, dtype=torch.bool, device=attention_mask.device).tril()
+            if shared:
+                self_mask, cross_mask = attention_mask.bool(), attention_mask
+            else:
+                self_mask = block_diagonal_mask(decoder_sequence_ids)
+                cross_mask = BlockMask(decoder_sequence_ids, sequence_ids)
+            self_bias = to_attention_bias(self_mask & causal, dtype)
+            cross_bias = to_attention_bias(cross_mask, dtype)
+        else:
+            self_bias = None
+            if decoder_attention_mask is not None:
+                causal = torch.ones(length, length, dtype=torch.bool, device=decoder_input_ids.device).tril()
+                self_bias = to_attention_bias(decoder_attention_mask.bool()[:, None, :] & causal, dtype)
+            cross_bias = to_attention_bias(attention_mask, dtype)
+
+        logits = self._decode(decoder_input_ids, encoder_outputs, self_bias, cross_bias, decoder_positions)
+
+        loss = None
+        if labels is not None:
+            loss = F.cross_entropy(logits.reshape(-1, logits.size(-1)).float(), labels.reshape(-1), ignore_index=-100)
+        return Seq2SeqLMOutput(
+            loss=loss,
+            logits=logits,
+            encoder_last_hidden_state=encoder_outputs,
+        )
+
+    def init_cache(self, encoder_hidden: torch.Tensor, attention_mask: Optional[torch.Tensor] = None,
+                   capacity: int = 64) -> KVCache:
+        """Project cross-attention keys/values once and allocate a decoder cache.
+
+        Args:
+            encoder_hidden: Encoder output [B, S, D]
+            attention_mask: Optional [B, S] encoder padding mask
+            capacity: Initial number of decoder positions (grown on demand)
+
+        Returns:
+            KVCache: Empty cache for ``decode_step``
+        """
+        cross_keys, cross_values = zip(*(layer.cross_attn.project_kv(encoder_hidden) for layer in self.decoder))
+        bias = to_attention_bias(attention_mask, encoder_hidden.dtype)
+        return KVCache.allocate(list(cross_keys), list(cross_values), bias, capacity)
+
+    def decode_step(self, input_ids: torch.Tensor, cache: KVCache) -> torch.Tensor:
+        """Decode new tokens on top of a KVCache, updating it in place.
+
+        Rows may be at different positions; each row continues from its own
+        cached length.
+
+        Args:
+            input_ids: New decoder tokens [B, L] (usually L == 1)
+            cache: Cache from ``init_cache`` (possibly merged or selected)
+
+        Returns:
+            torch.Tensor: Logits of the new tokens [B, L, V]
+        """
+        num_new = input_ids.size(1)
+        cache.reserve(num_new)
+        positions = cache.positions(num_new)
+        hidden = self._embed(input_ids, positions, self.decoder_positions)
+        self_bias = cache.self_bias(positions, hidden.dtype)
+        for i, layer in enumerate(self.decoder):
+            self_kv = lambda h, i=i, layer=layer: cache.write(i, *layer.self_attn.project_kv(h), positions)
+            cross_kv = (cache.cross_keys[i], cache.cross_values[i])
+            hidden = layer(hidden, self_kv, self_bias, cross_kv, cache.encoder_bias)
+        cache.advance(num_new)
+        return self._logits(hidden)
+
+    @torch.no_grad()
+    def generate(self, input_ids, max_length=100, attention_mask=None, do_sample=False,
+                 temperature=1.0, top_k=0, top_p=1.0, eos_token_id=None, use_cache=True,
+                 generator=None, **kwargs):
+        """Generate text using the VLM core.
+
+        Args:
+            input_ids: Prompt token ids [B, S]
+            max_length: Maximum length of the generated sequences, start token included
+            attention_mask: Optional [B, S] prompt padding mask
+            do_sample: Sample instead of greedy decoding
+            temperature: Sampling temperature
+            top_k: Top-k filter (0 disables)
+            top_p: Nucleus filter (1.0 disables)
+            eos_token_id: Token ending a sequence (defaults to the config's)
+            use_cache: Decode incrementally with a KVCache; without it the
+                decoder reprocesses the whole prefix at every step
+            generator: Optional random generator for sampling
+
+        Returns:
+            torch.Tensor: Generated ids [B, <= max_length], starting with the
+            decoder start token; rows that finished early are padded
+        """
+        config = self.config
+        eos_token_id = config.eos_token_id if eos_token_id is None else eos_token_id
+        encoder_hidden = self.encode(input_ids, attention_mask)
+        cross_bias = to_attention_bias(attention_mask, encoder_hidden.dtype)
+        cache = self.init_cache(encoder_hidden, attention_mask, max_length) if use_cache else None
+
+        batch = input_ids.size(0)
+        sequences = input_ids.new_full((batch, 1), config.decoder_start_token_id)
+        finished = torch.zeros(batch, dtype=torch.bool, device=input_ids.device)
+        for _ in range(max_length - 1):
+            if use_cache:
+                logits = self.decode_step(sequences[:, -1:], cache)[:, -1]
+            else:
+                logits = self._decode(sequences, encoder_hidden, None, cross_bias)[:, -1]
+            next_tokens = select_next_tokens(logits, do_sample, temperature, top_k, top_p, generator)
+            next_tokens = next_tokens.masked_fill(finished, config.pad_token_id)
+            sequences = torch.cat([sequences, next_tokens[:, None]], dim=1)
+            if eos_token_id is not None:
+                finished |= next_tokens == eos_token_id
+                if finished.all():
+                    break
+        return sequences
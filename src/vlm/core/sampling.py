@@ -0,0 +1,86 @@
+from typing import Optional, Union
+import torch
+
+# Sampling parameters may be a single value or one value per batch row
+Param = Union[int, float, bool, torch.Tensor]
+
+def _per_row(value: Param, logits: torch.Tensor, dtype: torch.dtype) -> torch.Tensor:
+    """Broadcast a scalar or per-row parameter to shape [B, 1]."""
+    return torch.as_tensor(value, dtype=dtype, device=logits.device).reshape(-1, 1)
+
+def _is_scalar(value: Param) -> bool:
+    return not isinstance(value, torch.Tensor) or value.dim() == 0
+
+def filter_logits(logits: torch.Tensor, top_k: Param = 0, top_p: Param = 1.0) -> torch.Tensor:
+    """Mask logits outside the top-k tokens and the top-p nucleus.
+
+    Top-k is applied first and top-p is computed on what remains, as in the
+    usual sampling pipelines. The most likely token is never masked.
+
+    Args:
+        logits: Next-token logits [B, V]
+        top_k: Keep the k most likely tokens (0 disables)
+        top_p: Keep the smallest set of tokens whose probability reaches p
+            (1.0 disables)
+
+    Returns:
+        torch.Tensor: Logits with filtered tokens set to -inf
+    """
+    if _is_scalar(top_k) and _is_scalar(top_p):
+        top_k, top_p = int(top_k), float(top_p)
+        if top_p >= 1.0:
+            if top_k <= 0 or top_k >= logits.size(-1):
+                return logits
+            # Top-k alone needs no full sort
+            threshold = logits.topk(top_k, dim=-1).values[..., -1:]
+            return logits.masked_fill(logits < threshold, float("-inf"))
+
+    sorted_logits, order = logits.sort(dim=-1, descending=True)
+    ranks = torch.arange(logits.size(-1), device=logits.device)
+
+    k = _per_row(top_k, logits, torch.long)
+    sorted_logits = sorted_logits.masked_fill((k > 0) & (ranks >= k), float("-inf"))
+
+    probs = sorted_logits.softmax(dim=-1)
+    # A token is dropped once the tokens before it already reach top_p
+    before = probs.cumsum(dim=-1) - probs
+    p = _per_row(top_p, logits, probs.dtype)
+    sorted_logits = sorted_logits.masked_fill((before >= p) & (ranks > 0), float("-inf"))
+
+    return torch.empty_like(logits).scatter_(-1, order, sorted_logits)
+
+def select_next_tokens(
+    logits: torch.Tensor,
+    do_sample: Param = False,
+    temperature: Param = 1.0,
+    top_k: Param = 0,
+    top_p: Param = 1.0,
+    generator: Optional[torch.Generator] = None,
+) -> torch.Tensor:
+    """Pick the next token of every row, greedily or by sampling.
+
+    Every parameter may be a scalar or a tensor with one value per row, so a
+    batch can mix requests with different decoding settings.
+
+    Args:
+        logits: Next-token logits [B, V]
+        do_sample: Sample instead of taking the argmax
+        temperature: Softmax temperature for sampling
+        top_k: Top-k filter for sampling (0 disables)
+        top_p: Nucleus filter for sampling (1.0 disables)
+        generator: Optional random generator
+
+    Returns:
+        torch.Tensor: Token ids [B]
+    """
+    greedy = logits.argmax(dim=-1)
+    if _is_scalar(do_sample) and not bool(do_sample):
+        return greedy
+
+    scaled = logits.float() / _per_row(temperature, logits, torch.float32).clamp_min(1e-5)
+    filtered = filter_logits(scaled, top_k=top_k, top_p=top_p)
+    sampled = torch.multinomial(filtered.softmax(dim=-1), 1, generator=generator).squeeze(-1)
+
+    if _is_scalar(do_sample):
+        return sampled
+    return torch.where(do_sample.to(logits.device).bool(), sampled, greedy)
@@ -1,8 +1,10 @@
 from typing import Dict, List, Optional, Set, Union
 import re
 import os
+import numpy as np
 from transformers import PreTrainedTokenizer
 
+from src.utils.cache import LRUCache
 from src.vlm.grammar.sandhi import SandhiProcessor
 
 class SanskritTokenizer(PreTrainedTokenizer):
@@ -15,6 +17,10 @@ class SanskritTokenizer(PreTrainedTokenizer):
     
     model_input_names = ["input_ids", "attention_mask"]
     
+    # Approximate memory cap of the token cache; whole texts are cached, and
+    # long ones rarely recur
+    token_cache_bytes = 32 << 20
+    
     def __init__(
         self,
         vocab_file=None,
@@ -33,6 +39,9 @@ class SanskritTokenizer(PreTrainedTokenizer):
         # Initialize sandhi processor
         self.sandhi_processor = SandhiProcessor()
         
+        # Phonemic tokens of recently seen texts
+        self.token_cache = LRUCache(max_bytes=self.token_cache_bytes, name="tokenizer.tokenize")
+        
         # Sanskrit phonemes and phonetic categories
         # (In a full implementation, these would be much more comprehensive)
         self.vowels = ['a', 'ā', 'i', 'ī', 'u', 'ū', 'e', 'ai', 'o', 'au', 'ṛ', 'ṝ', 'ḷ', 'ḹ']
@@ -57,6 +66,16 @@ class SanskritTokenizer(PreTrainedTokenizer):
         # Build vocabulary
         self._create_vocab()
         
+        # Longest-match phoneme pattern: multi-codepoint phonemes such as 'kh'
+        # and 'ai' are tried before their first letter; anything else falls
+        # through as a single character
+        self.phonemes = frozenset(self.vowels + self.consonants + self.accents + self.special_chars)
+        phonemes = sorted(self.phonemes, key=len, reverse=True)
+        self.sanskrit_pattern = re.compile(
+            '|'.join(re.escape(p) for p in phonemes) + r'|.', re.DOTALL
+        )
+        self._build_codepoint_lookup()
+        
         # Standard transformers init
         super().__init__(
             unk_token=unk_token,
@@ -66,12 +85,6 @@ class SanskritTokenizer(PreTrainedTokenizer):
             mask_token=mask_token,
             **kwargs
         )
-        
-        # Regex pattern for basic Sanskrit tokenization
-        self.sanskrit_pattern = re.compile(r'([{}])|([{}])'.format(
-            ''.join(self.vowels + self.accents + self.special_chars),
-            ''.join(self.consonants)
-        ))
     
     def _create_vocab(self):
         """Create the vocabulary."""
@@ -89,6 +102,69 @@ class SanskritTokenizer(PreTrainedTokenizer):
             self.vocab[token] = i
             self.ids_to_tokens[i] = token
     
+    def _build_codepoint_lookup(self):
+        """Build the id lookup arrays used by the batched encoder."""
+        unk_id = self.vocab["<unk>"]
+        phonemes = set(self.vowels + self.consonants + self.accents + self.special_chars)
+        single = {token: index for token, index in self.vocab.items() if len(token) == 1}
+        size = max(ord(token) for token in single) + 1
+        self._codepoint_ids = np.full(size, unk_id, dtype=np.int64)
+        for token, index in single.items():
+            self._codepoint_ids[ord(token)] = index
+        
+        # Two-codepoint phonemes are looked up by a packed (first, second) key
+        digraphs = sorted(
+            ((ord(p[0]) << 21) | ord(p[1]), self.vocab[p]) for p in phonemes if len(p) == 2
+        )
+        self._digraph_keys = np.array([key for key, _ in digraphs], dtype=np.int64)
+        self._digraph_ids = np.array([index for _, index in digraphs], dtype=np.int64)
+        
+        # The array path tokenizes whole texts, which is only exact if no
+        # phoneme is longer than two codepoints and no sandhi boundary can fall
+        # inside a phoneme
+        boundary_chars = self.sandhi_processor.automaton.boundary_chars
+        self._array_path_exact = all(
+            len(p) <= 2 and not (len(p) == 2 and p[0] in boundary_chars)
+            for p in phonemes
+        )
+    
+    def _phoneme_ids(self, texts: List[str]):
+        """Encode texts to a flat id array plus the number of ids per text."""
+        unk_id = self.vocab["<unk>"]
+        if not self._array_path_exact:
+            encoded = [[self.vocab.get(t, unk_id) for t in self._tokenize(text)] for text in texts]
+            lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(texts))
+            return np.fromiter((i for ids in encoded for i in ids), dtype=np.int64), lengths
+        
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+        ids = np.full(len(codes), unk_id, dtype=np.int64)
+        known = codes < len(self._codepoint_ids)
+        ids[known] = self._codepoint_ids[codes[known]]
+        if len(codes) < 2 or not len(self._digraph_keys):
+            return ids, lengths
+        
+        # Candidate digraph starts, never spanning two texts
+        keys = (codes[:-1] << 21) | codes[1:]
+        slots = np.minimum(np.searchsorted(self._digraph_keys, keys), len(self._digraph_keys) - 1)
+        candidate = self._digraph_keys[slots] == keys
+        ends = np.cumsum(lengths)[:-1]
+        candidate[ends[(ends > 0) & (ends < len(codes))] - 1] = False
+        
+        # Greedy left-to-right matching takes every other start in a run of
+        # overlapping candidates, beginning with the first
+        index = np.arange(len(candidate))
+        run_start = np.maximum.accumulate(
+            np.where(candidate & ~np.concatenate(([False], candidate[:-1])), index, 0)
+        )
+        taken = candidate & ((index - run_start) % 2 == 0)
+        
+        ids[:-1][taken] = self._digraph_ids[slots[taken]]
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:][taken] = False
+        owner = np.repeat(np.arange(len(texts)), lengths)
+        return ids[keep], np.bincount(owner[keep], minlength=len(texts)).astype(np.int64)
+    
     @property
     def vocab_size(self) -> int:
         """Get the vocabulary size."""
@@ -112,6 +188,10 @@ class SanskritTokenizer(PreTrainedTokenizer):
         Returns:
             List of tokens
         """
+        return list(self.token_cache.get_or_compute(text, lambda: self._tokenize_uncached(text)))
+    
+    def _tokenize_uncached(self, text: str) -> tuple:
+        """Tokenize a text that is not in the token cache."""
         # First, try to split by sandhi rules
         words = self.sandhi_processor.reverse(text)
         
@@ -122,7 +202,7 @@ class SanskritTokenizer(PreTrainedTokenizer):
             word_tokens = self._tokenize_word(word)
             tokens.extend(word_tokens)
         
-        return tokens
+        return tuple(tokens)
     
     def _tokenize_word(self, word: str) -> List[str]:
         """Tokenize a single Sanskrit word into phonemic units.
@@ -133,9 +213,7 @@ class SanskritTokenizer(PreTrainedTokenizer):
         Returns:
             List of phonemic tokens
         """
-        # For now, use a simple character-based tokenization
-        # In a full implementation, we would handle consonant clusters, etc.
-        return list(word)
+        return self.sanskrit_pattern.findall(word)
     
     def _convert_token_to_id(self, token: str) -> int:
         """Convert token to vocabulary ID."""
@@ -146,17 +224,103 @@ class SanskritTokenizer(PreTrainedTokenizer):
         return self.ids_to_tokens.get(index, "<unk>")
     
     def convert_tokens_to_string(self, tokens: List[str]) -> str:
-        """Convert a list of tokens back to a string."""
-        # For Sanskrit, we need to handle sandhi when combining tokens
-        if not tokens:
-            return ""
+        """Convert a list of tokens back to a string.
+        
+        Phoneme tokens come from surface text, where sandhi has already
+        applied, so runs of them are spelled out unchanged. Sandhi is only
+        applied at the boundaries between other segments, such as whole
+        words, and the phoneme runs around them.
+        """
+        segments = []
+        word = []
+        for token in tokens:
+            if token in self.phonemes:
+                word.append(token)
+                continue
+            if word:
+                segments.append("".join(word))
+                word = []
+            segments.append(token)
+        if word:
+            segments.append("".join(word))
+        return self.sandhi_processor.join(segments)
+    
+    def batch_encode_fast(
+        self,
+        texts: List[str],
+        max_length: Optional[int] = None,
+        padding: Union[bool, str] = True,
+        truncation: bool = True,
+        add_special_tokens: bool = True,
+        return_tensors: str = "np",
+    ) -> Dict[str, Union[np.ndarray, List[np.ndarray]]]:
+        """Encode many texts at once with array operations.
+        
+        Produces the same ids as calling the tokenizer on each text, but maps
+        codepoints and digraphs through precomputed lookup arrays instead of
+        going through ``_tokenize`` and the per-token conversion machinery.
+        Sandhi splitting only inserts boundaries between phonemes, so it does
+        not change the ids and is skipped here.
+        
+        Args:
+            texts: Texts to encode
+            max_length: Maximum sequence length including special tokens
+            padding: True/"longest" pads to the longest sequence, "max_length"
+                pads to ``max_length`` and False returns unpadded arrays
+            truncation: Whether to truncate sequences to ``max_length``
+            add_special_tokens: Whether to add ``<s>`` and ``</s>``
+            return_tensors: "np" for NumPy arrays or "pt" for PyTorch tensors
+            
+        Returns:
+            Dict with ``input_ids`` and ``attention_mask``
+        """
+        num_texts = len(texts)
+        num_special = 2 if add_special_tokens else 0
+        
+        ids, lengths = self._phoneme_ids(texts)
+        starts = np.zeros(num_texts, dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        
+        keep = lengths
+        if truncation and max_length is not None:
+            keep = np.minimum(lengths, max(max_length - num_special, 0))
+        
+        if padding == "max_length" and max_length is not None:
+            width = max_length
+        else:
+            width = int(keep.max(initial=0)) + num_special
+        
+        input_ids = np.full((num_texts, width), self.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((num_texts, width), dtype=np.int64)
+        
+        # Scatter the kept ids of every row into the padded matrix
+        rows = np.repeat(np.arange(num_texts), keep)
+        offsets = np.arange(len(rows)) - np.repeat(np.cumsum(keep) - keep, keep)
+        columns = offsets + (1 if add_special_tokens else 0)
+        input_ids[rows, columns] = ids[np.repeat(starts, keep) + offsets]
+        
+        totals = keep + num_special
+        attention_mask[np.arange(width) < totals[:, None]] = 1
+        if add_special_tokens:
+            input_ids[:, 0] = self.cls_token_id
+            input_ids[np.arange(num_texts), totals - 1] = self.sep_token_id
         
-        text = tokens[0]
-        for token in tokens[1:]:
-            # Apply sandhi rules when combining tokens
-            text = self.sandhi_processor.apply(text, token)
+        if padding is False:
+            encoded = {
+                "input_ids": [row[:n] for row, n in zip(input_ids, totals)],
+                "attention_mask": [row[:n] for row, n in zip(attention_mask, totals)],
+            }
+        else:
+            encoded = {"input_ids": input_ids, "attention_mask": attention_mask}
         
-        return text
+        if return_tensors == "pt":
+            import torch
+            convert = torch.from_numpy
+            encoded = {
+                key: [convert(v) for v in value] if isinstance(value, list) else convert(value)
+                for key, value in encoded.items()
+            }
+        return encoded
     
     def save_vocabulary(self, save_directory: str, filename_prefix: Optional[str] = None) -> List[str]:
         """Save the vocabulary to a file."""
@@ -1,3 +1,34 @@
+import multiprocessing
+import os
+import sys
+import numpy as np
+
+from src.utils.cache import LRUCache, approx_size
+from src.vlm.grammar.loader import load_rule_base
+from src.vlm.grammar.parse import PARSE_FIELDS, ParsedSentence, ParseVocabulary
+from src.vlm.grammar.rules import CompiledRuleBase, WordAnalysis
+
+# Per-process engine used by the batch APIs, created by the pool initializer
+_worker_engine = None
+
+def _init_worker(rules, meta_rules, compiled):
+    """Build a worker engine with the parent's compiled rule base."""
+    global _worker_engine
+    _worker_engine = AshtadhyayiEngine()
+    _worker_engine.rules = rules
+    _worker_engine.meta_rules = meta_rules
+    _worker_engine._set_compiled(compiled)
+
+def _analysis_size(text, analysis):
+    """Approximate memory of a cached sentence analysis, per-word analyses included."""
+    return approx_size(text, analysis) + sum(map(approx_size, *analysis))
+
+def _run_chunk(task):
+    """Apply one engine method to a chunk of sentences."""
+    method, sentences = task
+    fn = getattr(_worker_engine, method)
+    return [fn(sentence) for sentence in sentences]
+
 class AshtadhyayiEngine:
     """Implementation of Pāṇini's Aṣṭādhyāyī grammar system.
     
@@ -5,14 +36,62 @@ class AshtadhyayiEngine:
     in the Aṣṭādhyāyī, for validating and correcting text generations.
     """
     
-    def __init__(self):
-        """Initialize rule engine with Aṣṭādhyāyī rules."""
+    # Rule used to supply the nominative ending of bare a-stems
+    CORRECTION_RULE = "case_endings/masculine/nom_sg"
+    
+    # Word-class attributes reported by parse_sentence
+    PARSE_FIELDS = PARSE_FIELDS
+    
+    def __init__(self, rules_path=None, cache_path=None, cache_size=65536, cache_bytes=64 << 20):
+        """Initialize rule engine with Aṣṭādhyāyī rules.
+        
+        Args:
+            rules_path: Optional rule file (JSON/YAML) replacing the built-in
+                subset, see ``load_rules``
+            cache_path: Optional location of the compiled rule cache
+            cache_size: Sentences whose analyses are memoized
+            cache_bytes: Approximate memory cap of the memoized analyses, which
+                grow with sentence length
+        """
         # Initialize rule dictionaries
         self.rules = {}
         self.meta_rules = {}
         
+        # Sentence analyses are memoized: refrains and formulaic pādas recur
+        self.analysis_cache = LRUCache(maxsize=cache_size, max_bytes=cache_bytes,
+                                       name="ashtadhyayi.analyses", sizeof=_analysis_size)
+        
+        if rules_path:
+            self.load_rules(rules_path, cache_path=cache_path)
+            return
+        
         # Initialize basic Aṣṭādhyāyī rules
         self._initialize_rules()
+        
+        # Compile once: every later lookup goes through the suffix index
+        self.compile_rules()
+    
+    @classmethod
+    def from_config(cls, config):
+        """Create an engine from a VLMConfig, honouring ``grammar_rules_path``."""
+        return cls(rules_path=config.grammar_rules_path)
+    
+    def load_rules(self, path, cache_path=None, use_cache=True):
+        """Replace the rule base with the contents of a rule file.
+        
+        The compiled rule base is cached in a versioned binary file keyed on
+        the rule file's content hash, so only the first load of a given file
+        pays for parsing and compilation.
+        
+        Args:
+            path: Rule file (JSON, or YAML with PyYAML installed)
+            cache_path: Cache location; defaults to a file next to ``path``
+            use_cache: Whether to read and write the cache
+        """
+        self.rules, self.meta_rules, compiled = load_rule_base(
+            path, cache_path=cache_path, use_cache=use_cache
+        )
+        self._set_compiled(compiled)
     
     def _initialize_rules(self):
         """Initialize the basic set of Aṣṭādhyāyī rules."""
@@ -67,6 +146,18 @@ class AshtadhyayiEngine:
             }
         }
         
+        # Word-final suffix classes used to analyse words
+        self.rules["word_classes"] = {
+            # Present tense verbs (3rd person plural / singular)
+            "verb_present_pl": {"pattern": r"nti$", "pos": "verb", "tense": "present", "number": "plural"},
+            "verb_present_sg": {"pattern": r"ti$", "pos": "verb", "tense": "present", "number": "singular"},
+            # Nominative (visarga) and accusative (anusvāra/m) nouns
+            "noun_nominative": {"pattern": r"ḥ$", "pos": "noun", "case": "nominative", "gender": "masculine"},
+            "noun_accusative": {"pattern": r"m$", "pos": "noun", "case": "accusative"},
+            # Feminine ā-stem forms, valid as fragments
+            "feminine_stem": {"pattern": r"ā$"},
+        }
+        
         # Meta-rules (Paribhāṣā)
         self.meta_rules = {
             # Rule of proximity - apply closest rule first
@@ -75,6 +166,61 @@ class AshtadhyayiEngine:
             "specificity": {"priority": 2},
         }
     
+    def compile_rules(self):
+        """Compile the rule base into indexed form.
+        
+        Also fixes the precedence order of conflicting rules from the
+        meta-rules, sūtra numbers and ``overrides`` attributes. Must be called
+        again after ``self.rules`` or ``self.meta_rules`` is modified.
+        """
+        self._set_compiled(CompiledRuleBase(self.rules, self.meta_rules))
+    
+    def _set_compiled(self, compiled):
+        """Install a compiled rule base and everything derived from it."""
+        self.compiled = compiled
+        self.parse_vocab = ParseVocabulary(compiled.rules, self.PARSE_FIELDS)
+        self.analysis_cache.clear()
+    
+    def analyze_word(self, word):
+        """Look up every applicable suffix rule for a word in one trie walk.
+        
+        Args:
+            word: A single word
+            
+        Returns:
+            WordAnalysis: Matched rules, word class and available correction
+        """
+        return WordAnalysis(word, self.compiled.lookup(word), self.CORRECTION_RULE)
+    
+    def _analyze_words(self, text):
+        """Split text into words and analyse each one once.
+        
+        Results are memoized per text and shared, so they are immutable tuples.
+        """
+        return self.analysis_cache.get_or_compute(text, lambda: self._analyze_uncached(text))
+    
+    def _analyze_uncached(self, text):
+        # Interned: the same few thousand forms recur across millions of parses
+        words = tuple(map(sys.intern, text.split()))
+        return words, tuple(self.analyze_word(word) for word in words)
+    
+    def analyze(self, text):
+        """Validate, correct and parse a text from a single analysis pass.
+        
+        Args:
+            text: The text to analyse
+            
+        Returns:
+            dict: ``valid`` (bool), ``corrected`` (str) and ``parse``
+            (ParsedSentence)
+        """
+        words, analyses = self._analyze_words(text)
+        return {
+            "valid": self._validate(analyses),
+            "corrected": self._correct(words, analyses),
+            "parse": self._parse(text, words, analyses),
+        }
+    
     def validate(self, text):
         """Validate a generated text against Pāṇinian grammar rules.
         
@@ -84,36 +230,19 @@ class AshtadhyayiEngine:
         Returns:
             bool: Whether the text is grammatically valid
         """
-        # In a full implementation, this would perform comprehensive grammatical validation
-        # For now, we'll implement some basic checks
-        
-        # Check for basic sentence structure (subject-object-verb)
-        # Sanskrit is primarily SOV language
-        words = text.split()
-        
-        # Very basic check: if there are 3+ words, check if the last one ends with 'ti' (common verb ending)
-        if len(words) >= 3:
-            # Check if last word looks like a verb (ends with ti/nti for present tense)
-            last_word = words[-1]
-            if last_word.endswith('ti') or last_word.endswith('nti'):
-                # Check if there's a word that looks like a subject (ends with ḥ for masculine nominative)
-                potential_subject = False
-                for word in words[:-1]:
-                    if word.endswith('ḥ') or word.endswith('m'):
-                        potential_subject = True
-                        break
-                
-                if potential_subject:
-                    return True
-        
-        # Fallback to a simpler validation for short phrases
-        if len(words) <= 2:
-            # For short phrases, we'll just check if they make sense as fragments
-            valid_endings = ['ḥ', 'm', 'ām', 'ā', 'ti', 'nti']
-            for word in words:
-                for ending in valid_endings:
-                    if word.endswith(ending):
-                        return True
+        return self._validate(self._analyze_words(text)[1])
+    
+    def _validate(self, analyses):
+        """Check sentence structure from per-word analyses."""
+        # Sanskrit is primarily SOV: with 3+ words, expect a final verb
+        # (ti/nti) and a subject-like noun (ḥ or m) before it
+        if len(analyses) >= 3:
+            if analyses[-1].is_verb and any(a.is_noun for a in analyses[:-1]):
+                return True
+        
+        # Short phrases are accepted as fragments if any word has a known ending
+        if len(analyses) <= 2:
+            return any(a.has_valid_ending for a in analyses)
         
         # If no valid structure was found
         return False
@@ -127,31 +256,29 @@ class AshtadhyayiEngine:
         Returns:
             str: The corrected text
         """
-        # In a full implementation, this would apply grammar rules to fix issues
-        # For now, we'll implement some basic corrections
-        
-        words = text.split()
-        
-        # Simple rule: if the last word doesn't look like a verb, 
-        # find a word that might be a verb and move it to the end
-        if len(words) >= 2:
-            last_word = words[-1]
-            if not (last_word.endswith('ti') or last_word.endswith('nti')):
-                for i, word in enumerate(words[:-1]):
-                    if word.endswith('ti') or word.endswith('nti'):
-                        # Move verb to the end
-                        verb = words.pop(i)
-                        words.append(verb)
-                        break
-        
-        # Apply case correction: ensure nouns have proper endings
-        for i, word in enumerate(words):
-            # Check for neuter words missing visarga
-            if word.endswith('a') and i < len(words) - 1:  # Not the verb
-                words[i] = word + 'ḥ'  # Add visarga for nominative case
+        return self._correct(*self._analyze_words(text))
+    
+    def _correct(self, words, analyses):
+        """Apply corrections from per-word analyses."""
+        words = list(words)
+        analyses = list(analyses)
+        
+        # If the last word doesn't look like a verb, move the first verb to the end
+        if len(words) >= 2 and not analyses[-1].is_verb:
+            for i, analysis in enumerate(analyses[:-1]):
+                if analysis.is_verb:
+                    words.append(words.pop(i))
+                    analyses.append(analyses.pop(i))
+                    break
+        
+        # Apply case correction: bare a-stems before the verb take the
+        # nominative singular ending
+        for i, analysis in enumerate(analyses[:-1]):
+            if analysis.correction is not None:
+                words[i] = analysis.correction.apply(words[i])
         
         return ' '.join(words)
-
+    
     def parse_sentence(self, text):
         """Parse a Sanskrit sentence into its grammatical components.
         
@@ -159,41 +286,156 @@ class AshtadhyayiEngine:
             text: The text to parse
             
         Returns:
-            dict: A dictionary with the grammatical analysis
+            ParsedSentence: Columnar analysis; ``to_dict()`` gives the
+            ``{"sentence", "words": [dict, ...]}`` format
         """
-        # This would be a complex implementation in a full engine
-        # For now, we'll provide a simplified parsing
+        return self._parse(text, *self._analyze_words(text))
+    
+    def _parse_columns(self, text):
+        """Text, words and codes of a parse, without its vocabulary.
         
-        words = text.split()
-        analysis = {
-            "sentence": text,
-            "words": [],
-        }
+        Batch workers return these, so parses are rebuilt around the
+        parent's ``parse_vocab`` instead of one unpickled copy per chunk.
+        """
+        parse = self.parse_sentence(text)
+        return parse.sentence, parse.words, parse._codes
+    
+    def _parse(self, text, words, analyses):
+        """Build the columnar parse from per-word analyses."""
+        row = self.parse_vocab.row
+        # Words without a part of speech are reported as unknown only
+        rows = [row(a.word_class if a.pos is not None else None) for a in analyses]
+        return ParsedSentence.from_rows(text, tuple(words), rows, self.parse_vocab)
+    
+    def derive(self, form, trace=False, groups=None, max_steps=64):
+        """Derive a form by repeatedly applying the winning rule.
         
-        for word in words:
-            word_analysis = {"text": word}
+        At every step the applicable rules come from the precomputed
+        precedence order, and the first one that changes the form fires.
+        Each rule fires at most once per derivation, which guarantees
+        termination.
+        
+        Args:
+            form: Starting form
+            trace: Whether to also return the rules fired
+            groups: Optional rule groups to restrict the derivation to
+            max_steps: Maximum number of rule applications
             
-            # Simple part-of-speech detection
-            if word.endswith('ti') or word.endswith('nti'):
-                word_analysis["pos"] = "verb"
-                word_analysis["tense"] = "present"
-                if word.endswith('nti'):
-                    word_analysis["number"] = "plural"
-                else:
-                    word_analysis["number"] = "singular"
+        Returns:
+            str, or (str, list) with ``trace=True``: the derived form and one
+            dict per step with the rule id, sūtra number and the form before
+            and after
+        """
+        fired = set()
+        steps = [] if trace else None
+        
+        for _ in range(max_steps):
+            for rule in self.compiled.resolve(form):
+                if rule.replacement is None or rule.rule_id in fired:
+                    continue
+                if groups is not None and rule.group not in groups:
+                    continue
+                result = rule.apply(form)
+                if result != form:
+                    break
+            else:
+                break
             
-            elif word.endswith('ḥ'):
-                word_analysis["pos"] = "noun"
-                word_analysis["case"] = "nominative"
-                word_analysis["gender"] = "masculine"
+            fired.add(rule.rule_id)
+            if trace:
+                steps.append({
+                    "rule": rule.rule_id,
+                    "sutra": rule.attributes.get("sutra", rule.attributes.get("id")),
+                    "before": form,
+                    "after": result,
+                })
+            form = result
+        
+        return (form, steps) if trace else form
+    
+    def _run_batch(self, method, sentences, num_workers=None, chunksize=256):
+        """Run an engine method over deduplicated sentences.
+        
+        Args:
+            method: Name of the per-sentence method
+            sentences: Iterable of sentences
+            num_workers: Worker processes; defaults to the CPU count, and 0 or
+                1 runs in the current process
+            chunksize: Sentences sent to a worker per task
             
-            elif word.endswith('m'):
-                word_analysis["pos"] = "noun"
-                word_analysis["case"] = "accusative"
+        Returns:
+            tuple: (index, results) where ``results[index[i]]`` is the result
+            for the i-th input sentence
+        """
+        unique = {}
+        index = np.fromiter(
+            (unique.setdefault(sentence, len(unique)) for sentence in sentences),
+            dtype=np.int64
+        )
+        texts = list(unique)
+        
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        
+        # Small batches are not worth the cost of starting a pool
+        if num_workers <= 1 or len(texts) <= chunksize:
+            fn = getattr(self, method)
+            return index, [fn(text) for text in texts]
+        
+        tasks = [(method, texts[i:i + chunksize]) for i in range(0, len(texts), chunksize)]
+        with multiprocessing.Pool(
+            num_workers, initializer=_init_worker, initargs=(self.rules, self.meta_rules, self.compiled)
+        ) as pool:
+            chunks = pool.map(_run_chunk, tasks)
+        return index, [result for chunk in chunks for result in chunk]
+    
+    def validate_batch(self, sentences, num_workers=None, chunksize=256):
+        """Validate many sentences at once.
+        
+        Identical sentences are validated once and the work is spread over a
+        process pool in chunks.
+        
+        Args:
+            sentences: Iterable of sentences
+            num_workers: Worker processes (0 or 1 runs in-process)
+            chunksize: Sentences per worker task
             
-            else:
-                word_analysis["pos"] = "unknown"
+        Returns:
+            np.ndarray: Boolean mask, True where the sentence is valid
+        """
+        index, results = self._run_batch("validate", sentences, num_workers, chunksize)
+        return np.array(results, dtype=bool)[index] if len(index) else np.zeros(0, dtype=bool)
+    
+    def correct_batch(self, sentences, num_workers=None, chunksize=256):
+        """Correct many sentences at once.
+        
+        Args:
+            sentences: Iterable of sentences
+            num_workers: Worker processes (0 or 1 runs in-process)
+            chunksize: Sentences per worker task
             
-            analysis["words"].append(word_analysis)
+        Returns:
+            tuple: (ids, corrections) where ``corrections[ids[i]]`` is the
+            corrected form of the i-th sentence
+        """
+        index, results = self._run_batch("correct", sentences, num_workers, chunksize)
+        unique = {}
+        ids = np.fromiter((unique.setdefault(r, len(unique)) for r in results), dtype=np.int64)
+        return (ids[index] if len(index) else ids), list(unique)
+    
+    def parse_batch(self, sentences, num_workers=None, chunksize=256):
+        """Parse many sentences at once.
         
-        return analysis
\ No newline at end of file
+        Args:
+            sentences: Iterable of sentences
+            num_workers: Worker processes (0 or 1 runs in-process)
+            chunksize: Sentences per worker task
+            
+        Returns:
+            tuple: (ids, parses) where ``parses[ids[i]]`` is the parse of the
+            i-th sentence; each distinct sentence is parsed once, and every
+            parse shares this engine's ``parse_vocab``
+        """
+        index, columns = self._run_batch("_parse_columns", sentences, num_workers, chunksize)
+        return index, [ParsedSentence(text, words, codes, self.parse_vocab) for text, words, codes in columns]
+
@@ -0,0 +1,133 @@
+from typing import Dict, Iterable, List, Set
+
+
+class SandhiAutomaton:
+    """Aho–Corasick automaton for locating sandhi split points.
+
+    The automaton is compiled once from the sandhi result patterns and the
+    word-ending markers of a :class:`SandhiProcessor`. Splitting a text is then
+    a single left-to-right pass with one table lookup per character, instead of
+    re-testing every ending and rule at every position.
+    """
+
+    def __init__(self, patterns: Iterable[str], endings: Iterable[str], window: int = 3):
+        """Compile the automaton.
+
+        Args:
+            patterns: Sandhi result patterns (the keys of the rule dicts)
+            endings: Word-ending markers that may close a segment
+            window: Longest pattern that can be matched at a boundary; the
+                reference splitter only inspects the last ``window`` characters
+        """
+        self.window = window
+        self.patterns = sorted({p for p in patterns if p and len(p) <= window})
+        self.endings = sorted({e for e in endings if e})
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._rule_len: List[float] = [float("inf")]
+        self._ending_len: List[float] = [float("inf")]
+
+        for pattern in self.patterns:
+            state = self._insert(pattern)
+            self._rule_len[state] = min(self._rule_len[state], len(pattern))
+        for ending in self.endings:
+            state = self._insert(ending)
+            self._ending_len[state] = min(self._ending_len[state], len(ending))
+
+        self._build()
+
+    def _insert(self, word: str) -> int:
+        """Add a word to the trie and return its final state."""
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._rule_len.append(float("inf"))
+                self._ending_len.append(float("inf"))
+            state = nxt
+        return state
+
+    def _build(self):
+        """Compute failure links and resolve them into a full transition table."""
+        alphabet = {ch for edges in self._goto for ch in edges}
+        fail = [0] * len(self._goto)
+        self._delta: List[Dict[str, int]] = [dict() for _ in self._goto]
+
+        # Breadth-first so that every failure target is resolved before use
+        order = list(self._goto[0].values())
+        self._delta[0] = dict(self._goto[0])
+
+        head = 0
+        while head < len(order):
+            state = order[head]
+            head += 1
+            # Inherit the shortest match reachable through the failure link
+            self._rule_len[state] = min(self._rule_len[state], self._rule_len[fail[state]])
+            self._ending_len[state] = min(self._ending_len[state], self._ending_len[fail[state]])
+            for ch in alphabet:
+                nxt = self._goto[state].get(ch)
+                if nxt is not None:
+                    fail[nxt] = self._delta[fail[state]].get(ch, 0)
+                    order.append(nxt)
+                    self._delta[state][ch] = nxt
+                else:
+                    target = self._delta[fail[state]].get(ch, 0)
+                    if target:
+                        self._delta[state][ch] = target
+
+        # A boundary needs both an ending and a rule pattern inside the
+        # current segment, so only the longer of the two shortest matches matters
+        self._need = [max(r, e) for r, e in zip(self._rule_len, self._ending_len)]
+
+    @property
+    def boundary_chars(self) -> Set[str]:
+        """Characters after which a segment can be closed.
+
+        A boundary needs a rule pattern and a word ending that both end at the
+        current character, so only their shared final characters qualify.
+        """
+        return {p[-1] for p in self.patterns} & {e[-1] for e in self.endings}
+
+    def split_points(self, text: str) -> List[int]:
+        """Find the offsets at which ``text`` is split.
+
+        Args:
+            text: Text with sandhi combinations
+
+        Returns:
+            list: Increasing end offsets of each closed segment
+        """
+        delta = self._delta
+        need = self._need
+        points = []
+        state = 0
+        start = 0
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if need[state] <= i + 1 - start:
+                start = i + 1
+                points.append(start)
+        return points
+
+    def split(self, text: str) -> List[str]:
+        """Split text into segments at the detected sandhi boundaries.
+
+        Args:
+            text: Text with sandhi combinations
+
+        Returns:
+            list: Segments whose concatenation is ``text``
+        """
+        points = self.split_points(text)
+        if not points or points[-1] != len(text):
+            points.append(len(text))
+
+        segments = []
+        start = 0
+        for end in points:
+            segments.append(text[start:end])
+            start = end
+        return segments
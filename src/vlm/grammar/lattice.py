@@ -0,0 +1,214 @@
+import heapq
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Longest surface word the lattice proposes by default. Real words and
+# compound members are far shorter, and the bound keeps the lattice linear in
+# the text length instead of quadratic
+DEFAULT_MAX_WORD_LENGTH = 40
+
+class SandhiScorer:
+    """Default scoring model for candidate sandhi segmentations.
+
+    Scores are additive log-domain values: every word and every reversed
+    junction contributes a term, so the best segmentation can be found with
+    dynamic programming over the lattice.
+    """
+
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None, word_endings=None,
+                 ending_bonus: float = 1.0, split_penalty: float = 0.75,
+                 unknown_word_score: float = -10.0):
+        """Initialize the scorer.
+
+        Args:
+            lexicon: Optional mapping of word -> log-probability
+            word_endings: Endings that mark a plausible word when no lexicon is given
+            ending_bonus: Score for a word ending in one of ``word_endings``
+            split_penalty: Cost paid for every junction that is undone
+            unknown_word_score: Score for words missing from ``lexicon``
+        """
+        self.lexicon = lexicon
+        self.word_endings = tuple(word_endings or ())
+        self.ending_bonus = ending_bonus
+        self.split_penalty = split_penalty
+        self.unknown_word_score = unknown_word_score
+        self._word_scores = {}
+
+    def word_score(self, word: str) -> float:
+        """Score a single candidate word."""
+        score = self._word_scores.get(word)
+        if score is None:
+            if self.lexicon is not None:
+                score = self.lexicon.get(word, self.unknown_word_score)
+            elif word.endswith(self.word_endings):
+                score = self.ending_bonus
+            else:
+                score = 0.0
+            self._word_scores[word] = score
+        return score
+
+    def junction_score(self, pattern: str, num_alternatives: int) -> float:
+        """Score undoing a junction that has ``num_alternatives`` readings."""
+        return -self.split_penalty - math.log(num_alternatives)
+
+
+class SandhiLattice:
+    """Lattice (DAG) of every candidate sandhi segmentation of a text.
+
+    Nodes are ``(position, carry)`` pairs: ``position`` indexes the surface
+    text and ``carry`` is the restored initial of the next word (e.g. ``'i'``
+    after splitting ``e`` into ``a + i``). Each edge emits one word. Shared
+    sub-spans are represented once, so the lattice stays polynomial in the
+    text length even though the number of paths is exponential.
+
+    Words split off at a junction are at most ``max_word_length`` characters
+    long, so every node has a bounded number of edges. The unsplit remainder
+    of a word is always a candidate, whatever its length, so every text has
+    at least one segmentation.
+    """
+
+    def __init__(self, text: str, reversal_rules: Dict[str, List[Tuple[str, str]]],
+                 max_word_length: Optional[int] = DEFAULT_MAX_WORD_LENGTH):
+        """Build the lattice.
+
+        Args:
+            text: Text with sandhi combinations
+            reversal_rules: Mapping of result pattern -> [(first, second), ...]
+            max_word_length: Bound on the surface length of a word split off
+                at a junction (None for no bound)
+        """
+        self.text = text
+        self.max_word_length = max_word_length
+        self.final = (len(text), None)
+        self.start = self._node(0, "")
+
+        # Junction occurrences indexed by start position
+        self._junctions: Dict[int, List[Tuple[str, str, str]]] = {}
+        for pattern, replacements in reversal_rules.items():
+            pos = text.find(pattern)
+            while pos != -1:
+                for first, second in replacements:
+                    self._junctions.setdefault(pos, []).append((pattern, first, second))
+                pos = text.find(pattern, pos + 1)
+        self._alternatives = {p: len(r) for p, r in reversal_rules.items()}
+
+        # Adjacency: node -> {(target, word): [pattern or None, ...]}; several
+        # junctions can emit the same edge, and the scorer picks between them
+        self.edges: Dict[Tuple[int, Optional[str]], Dict[Tuple[tuple, str], List[Optional[str]]]] = {}
+        self._build()
+
+    def _build(self):
+        """Expand every reachable node once."""
+        text = self.text
+        # Words never extend across whitespace: word_ends[i] is the first
+        # whitespace (or the end of the text) at or after i
+        word_ends = [len(text)] * (len(text) + 1)
+        for i in range(len(text) - 1, -1, -1):
+            word_ends[i] = i if text[i].isspace() else word_ends[i + 1]
+
+        pending = [self.start] if self.start != self.final else []
+        seen = set(pending)
+        while pending:
+            node = pending.pop()
+            position, carry = node
+            out = self.edges.setdefault(node, {})
+
+            end = word_ends[position]
+            limit = end
+            if self.max_word_length is not None:
+                limit = min(end, position + self.max_word_length)
+
+            targets = []
+            for q in range(position + 1, limit):
+                for pattern, first, second in self._junctions.get(q, ()):
+                    resume = q + len(pattern)
+                    # A restored initial needs surface text to attach to
+                    if resume > end or (resume == end and second):
+                        continue
+                    word = carry + text[position:q] + first
+                    targets.append((self._node(resume, second), word, pattern))
+
+            # Close the word at the whitespace or at the end of the text; a
+            # whole unsplit word is always a candidate
+            word = carry + text[position:end]
+            whole = not carry and (position == 0 or text[position - 1].isspace())
+            if word and (limit == end or whole):
+                targets.append((self._node(end, ""), word, None))
+
+            for target, word, pattern in targets:
+                patterns = out.setdefault((target, word), [])
+                if pattern not in patterns:
+                    patterns.append(pattern)
+                if target != self.final and target not in seen:
+                    seen.add(target)
+                    pending.append(target)
+
+    def _junction_gain(self, pattern: Optional[str], scorer) -> float:
+        """Score of undoing ``pattern`` (0 for a word closed without a junction)."""
+        return 0.0 if pattern is None else scorer.junction_score(pattern, self._alternatives[pattern])
+
+    def _node(self, position: int, carry: str):
+        """Canonical node for a word starting at ``position``."""
+        if not carry:
+            while position < len(self.text) and self.text[position].isspace():
+                position += 1
+            if position == len(self.text):
+                return self.final
+        return (position, carry)
+
+    def _topological_nodes(self):
+        """Nodes ordered by position; every edge moves strictly forward."""
+        return sorted(self.edges, key=lambda node: (node[0], node[1] or ""))
+
+    def num_paths(self) -> int:
+        """Count the segmentations encoded by the lattice."""
+        if self.start == self.final:
+            return 1
+        counts = {self.start: 1}
+        for node in self._topological_nodes():
+            count = counts.get(node, 0)
+            if not count:
+                continue
+            for (target, _word) in self.edges[node]:
+                counts[target] = counts.get(target, 0) + count
+        return counts.get(self.final, 0)
+
+    def k_best(self, k: int = 5, scorer: Optional[Callable] = None) -> List[Tuple[List[str], float]]:
+        """Find the ``k`` highest-scoring segmentations (k-best Viterbi).
+
+        Args:
+            k: Number of segmentations to return
+            scorer: Object with ``word_score`` and ``junction_score`` methods
+
+        Returns:
+            list: ``(segments, score)`` tuples, best first
+        """
+        scorer = scorer or SandhiScorer()
+        if self.start == self.final:
+            return [([], 0.0)]
+
+        # Each node keeps its k best partial paths as (score, prev_node, prev_rank, word)
+        best: Dict[tuple, List[Tuple[float, Optional[tuple], int, Optional[str]]]] = {
+            self.start: [(0.0, None, 0, None)]
+        }
+        for node in self._topological_nodes():
+            entries = best.get(node)
+            if not entries:
+                continue
+            entries = heapq.nlargest(k, entries, key=lambda e: e[0])
+            best[node] = entries
+            for (target, word), patterns in self.edges[node].items():
+                gain = scorer.word_score(word) + max(self._junction_gain(pattern, scorer) for pattern in patterns)
+                candidates = best.setdefault(target, [])
+                for rank, entry in enumerate(entries):
+                    candidates.append((entry[0] + gain, node, rank, word))
+
+        finals = heapq.nlargest(k, best.get(self.final, []), key=lambda e: e[0])
+        results = []
+        for score, node, rank, word in finals:
+            words = [word]
+            while node != self.start:
+                _, node, rank, word = best[node][rank]
+                words.append(word)
+            results.append((words[::-1], score))
+        return results
@@ -0,0 +1,128 @@
+import gc
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from typing import Dict, Optional, Tuple
+
+from src.vlm.grammar.rules import CompiledRuleBase
+
+# Bump whenever the pickled layout of CompiledRuleBase/CompiledRule changes
+RULE_CACHE_VERSION = 2
+
+# Leading bytes of every cache file
+_CACHE_MAGIC = b"VLMRULES"
+
+def read_rule_file(path: str) -> Tuple[Dict, Dict]:
+    """Parse a rule file.
+
+    The file is JSON, or YAML when it ends in ``.yaml``/``.yml`` (requires
+    PyYAML). It holds either a mapping with a ``rules`` key and an optional
+    ``meta_rules`` key, or just the nested rules mapping itself, in the
+    ``AshtadhyayiEngine.rules`` format.
+
+    Args:
+        path: Path of the rule file
+
+    Returns:
+        tuple: (rules, meta_rules)
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("PyYAML is required to load YAML rule files") from e
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    if not isinstance(data, dict):
+        raise ValueError(f"Rule file {path} must contain a mapping")
+    if "rules" in data:
+        return data["rules"], data.get("meta_rules", {})
+    return data, {}
+
+def default_cache_path(path: str) -> str:
+    """Cache file written next to a rule file."""
+    return f"{path}.v{RULE_CACHE_VERSION}.cache"
+
+def _content_hash(path: str) -> bytes:
+    """SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+def _header(content_hash: bytes) -> bytes:
+    return _CACHE_MAGIC + RULE_CACHE_VERSION.to_bytes(4, "little") + content_hash
+
+def _read_cache(cache_path: str, content_hash: bytes):
+    """Return the cached payload, or None if it is missing or stale."""
+    header = _header(content_hash)
+    # Unpickling allocates thousands of container objects at once; pausing
+    # the cyclic collector avoids repeated full scans while they are built
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(cache_path, "rb") as f:
+            if f.read(len(header)) != header:
+                return None
+            return pickle.load(f)
+    except Exception:
+        # A damaged cache can fail to unpickle in many ways; rebuild it
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def _write_cache(cache_path: str, content_hash: bytes, payload):
+    """Write the cache atomically so concurrent readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(cache_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_header(content_hash))
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def load_rule_base(path: str, cache_path: Optional[str] = None,
+                   use_cache: bool = True) -> Tuple[Dict, Dict, CompiledRuleBase]:
+    """Load and compile a rule file, going through a binary cache.
+
+    The cache holds the parsed rules together with their compiled form and is
+    keyed on the rule file's content hash and ``RULE_CACHE_VERSION``, so any
+    edit to the file (or to the compiled layout) triggers a rebuild. An
+    unreadable or unwritable cache is never fatal.
+
+    Args:
+        path: Path of the rule file
+        cache_path: Cache location; defaults to ``default_cache_path(path)``
+        use_cache: Whether to read and write the cache
+
+    Returns:
+        tuple: (rules, meta_rules, compiled)
+    """
+    content_hash = _content_hash(path)
+    cache_path = cache_path or default_cache_path(path)
+
+    if use_cache:
+        payload = _read_cache(cache_path, content_hash)
+        if payload is not None:
+            return payload
+
+    rules, meta_rules = read_rule_file(path)
+    payload = (rules, meta_rules, CompiledRuleBase(rules, meta_rules))
+
+    if use_cache:
+        try:
+            _write_cache(cache_path, content_hash, payload)
+        except OSError:
+            pass
+    return payload
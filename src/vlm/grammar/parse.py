@@ -0,0 +1,189 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Word-class attributes reported by a parse, in column order
+PARSE_FIELDS = ("pos", "case", "gender", "number", "tense")
+
+# Reported for words without a part of speech
+UNKNOWN_POS = "unknown"
+
+class ParseVocabulary:
+    """Interned codes for the values of every parse field.
+
+    Code 0 means "absent"; the values found in a rule base get codes 1..255
+    in rule base order, so engines compiled from the same rules agree on the
+    codes (worker processes included).
+    """
+
+    __slots__ = ("fields", "values", "codes", "_rows")
+
+    def __init__(self, rules: Sequence, fields: Sequence[str] = PARSE_FIELDS):
+        """Collect the field values of a rule base.
+
+        Args:
+            rules: Compiled rules whose attributes hold the field values
+            fields: Parse fields, in column order
+
+        Raises:
+            ValueError: If a field has more than 255 distinct values
+        """
+        self.fields = tuple(fields)
+        self.values: Tuple[List[Optional[str]], ...] = tuple([None] for _ in self.fields)
+        self.codes: Tuple[Dict[str, int], ...] = tuple({} for _ in self.fields)
+        self._rows: Dict[str, bytes] = {}
+
+        for rule in rules:
+            row = bytearray(len(self.fields))
+            for f, field in enumerate(self.fields):
+                value = rule.attributes.get(field)
+                if value is None:
+                    continue
+                code = self.codes[f].get(value)
+                if code is None:
+                    code = len(self.values[f])
+                    if code > 255:
+                        raise ValueError(f"Parse field {field!r} has more than 255 values")
+                    self.codes[f][value] = code
+                    self.values[f].append(value)
+                row[f] = code
+            self._rows[rule.rule_id] = bytes(row)
+        self._rows[None] = bytes(len(self.fields))
+
+    def row(self, rule) -> bytes:
+        """Codes of a word-class rule (all zero for None)."""
+        return self._rows[rule.rule_id if rule is not None else None]
+
+    def value(self, field: int, code: int) -> Optional[str]:
+        """Decode one code of a field."""
+        return self.values[field][code]
+
+class ParsedWord:
+    """Lightweight view of one word of a ParsedSentence."""
+
+    __slots__ = ("_sentence", "_index")
+
+    def __init__(self, sentence: "ParsedSentence", index: int):
+        self._sentence = sentence
+        self._index = index
+
+    @property
+    def text(self) -> str:
+        return self._sentence.words[self._index]
+
+    def code(self, field: str) -> int:
+        """Interned code of a field (0 when absent)."""
+        return self._sentence.codes(field)[self._index]
+
+    def get(self, field: str) -> Optional[str]:
+        """Value of a field, or None when absent."""
+        sentence = self._sentence
+        f = sentence.vocab.fields.index(field)
+        return sentence.vocab.value(f, sentence.codes(field)[self._index])
+
+    @property
+    def pos(self) -> str:
+        return self.get("pos") or UNKNOWN_POS
+
+    @property
+    def case(self) -> Optional[str]:
+        return self.get("case")
+
+    @property
+    def gender(self) -> Optional[str]:
+        return self.get("gender")
+
+    @property
+    def number(self) -> Optional[str]:
+        return self.get("number")
+
+    @property
+    def tense(self) -> Optional[str]:
+        return self.get("tense")
+
+    def to_dict(self) -> Dict[str, str]:
+        """The word in the legacy dict format."""
+        return self._sentence._word_dict(self._index)
+
+    def __repr__(self):
+        return f"ParsedWord({self.to_dict()!r})"
+
+class ParsedSentence:
+    """Columnar parse of a sentence.
+
+    Words are kept as one tuple of strings. The fields are parallel columns
+    of one-byte interned codes, stored field-major in a single ``bytes``
+    object. Per-word dicts are only built by ``to_dict``.
+    """
+
+    __slots__ = ("sentence", "words", "vocab", "_codes")
+
+    def __init__(self, sentence: str, words: Tuple[str, ...], codes: bytes, vocab: ParseVocabulary):
+        """Wrap parse columns.
+
+        Args:
+            sentence: The parsed text
+            words: Words of the sentence
+            codes: ``len(vocab.fields)`` columns of ``len(words)`` codes each
+            vocab: Vocabulary decoding the codes
+        """
+        self.sentence = sentence
+        self.words = words
+        self.vocab = vocab
+        self._codes = codes
+
+    @classmethod
+    def from_rows(cls, sentence: str, words: Tuple[str, ...], rows: Sequence[bytes],
+                  vocab: ParseVocabulary) -> "ParsedSentence":
+        """Build a parse from one row of codes per word."""
+        codes = bytes(row[f] for f in range(len(vocab.fields)) for row in rows)
+        return cls(sentence, words, codes, vocab)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __getitem__(self, index: int) -> ParsedWord:
+        if index < 0:
+            index += len(self.words)
+        if not 0 <= index < len(self.words):
+            raise IndexError(index)
+        return ParsedWord(self, index)
+
+    def __iter__(self) -> Iterator[ParsedWord]:
+        return (ParsedWord(self, i) for i in range(len(self.words)))
+
+    def codes(self, field: str) -> memoryview:
+        """Column of interned codes for a field, without copying."""
+        f = self.vocab.fields.index(field)
+        n = len(self.words)
+        return memoryview(self._codes)[f * n:(f + 1) * n]
+
+    def values(self, field: str) -> List[Optional[str]]:
+        """Decoded column of a field (None where absent)."""
+        f = self.vocab.fields.index(field)
+        decode = self.vocab.values[f]
+        return [decode[code] for code in self.codes(field)]
+
+    def _word_dict(self, index: int) -> Dict[str, str]:
+        """Legacy dict of one word: its text, pos (or "unknown") and present fields."""
+        n = len(self.words)
+        entry = {"text": self.words[index]}
+        for f, field in enumerate(self.vocab.fields):
+            code = self._codes[f * n + index]
+            if code:
+                entry[field] = self.vocab.values[f][code]
+        entry.setdefault("pos", UNKNOWN_POS)
+        return entry
+
+    def to_dict(self) -> Dict:
+        """The parse in the legacy ``{"sentence", "words": [dict, ...]}`` format."""
+        return {
+            "sentence": self.sentence,
+            "words": [self._word_dict(i) for i in range(len(self.words))],
+        }
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ParsedSentence):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"ParsedSentence({self.sentence!r}, {len(self.words)} words)"
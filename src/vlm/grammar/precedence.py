@@ -0,0 +1,126 @@
+import heapq
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# First sūtra of the tripādī (8.2-8.4), which is asiddha to all earlier rules
+TRIPADI_START = (8, 2)
+
+def sutra_number(rule) -> Optional[Tuple[int, ...]]:
+    """Parse a rule's sūtra number (``sutra`` or ``id`` attribute, e.g. "8.2.66")."""
+    value = rule.attributes.get("sutra", rule.attributes.get("id"))
+    if not isinstance(value, str):
+        return None
+    try:
+        return tuple(int(part) for part in value.split("."))
+    except ValueError:
+        return None
+
+def _proximity(rule) -> int:
+    """Rules operating at the end of the form (anchored) before free-standing ones."""
+    return 0 if rule.source.endswith("$") else 1
+
+def _specificity(rule) -> int:
+    """Longer literal context first: the apavāda beats its utsarga."""
+    return -len(rule.suffix or "")
+
+# Meta-rules (paribhāṣā) that order conflicting rules, by name
+PRECEDENCE_KEYS: Dict[str, Callable] = {
+    "proximity": _proximity,
+    "specificity": _specificity,
+}
+
+def rule_precedence(rules: Sequence, meta_rules: Optional[Dict] = None) -> List[int]:
+    """Compute the global precedence order of a rule base.
+
+    Conflicts are settled in this order:
+
+    1. siddha/asiddha: tripādī rules (8.2-8.4) come after every other rule
+       and among themselves strictly in sūtra order (pūrvatrāsiddham);
+    2. the meta-rules in ``meta_rules`` with a known key function, lowest
+       ``priority`` first (unknown meta-rules are ignored);
+    3. para (vipratiṣedhe paraṃ kāryam): the later sūtra wins, using the
+       position in the rule base when rules carry no sūtra number.
+
+    Explicit ``overrides`` attributes (rule ids or sūtra numbers of the rules
+    a rule beats) form the edges of a precedence DAG that the ordering must
+    respect; the keys above only order rules the DAG leaves unconstrained.
+
+    Args:
+        rules: Compiled rules, in rule base order
+        meta_rules: Meta-rule definitions, e.g. ``{"proximity": {"priority": 1}}``
+
+    Returns:
+        list: ``rank[i]`` is the position of ``rules[i]`` in precedence order
+
+    Raises:
+        ValueError: If an override is unknown, contradicts the asiddha
+            ordering or creates a cycle
+    """
+    meta_keys = [
+        PRECEDENCE_KEYS[name]
+        for name, spec in sorted((meta_rules or {}).items(), key=lambda item: item[1].get("priority", 0))
+        if name in PRECEDENCE_KEYS
+    ]
+
+    numbers = [sutra_number(rule) for rule in rules]
+    tripadi = [number is not None and number[:2] >= TRIPADI_START for number in numbers]
+    # Position in sūtra order, used for para and for the tripādī sequence
+    para = [0] * len(rules)
+    for position, i in enumerate(sorted(range(len(rules)), key=lambda i: (numbers[i] or (), i))):
+        para[i] = position
+
+    def key(i):
+        if tripadi[i]:
+            return (1, para[i])
+        rule = rules[i]
+        return (0,) + tuple(meta(rule) for meta in meta_keys) + (-para[i],)
+
+    edges = _override_edges(rules, numbers)
+    for winner, losers in edges.items():
+        for loser in losers:
+            if tripadi[winner] and (not tripadi[loser] or para[loser] < para[winner]):
+                raise ValueError(
+                    f"Rule {rules[winner].rule_id} cannot override {rules[loser].rule_id}: "
+                    f"it is asiddha to the rule it overrides"
+                )
+
+    # Kahn's algorithm, taking the best-keyed free rule at every step
+    indegree = [0] * len(rules)
+    for losers in edges.values():
+        for loser in losers:
+            indegree[loser] += 1
+    heap = [(key(i), i) for i in range(len(rules)) if indegree[i] == 0]
+    heapq.heapify(heap)
+
+    rank = [-1] * len(rules)
+    position = 0
+    while heap:
+        _, i = heapq.heappop(heap)
+        rank[i] = position
+        position += 1
+        for loser in edges.get(i, ()):
+            indegree[loser] -= 1
+            if indegree[loser] == 0:
+                heapq.heappush(heap, (key(loser), loser))
+
+    if position < len(rules):
+        cycle = sorted(rules[i].rule_id for i in range(len(rules)) if rank[i] < 0)
+        raise ValueError(f"Rule overrides form a cycle among: {', '.join(cycle)}")
+    return rank
+
+def _override_edges(rules: Sequence, numbers: List[Optional[Tuple[int, ...]]]) -> Dict[int, List[int]]:
+    """Map each rule to the rules it explicitly overrides."""
+    by_name = {rule.rule_id: i for i, rule in enumerate(rules)}
+    for i, number in enumerate(numbers):
+        if number is not None:
+            by_name.setdefault(".".join(map(str, number)), i)
+
+    edges: Dict[int, List[int]] = {}
+    for i, rule in enumerate(rules):
+        overrides = rule.attributes.get("overrides", ())
+        if isinstance(overrides, str):
+            overrides = [overrides]
+        for name in overrides:
+            if name not in by_name:
+                raise ValueError(f"Rule {rule.rule_id} overrides unknown rule {name!r}")
+            edges.setdefault(i, []).append(by_name[name])
+    return edges
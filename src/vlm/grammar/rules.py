@@ -0,0 +1,297 @@
+import heapq
+import re
+from operator import attrgetter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.vlm.grammar.precedence import rule_precedence
+
+# Characters that make a pattern more than a plain literal
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+def literal_suffix(pattern: str) -> Optional[str]:
+    """Return the literal word-final suffix a pattern anchors on, if any.
+
+    Args:
+        pattern: Regular expression source, e.g. ``r"nti$"``
+
+    Returns:
+        str: The suffix (``"nti"``), or None if the pattern is not a plain
+        literal anchored at the end of the word
+    """
+    if not pattern.endswith("$"):
+        return None
+    body = pattern[:-1]
+    if any(ch in _REGEX_META for ch in body):
+        return None
+    return body
+
+class CompiledRule:
+    """A single grammar rule with its regex compiled once, on first use.
+
+    Suffix-indexed rules are dispatched through the trie without touching
+    their regex, so deferring compilation keeps building (and unpickling) a
+    large rule base cheap.
+    """
+
+    __slots__ = ("rule_id", "path", "source", "replacement", "suffix", "attributes", "rank", "_pattern")
+
+    def __init__(self, path: Tuple[str, ...], spec: Dict):
+        """Compile a rule specification.
+
+        Args:
+            path: Location of the rule in the rule base, e.g.
+                ``("case_endings", "masculine", "nom_sg")``
+            spec: Rule dict with a ``pattern`` and optional ``replacement``;
+                any other keys are kept as attributes
+        """
+        self.path = path
+        self.rule_id = "/".join(path)
+        self.source = spec["pattern"]
+        self.replacement = spec.get("replacement")
+        self.suffix = literal_suffix(self.source)
+        self.attributes = {k: v for k, v in spec.items() if k not in ("pattern", "replacement")}
+        # Position in the rule base's precedence order, set by CompiledRuleBase
+        self.rank = None
+        self._pattern = None
+
+    @property
+    def pattern(self) -> "re.Pattern":
+        """The compiled regex."""
+        if self._pattern is None:
+            self._pattern = re.compile(self.source)
+        return self._pattern
+
+    def __reduce__(self):
+        """Pickle as its fields, without the compiled regex."""
+        return _restore_rule, (self.path, self.source, self.replacement, self.suffix, self.attributes)
+
+    @property
+    def group(self) -> str:
+        """Top-level rule group, e.g. ``"case_endings"``."""
+        return self.path[0]
+
+    def apply(self, text: str) -> str:
+        """Rewrite text with this rule's replacement."""
+        return self.pattern.sub(self.replacement, text)
+
+    def __repr__(self):
+        return f"CompiledRule({self.rule_id!r}, {self.source!r})"
+
+def _restore_rule(path, source, replacement, suffix, attributes) -> CompiledRule:
+    """Rebuild a pickled rule without re-parsing its pattern."""
+    rule = CompiledRule.__new__(CompiledRule)
+    rule.path = path
+    rule.rule_id = "/".join(path)
+    rule.source = source
+    rule.replacement = replacement
+    rule.suffix = suffix
+    rule.attributes = attributes
+    rule.rank = None
+    rule._pattern = None
+    return rule
+
+class SuffixTrie:
+    """Trie over reversed word-final suffixes.
+
+    Walking a word from its last character visits every indexed suffix of
+    that word, so all suffix-anchored rules that apply are found in a single
+    pass of at most ``len(longest suffix)`` steps.
+    """
+
+    def __init__(self):
+        self._children: List[Dict[str, int]] = [{}]
+        self._rules: List[List[CompiledRule]] = [[]]
+        # Per node: every rule on the path from the root, in precedence order
+        self._ranked: List[Tuple[CompiledRule, ...]] = [()]
+
+    def insert(self, suffix: str, rule: CompiledRule):
+        """Index a rule under its suffix."""
+        node = 0
+        for ch in reversed(suffix):
+            nxt = self._children[node].get(ch)
+            if nxt is None:
+                nxt = len(self._children)
+                self._children[node][ch] = nxt
+                self._children.append({})
+                self._rules.append([])
+            node = nxt
+        self._rules[node].append(rule)
+
+    def lookup(self, word: str) -> List[CompiledRule]:
+        """Return every rule whose suffix ends ``word``, longest suffix first."""
+        found = []
+        node = 0
+        for ch in reversed(word):
+            node = self._children[node].get(ch)
+            if node is None:
+                break
+            if self._rules[node]:
+                found.append(self._rules[node])
+        return [rule for rules in reversed(found) for rule in rules]
+
+    def build_ranked(self):
+        """Precompute each node's candidate rules in precedence order.
+
+        Must be called once every rule has its ``rank``; afterwards
+        ``ranked`` answers with a trie walk and no sorting.
+        """
+        by_rank = attrgetter("rank")
+        self._ranked = [()] * len(self._children)
+        self._ranked[0] = tuple(sorted(self._rules[0], key=by_rank))
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            for child in self._children[node].values():
+                self._ranked[child] = tuple(heapq.merge(
+                    self._ranked[node], sorted(self._rules[child], key=by_rank), key=by_rank
+                ))
+                stack.append(child)
+
+    def ranked(self, word: str) -> Tuple[CompiledRule, ...]:
+        """Return every rule whose suffix ends ``word``, in precedence order."""
+        node = 0
+        for ch in reversed(word):
+            nxt = self._children[node].get(ch)
+            if nxt is None:
+                break
+            node = nxt
+        return self._ranked[node]
+
+def iter_rule_specs(rules: Dict, path: Tuple[str, ...] = ()) -> Iterator[Tuple[Tuple[str, ...], Dict]]:
+    """Walk a nested rule base and yield ``(path, spec)`` for every rule.
+
+    Rules are dicts with a ``pattern`` key; they may sit in nested dicts
+    (keyed by name) or in lists (keyed by position).
+    """
+    if isinstance(rules, dict) and "pattern" in rules:
+        yield path, rules
+    elif isinstance(rules, dict):
+        for name, value in rules.items():
+            yield from iter_rule_specs(value, path + (str(name),))
+    elif isinstance(rules, list):
+        for index, value in enumerate(rules):
+            yield from iter_rule_specs(value, path + (str(index),))
+
+class CompiledRuleBase:
+    """Rule base compiled for indexed dispatch.
+
+    Every rule's regex is compiled once. Rules anchored on a literal word-final
+    suffix are indexed in a reversed-suffix trie; the remaining rules
+    (junction patterns, open stems) are kept in a short unindexed list.
+    """
+
+    def __init__(self, rules: Dict, meta_rules: Optional[Dict] = None):
+        """Compile a nested rule base.
+
+        Args:
+            rules: Rule base in the ``AshtadhyayiEngine.rules`` format
+            meta_rules: Meta-rules used to order conflicting rules, see
+                ``rule_precedence``
+        """
+        self.rules: List[CompiledRule] = []
+        self.by_id: Dict[str, CompiledRule] = {}
+        self.unindexed: List[CompiledRule] = []
+        self.trie = SuffixTrie()
+
+        for path, spec in iter_rule_specs(rules):
+            rule = CompiledRule(path, spec)
+            self.rules.append(rule)
+            self.by_id[rule.rule_id] = rule
+            if rule.suffix:
+                self.trie.insert(rule.suffix, rule)
+            else:
+                self.unindexed.append(rule)
+
+        self._rank(rule_precedence(self.rules, meta_rules))
+
+    def _rank(self, ranks: Sequence[int]):
+        """Assign precedence ranks and precompute the ranked candidate lists."""
+        for rule, rank in zip(self.rules, ranks):
+            rule.rank = rank
+        self.unindexed.sort(key=attrgetter("rank"))
+        self.trie.build_ranked()
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def __getstate__(self):
+        """Compact pickle state: flat rule fields, with rules referenced by index."""
+        index = {id(rule): i for i, rule in enumerate(self.rules)}
+        return {
+            "rules": [(r.path, r.source, r.replacement, r.suffix, r.attributes) for r in self.rules],
+            "children": self.trie._children,
+            "node_rules": [[index[id(r)] for r in rules] for rules in self.trie._rules],
+            "unindexed": [index[id(r)] for r in self.unindexed],
+            "ranks": [r.rank for r in self.rules],
+            "node_ranked": [[index[id(r)] for r in ranked] for ranked in self.trie._ranked],
+        }
+
+    def __setstate__(self, state):
+        self.rules = [_restore_rule(*fields) for fields in state["rules"]]
+        self.by_id = {rule.rule_id: rule for rule in self.rules}
+        self.unindexed = [self.rules[i] for i in state["unindexed"]]
+        self.trie = SuffixTrie()
+        self.trie._children = state["children"]
+        self.trie._rules = [[self.rules[i] for i in node] for node in state["node_rules"]]
+        for rule, rank in zip(self.rules, state["ranks"]):
+            rule.rank = rank
+        self.trie._ranked = [tuple(self.rules[i] for i in node) for node in state["node_ranked"]]
+
+    def lookup(self, word: str) -> List[CompiledRule]:
+        """Return the suffix-indexed rules for a word, longest suffix first."""
+        return self.trie.lookup(word)
+
+    def match(self, word: str) -> List[CompiledRule]:
+        """Return every rule whose pattern applies to a word."""
+        return self.lookup(word) + [r for r in self.unindexed if r.pattern.search(word)]
+
+    def resolve(self, word: str) -> Sequence[CompiledRule]:
+        """Return every rule that applies to a word, winning rule first.
+
+        Suffix-indexed candidates come precomputed in precedence order from
+        the trie; only the short unindexed list is searched and merged in.
+        """
+        ranked = self.trie.ranked(word)
+        extra = [r for r in self.unindexed if r.pattern.search(word)]
+        if not extra:
+            return ranked
+        return list(heapq.merge(ranked, extra, key=attrgetter("rank")))
+
+    def winner(self, word: str) -> Optional[CompiledRule]:
+        """Return the highest-precedence rule that applies to a word, if any."""
+        candidates = self.resolve(word)
+        return candidates[0] if candidates else None
+
+class WordAnalysis:
+    """Per-word result of one rule lookup, shared by validate/correct/parse."""
+
+    __slots__ = ("word", "rules", "word_class", "correction")
+
+    def __init__(self, word: str, rules: List[CompiledRule], correction_id: str):
+        self.word = word
+        self.rules = rules
+        self.word_class = None
+        self.correction = None
+        for rule in rules:
+            if self.word_class is None and rule.group == "word_classes":
+                self.word_class = rule
+            if rule.rule_id == correction_id:
+                self.correction = rule
+
+    @property
+    def pos(self) -> Optional[str]:
+        """Part of speech from the most specific word class, if any."""
+        return self.word_class.attributes.get("pos") if self.word_class else None
+
+    @property
+    def is_verb(self) -> bool:
+        return self.pos == "verb"
+
+    @property
+    def is_noun(self) -> bool:
+        return self.pos == "noun"
+
+    @property
+    def has_valid_ending(self) -> bool:
+        """Whether the word ends in any recognised word-class suffix."""
+        return self.word_class is not None
@@ -1,3 +1,7 @@
+from src.utils.cache import LRUCache
+from src.vlm.grammar.automaton import SandhiAutomaton
+from src.vlm.grammar.lattice import DEFAULT_MAX_WORD_LENGTH, SandhiLattice, SandhiScorer
+
 class SandhiProcessor:
     """Processor for Sanskrit sandhi (phonological junction) rules.
     
@@ -5,8 +9,14 @@ class SandhiProcessor:
     which are essential for both tokenization and generation.
     """
     
-    def __init__(self):
-        """Initialize the sandhi processor with rule sets."""
+    def __init__(self, cache_size=65536, cache_bytes=32 << 20):
+        """Initialize the sandhi processor with rule sets.
+        
+        Args:
+            cache_size: Texts whose splits are memoized
+            cache_bytes: Approximate memory cap of the memoized splits, so long
+                texts that rarely recur cannot pin the cache's memory
+        """
         # Define common sandhi rules for reversal (splitting)
         # Format: {result_pattern: [(first_part_pattern, second_part_pattern), ...]}
         self.vowel_sandhi_rules = {
@@ -47,6 +57,39 @@ class SandhiProcessor:
         # Sanskrit word boundary markers
         self.word_endings = ['aḥ', 'am', 'ām', 'a', 'i', 'ī', 'u', 'ū', 'e', 'o']
         
+        # Reversal alternatives per pattern, kept separate per rule set so that
+        # patterns shared between sets (e.g. 'o') keep every reading
+        self.reversal_rules = {}
+        for rule_set in (self.vowel_sandhi_rules, self.visarga_sandhi_rules,
+                         self.consonant_sandhi_rules):
+            for pattern, replacements in rule_set.items():
+                self.reversal_rules.setdefault(pattern, []).extend(replacements)
+        
+        # Junction table for applying sandhi: (last phoneme, first phoneme) -> result.
+        # Later entries take precedence, so a + i gives 'e' rather than 'ai'
+        self.junction_table = {}
+        for rule_set in (self.vowel_sandhi_rules, self.visarga_sandhi_rules,
+                         self.consonant_sandhi_rules):
+            for result, pairs in rule_set.items():
+                for first, second in pairs:
+                    if first and second:
+                        self.junction_table[(first, second)] = result
+        self._junction_lengths = sorted(
+            {(len(first), len(second)) for first, second in self.junction_table},
+            reverse=True
+        )
+        
+        # Compile the splitting automaton once from the rule patterns
+        self.automaton = SandhiAutomaton(
+            list(self.vowel_sandhi_rules) +
+            list(self.visarga_sandhi_rules) +
+            list(self.consonant_sandhi_rules),
+            self.word_endings
+        )
+        
+        # Refrains and formulaic pādas recur verbatim, so splits are memoized
+        self.split_cache = LRUCache(maxsize=cache_size, max_bytes=cache_bytes, name="sandhi.reverse")
+        
     def apply(self, text1, text2):
         """Apply sandhi rules to join two text segments.
         
@@ -57,77 +100,68 @@ class SandhiProcessor:
         Returns:
             str: Combined text with sandhi rules applied
         """
-        # Basic implementation of sandhi application
         if not text1 or not text2:
             return text1 + text2
-            
-        # Get the last character of text1 and first character of text2
-        last_char = text1[-1]
-        first_char = text2[0] if text2 else ''
         
-        # Check for vowel sandhi (a + a = ā)
-        if last_char == 'a' and first_char == 'a':
-            return text1[:-1] + 'ā' + text2[1:]
-        
-        # Check for vowel sandhi (a + i = e)
-        elif last_char == 'a' and first_char == 'i':
-            return text1[:-1] + 'e' + text2[1:]
-        
-        # Check for vowel sandhi (a + u = o)
-        elif last_char == 'a' and first_char == 'u':
-            return text1[:-1] + 'o' + text2[1:]
+        # Look up the junction, trying the longest phoneme pairs first
+        for left, right in self._junction_lengths:
+            result = self.junction_table.get((text1[-left:], text2[:right]))
+            if result is not None:
+                return text1[:-left] + result + text2[right:]
         
         # Default: just concatenate
         return text1 + text2
     
-    def reverse(self, combined_text):
-        """Split text by reversing sandhi rules.
+    def join(self, segments):
+        """Join a sequence of segments, applying sandhi at every junction.
+        
+        Equivalent to folding :meth:`apply` over the segments, but builds the
+        output in a single buffer so the cost is linear in the total length.
         
         Args:
-            combined_text: Text with sandhi combinations
+            segments: Iterable of text segments (e.g. decoded tokens)
             
         Returns:
-            list: Component segments after sandhi reversal
+            str: Combined text with sandhi rules applied
         """
-        # Basic sandhi splitting implementation
-        # For a proper implementation, we would need a more sophisticated
-        # algorithm that considers all possible splits and chooses the most likely ones
-        
-        # For now, we'll just look for potential sandhi boundaries and try to split
-        # based on the most common rules
-        
-        result = []
-        current_word = ""
-        
-        for i in range(len(combined_text)):
-            current_word += combined_text[i]
-            
-            # Check if we're at a potential word boundary
-            for ending in self.word_endings:
-                if current_word.endswith(ending):
-                    # Check if this could be a sandhi boundary
-                    for j in range(max(0, len(current_word) - 3), len(current_word)):
-                        substring = current_word[j:]
-                        # Look for known sandhi patterns
-                        for result_pattern, replacements in self.rules.items():
-                            if substring.endswith(result_pattern):
-                                # Found a potential sandhi boundary
-                                result.append(current_word)
-                                current_word = ""
-                                break
-                    
-                    if current_word == "":
+        table = self.junction_table
+        lengths = self._junction_lengths
+        buffer = []
+        
+        for segment in segments:
+            if not segment:
+                continue
+            if buffer:
+                for left, right in lengths:
+                    if left > len(buffer) or right > len(segment):
+                        continue
+                    result = table.get(("".join(buffer[-left:]), segment[:right]))
+                    if result is not None:
+                        del buffer[-left:]
+                        buffer.extend(result)
+                        buffer.extend(segment[right:])
                         break
+                else:
+                    buffer.extend(segment)
+            else:
+                buffer.extend(segment)
         
-        # Add any remaining text
-        if current_word:
-            result.append(current_word)
+        return "".join(buffer)
+    
+    def reverse(self, combined_text):
+        """Split text by reversing sandhi rules.
         
-        # If we couldn't split, return the original text
-        if not result:
-            return [combined_text]
+        Args:
+            combined_text: Text with sandhi combinations
             
-        return result
+        Returns:
+            list: Component segments after sandhi reversal
+        """
+        # Segments are located in one pass over the compiled automaton
+        segments = self.split_cache.get_or_compute(
+            combined_text, lambda: tuple(self.automaton.split(combined_text))
+        )
+        return list(segments)
     
     def identify_possible_splits(self, text):
         """Identify all possible sandhi split points in a text.
@@ -156,4 +190,36 @@ class SandhiProcessor:
                     if splits:
                         possible_splits.append((i, splits))
         
-        return possible_splits
\ No newline at end of file
+        return possible_splits
+    
+    def build_lattice(self, text, max_word_length=DEFAULT_MAX_WORD_LENGTH):
+        """Build the lattice of every candidate segmentation of a text.
+        
+        Args:
+            text: Text with sandhi combinations
+            max_word_length: Bound on the surface length of a word split off
+                at a junction (None for no bound)
+            
+        Returns:
+            SandhiLattice: DAG whose paths are the candidate segmentations
+        """
+        return SandhiLattice(text, self.reversal_rules, max_word_length=max_word_length)
+    
+    def best_splits(self, text, k=5, scorer=None, max_word_length=DEFAULT_MAX_WORD_LENGTH):
+        """Return the top-k scored sandhi segmentations of a text.
+        
+        Args:
+            text: Text with sandhi combinations
+            k: Number of segmentations to return
+            scorer: Optional scorer; defaults to a SandhiScorer using the
+                processor's word endings
+            max_word_length: Bound on the surface length of a word split off
+                at a junction (None for no bound)
+            
+        Returns:
+            list: ``(segments, score)`` tuples, best first
+        """
+        if scorer is None:
+            scorer = SandhiScorer(word_endings=self.word_endings)
+        lattice = self.build_lattice(text, max_word_length=max_word_length)
+        return lattice.k_best(k, scorer)
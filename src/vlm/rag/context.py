@@ -0,0 +1,116 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Sequence, Tuple
+
+import numpy as np
+
+# Passage token ids are stored compactly; every tokenizer vocabulary fits
+TOKEN_DTYPE = np.uint16
+
+def format_passage(document: Dict[str, Any]) -> Tuple[str, str]:
+    """Header and body of a document's context passage.
+
+    The header cites the source and verse or sūtra from the metadata, e.g.
+    ``"[gītā 2.47] "``; it is empty for documents without them.
+    """
+    metadata = document.get("metadata") or {}
+    reference = (metadata.get("source"), metadata.get("verse") or metadata.get("sūtra"))
+    label = " ".join(str(value) for value in reference if value)
+    return (f"[{label}] " if label else ""), document["text"]
+
+def tokenize_passages(tokenizer, documents: Sequence[Dict[str, Any]]) -> List[Tuple[np.ndarray, int]]:
+    """Token ids of the passages of many documents, in one tokenizer call.
+
+    Headers and bodies are tokenized as separate texts; headers end in a
+    space, so this gives the same ids as tokenizing the whole passage.
+
+    Returns:
+        List of (ids, body_start) pairs, ``ids`` as TOKEN_DTYPE
+    """
+    texts = [part for document in documents for part in format_passage(document)]
+    ids, lengths = tokenizer._phoneme_ids(texts)
+    ids = ids.astype(TOKEN_DTYPE)
+    headers = lengths[::2]
+    ends = np.cumsum(headers + lengths[1::2])
+    starts = ends - headers - lengths[1::2]
+    return [(ids[start:end], header)
+            for start, end, header in zip(starts.tolist(), ends.tolist(), headers.tolist())]
+
+@dataclass
+class Passage:
+    """A document formatted as context: its text and token ids.
+
+    ``ids[:body_start]`` are the tokens of the header citing the source.
+    """
+    text: str
+    ids: np.ndarray
+    body_start: int = 0
+    _shingles: Dict[int, FrozenSet[int]] = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def body(self) -> np.ndarray:
+        return self.ids[self.body_start:]
+
+    def shingles(self, size: int) -> FrozenSet[int]:
+        """Hashes of the body's ``size``-token windows, computed once per size."""
+        if size not in self._shingles:
+            self._shingles[size] = _shingles(self.body, size)
+        return self._shingles[size]
+
+def _shingles(ids: np.ndarray, size: int) -> FrozenSet[int]:
+    """Hashes of every ``size``-token window (the whole sequence if shorter)."""
+    size = min(size, len(ids))
+    if not size:
+        return frozenset()
+    ids = ids.astype(np.uint64)
+    count = len(ids) - size + 1
+    keys = np.full(count, np.uint64(0xCBF29CE484222325))
+    for j in range(size):
+        keys = (keys ^ ids[j:j + count]) * np.uint64(0x100000001B3)
+    return frozenset(keys.tolist())
+
+def pack_context(passages: Sequence[Passage], max_tokens: int, separator_id: int,
+                 shingle_size: int = 8, max_overlap: float = 0.5) -> Tuple[np.ndarray, List[int]]:
+    """Concatenate passage ids, best first, up to a token budget.
+
+    A passage is skipped as a duplicate when at least ``max_overlap`` of its
+    body's ``shingle_size``-token windows already occur in the packed
+    passages, so repeated verses and overlapping excerpts are packed once.
+    Passages that do not fit in the remaining budget are skipped, so later,
+    shorter ones can still fill it; only a first passage longer than the
+    whole budget is truncated.
+
+    Args:
+        passages: Passages in rank order
+        max_tokens: Token budget, separators included
+        separator_id: Token between consecutive passages
+        shingle_size: Window length for overlap detection
+        max_overlap: Fraction of shared windows that makes a duplicate
+
+    Returns:
+        tuple: Packed int64 ids and the indices of the packed passages
+    """
+    pieces: List[np.ndarray] = []
+    packed: List[int] = []
+    seen = set()
+    used = 0
+    for index, passage in enumerate(passages):
+        keys = passage.shingles(shingle_size)
+        if keys and len(keys & seen) >= max_overlap * len(keys):
+            continue
+        ids = passage.ids
+        cost = len(ids) + bool(pieces)
+        if used + cost > max_tokens:
+            if pieces or max_tokens <= 0:
+                continue
+            ids = ids[:max_tokens]
+            cost = len(ids)
+            keys = _shingles(ids[passage.body_start:], shingle_size)
+        if pieces:
+            pieces.append(np.array([separator_id]))
+        pieces.append(ids)
+        packed.append(index)
+        used += cost
+        seen |= keys
+    if not pieces:
+        return np.empty(0, dtype=np.int64), packed
+    return np.concatenate(pieces).astype(np.int64), packed
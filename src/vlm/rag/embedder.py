@@ -0,0 +1,83 @@
+from typing import Dict, Sequence
+import re
+import unicodedata
+
+import numpy as np
+
+_SPACES = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """NFC-normalize, lowercase and collapse whitespace."""
+    return _SPACES.sub(" ", unicodedata.normalize("NFC", text).lower()).strip()
+
+class HashingEmbedder:
+    """Dense text embeddings from hashed character n-grams.
+
+    Every codepoint n-gram of the normalized text (padded with spaces, so
+    word starts and ends are marked) is hashed into one of ``dim`` signed
+    buckets, and the bucket counts are L2-normalized. Works for IAST and
+    Devanagari alike, needs no training, and embeds whole batches with array
+    operations. Inner products of the embeddings approximate n-gram overlap.
+    """
+
+    kind = "hashing"
+
+    def __init__(self, dim: int = 256, ngrams: Sequence[int] = (2, 3, 4), seed: int = 0):
+        """Initialize the embedder.
+
+        Args:
+            dim: Embedding dimension
+            ngrams: N-gram lengths to hash
+            seed: Hash seed; embeddings are only comparable for equal seeds
+        """
+        self.dim = dim
+        self.ngrams = tuple(ngrams)
+        self.seed = seed
+
+    def config(self) -> Dict:
+        """Settings needed to rebuild an identical embedder."""
+        return {"kind": self.kind, "dim": self.dim, "ngrams": list(self.ngrams), "seed": self.seed}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "HashingEmbedder":
+        return cls(dim=config["dim"], ngrams=config["ngrams"], seed=config["seed"])
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed a batch of texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            np.ndarray: float32 embeddings [N, dim] with unit norm (zero for
+            texts without n-grams)
+        """
+        padded = [f" {text} " if text else "" for text in map(normalize_text, texts)]
+        lengths = np.fromiter(map(len, padded), dtype=np.int64, count=len(padded))
+        codes = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        ends = np.cumsum(lengths)
+        owner = np.repeat(np.arange(len(padded)), lengths)
+
+        counts = np.zeros(len(padded) * self.dim, dtype=np.float64)
+        for n in self.ngrams:
+            if len(codes) < n:
+                continue
+            starts = np.arange(len(codes) - n + 1)
+            # Windows must end inside the text they start in
+            starts = starts[starts + n <= ends[owner[starts]]]
+            keys = np.full(len(starts), np.uint64(self.seed * 0x9E3779B97F4A7C15 % 2**64 + n))
+            for j in range(n):
+                keys = keys * np.uint64(0x100000001B3) ^ codes[starts + j]
+            # splitmix64 finalizer: low bits pick the bucket, the top bit the sign
+            keys ^= keys >> np.uint64(30)
+            keys *= np.uint64(0xBF58476D1CE4E5B9)
+            keys ^= keys >> np.uint64(27)
+            keys *= np.uint64(0x94D049BB133111EB)
+            keys ^= keys >> np.uint64(31)
+            buckets = (keys % np.uint64(self.dim)).astype(np.int64)
+            signs = np.where(keys >> np.uint64(63), -1.0, 1.0)
+            counts += np.bincount(owner[starts] * self.dim + buckets, weights=signs, minlength=len(counts))
+
+        vectors = counts.reshape(len(padded), self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
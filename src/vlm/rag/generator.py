@@ -1,22 +1,71 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from src.utils.cache import CacheStats, LRUCache
+from src.vlm.rag.context import Passage, format_passage, pack_context, tokenize_passages
+from src.vlm.rag.normalize import normalize_query
+
 class RAGGenerator:
     """Generator component for Retrieval-Augmented Generation.
     
     This module integrates retrieved documents with the VLM core to generate
     knowledge-grounded responses.
+
+    Retrieval goes through two LRU caches with a time to live: normalized
+    query -> retrieved doc ids, and doc id -> formatted passage. Queries
+    that differ only in whitespace, case, punctuation or script share an
+    entry. Both caches are cleared when the retriever's index version
+    changes.
+
+    Passages come with the token ids the retriever stored at indexing time,
+    so the context is packed by concatenating id arrays up to the model's
+    position limit, skipping passages that repeat ones already packed.
     """
     
-    def __init__(self, model, retriever):
+    def __init__(self, model, retriever, tokenizer=None, query_cache_size: int = 4096,
+                 context_cache_size: int = 16384, cache_ttl: Optional[float] = 600.0,
+                 max_context_tokens: Optional[int] = None, max_overlap: float = 0.5):
         """Initialize the RAG generator.
         
         Args:
             model: The VLM core model
             retriever: The document retriever
+            tokenizer: SanskritTokenizer for queries and contexts (the
+                retriever's when None); must match the one that tokenized
+                the stored passages
+            query_cache_size: Queries whose results are cached
+            context_cache_size: Documents whose formatted context is cached
+            cache_ttl: Seconds a cached entry stays valid (None for no expiry)
+            max_context_tokens: Token budget of the packed context (further
+                limited by the model's ``max_position_embeddings``)
+            max_overlap: Fraction of a passage already in the context that
+                makes it a duplicate
         """
         self.model = model
         self.retriever = retriever
+        self._tokenizer = tokenizer
+        self.max_context_tokens = max_context_tokens
+        self.max_overlap = max_overlap
+        self.query_cache = LRUCache(maxsize=query_cache_size, name="rag.queries", ttl=cache_ttl)
+        self.context_cache = LRUCache(maxsize=context_cache_size, name="rag.contexts", ttl=cache_ttl)
+        self._index_version = getattr(retriever, "version", None)
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            self._tokenizer = getattr(self.retriever, "tokenizer", None)
+        if self._tokenizer is None:
+            from src.vlm.core.tokenizer import SanskritTokenizer
+            self._tokenizer = SanskritTokenizer()
+        return self._tokenizer
         
     def generate(self, query, max_length=100, num_docs=5):
         """Generate a response using retrieved documents.
+
+        The encoder input is ``<s> query </s> context </s>``, with the
+        context packed into whatever positions the query leaves.
         
         Args:
             query: User query
@@ -26,24 +75,133 @@ class RAGGenerator:
         Returns:
             str: Generated response
         """
-        # Retrieve relevant documents
-        docs = self.retriever.retrieve(query, k=num_docs)
-        
-        # Format context with retrieved documents
-        context = self._format_context(docs)
-        
-        # Generate response using VLM with augmented context
-        # TODO: Implement generation with context
-        return ""
+        tokenizer = self.tokenizer
+        limit = self.model.config.max_position_embeddings
+        query_ids, _ = tokenizer._phoneme_ids([normalize_query(query)])
+        query_ids = query_ids[:max(limit - 3, 0)]
+        budget = limit - len(query_ids) - 3
+        if self.max_context_tokens is not None:
+            budget = min(budget, self.max_context_tokens)
+
+        # Retrieve relevant documents and pack their stored token ids
+        docs, _ = self.retrieve(query, num_docs=num_docs)
+        context, _ = self._pack_context(docs, budget)
+
+        prompt = np.concatenate([[tokenizer.cls_token_id], query_ids, [tokenizer.sep_token_id],
+                                 context, [tokenizer.sep_token_id]]).astype(np.int64)
+        output = self.model.generate(torch.from_numpy(prompt)[None], max_length=max_length)
+        return tokenizer.decode(output[0].tolist(), skip_special_tokens=True)
+
+    def retrieve(self, query: str, num_docs: int = 5) -> Tuple[Tuple[int, ...], Tuple[float, ...]]:
+        """Ids and scores of the documents retrieved for a query, through the query cache.
+
+        The query is normalized without transliteration, since documents are
+        indexed in their own script, and the normalized form is both the
+        cache key and what the retriever searches, so every spelling sharing
+        an entry gets the same results.
+
+        Args:
+            query: User query
+            num_docs: Number of documents to retrieve
+
+        Returns:
+            tuple: Document ids and scores, best first
+        """
+        self._check_index()
+        normalized = normalize_query(query, transliterate=False)
+
+        def compute():
+            results = self.retriever.retrieve_batch([normalized], k=num_docs)
+            found = results.ids[0] >= 0
+            return tuple(results.ids[0][found].tolist()), tuple(results.scores[0][found].tolist())
+
+        return self.query_cache.get_or_compute((normalized, num_docs), compute)
+
+    def contexts(self, doc_ids: Sequence[int]) -> List[Passage]:
+        """Formatted passages of documents, through the context cache."""
+        self._check_index()
+        return [
+            self.context_cache.get_or_compute(int(doc_id), lambda doc_id=doc_id: self._passage(int(doc_id)))
+            for doc_id in doc_ids
+        ]
+
+    def cache_stats(self) -> Dict[str, CacheStats]:
+        """Hit, miss, eviction and expiration counts of the query and context caches."""
+        return {"queries": self.query_cache.stats(), "contexts": self.context_cache.stats()}
+
+    def clear_cache(self):
+        """Drop every cached query result and context."""
+        self.query_cache.clear()
+        self.context_cache.clear()
+
+    def _check_index(self):
+        """Clear the caches if the retriever's index changed since they were filled."""
+        version = getattr(self.retriever, "version", None)
+        if version != self._index_version:
+            self.clear_cache()
+            self._index_version = version
+
+    def _passage(self, doc_id: int) -> Passage:
+        """Passage of an indexed document, from its stored tokens when it has them."""
+        documents = self.retriever.documents
+        stored = documents.tokens(doc_id)
+        if stored is None:
+            return self._render(documents[doc_id])
+        ids, body_start = stored
+        ids = ids.view()
+        ids.setflags(write=False)
+        return Passage("".join(format_passage(documents[doc_id])), ids, body_start)
+
+    def _render(self, doc: Dict[str, Any]) -> Passage:
+        """Passage of a document, tokenized now."""
+        [(ids, body_start)] = tokenize_passages(self.tokenizer, [doc])
+        ids.setflags(write=False)
+        return Passage("".join(format_passage(doc)), ids, body_start)
+
+    def _passages(self, docs) -> List[Passage]:
+        """Passages of ids or document dicts (looked up by their 'id' when they have one)."""
+        passages = []
+        for doc in docs:
+            if not isinstance(doc, dict):
+                passages.extend(self.contexts([doc]))
+            elif "id" in doc:
+                passages.extend(self.contexts([doc["id"]]))
+            else:
+                passages.append(self._render(doc))
+        return passages
+
+    def _pack_context(self, docs, max_tokens: Optional[int] = None) -> Tuple[np.ndarray, List[Passage]]:
+        """Token ids of the packed context and the passages it holds.
+
+        Args:
+            docs: Retrieved documents, best first: ids, or dicts as returned
+                by ``retriever.retrieve``
+            max_tokens: Token budget (``max_context_tokens`` when None,
+                unlimited if that is None too)
+
+        Returns:
+            tuple: int64 ids, passages separated by ``</s>``, and the packed passages
+        """
+        passages = self._passages(docs)
+        if max_tokens is None:
+            max_tokens = self.max_context_tokens
+        if max_tokens is None:
+            max_tokens = sum(len(passage.ids) + 1 for passage in passages)
+        ids, packed = pack_context(passages, max_tokens, self.tokenizer.sep_token_id,
+                                   max_overlap=self.max_overlap)
+        return ids, [passages[index] for index in packed]
         
-    def _format_context(self, docs):
+    def _format_context(self, docs, max_tokens: Optional[int] = None):
         """Format retrieved documents as context for the model.
         
         Args:
-            docs: Retrieved documents
+            docs: Retrieved documents: ids, or dicts as returned by
+                ``retriever.retrieve`` (cached when they have an 'id')
+            max_tokens: Token budget, as in ``_pack_context``
             
         Returns:
-            str: Formatted context
+            str: Formatted context: the text of the packed passages, one per
+            line (a first passage truncated to the budget is given whole)
         """
-        # TODO: Implement context formatting
-        return ""
+        _, packed = self._pack_context(docs, max_tokens)
+        return "\n".join(passage.text for passage in packed)
@@ -0,0 +1,371 @@
+from typing import Dict, Optional, Tuple
+import json
+import os
+import tempfile
+
+import numpy as np
+
+INDEX_FORMAT_VERSION = 1
+INDEX_META = "index.json"
+
+def _as_matrix(vectors, dim: int) -> np.ndarray:
+    """Check and convert vectors to a C-contiguous float32 [N, dim] array."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    if vectors.ndim != 2 or vectors.shape[1] != dim:
+        raise ValueError(f"Expected vectors of dimension {dim}, got shape {vectors.shape}")
+    return vectors
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best ``k`` scores of every row, in descending order.
+
+    Selects with ``argpartition`` (linear time) and only sorts the selection.
+
+    Args:
+        scores: Scores [Q, N]
+        k: Number of results per row
+
+    Returns:
+        tuple: Scores [Q, min(k, N)] and their column indices
+    """
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        columns = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        columns = np.broadcast_to(np.arange(k), scores.shape).copy()
+    selected = np.take_along_axis(scores, columns, axis=1)
+    order = np.argsort(-selected, axis=1, kind="stable")
+    return np.take_along_axis(selected, order, axis=1), np.take_along_axis(columns, order, axis=1)
+
+def _pad(scores: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pad results to k columns with score -inf and id -1."""
+    missing = k - scores.shape[1]
+    if missing > 0:
+        scores = np.pad(scores, ((0, 0), (0, missing)), constant_values=-np.inf)
+        ids = np.pad(ids, ((0, 0), (0, missing)), constant_values=-1)
+    return scores.astype(np.float32), ids.astype(np.int64)
+
+def _write_atomic(path: str, write):
+    """Write a file through a temporary file so readers never see a partial one."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def save_array(directory: str, name: str, array: np.ndarray):
+    """Save an array as ``<directory>/<name>.npy``, atomically."""
+    _write_atomic(os.path.join(directory, f"{name}.npy"), lambda f: np.save(f, np.asarray(array)))
+
+def load_array(directory: str, name: str, mmap: bool = True) -> np.ndarray:
+    """Load ``<directory>/<name>.npy``, memory-mapped read-only unless ``mmap`` is False."""
+    path = os.path.join(directory, f"{name}.npy")
+    if mmap:
+        try:
+            return np.load(path, mmap_mode="r")
+        except ValueError:
+            # Empty arrays cannot be mapped
+            pass
+    return np.load(path)
+
+def save_json(path: str, content: Dict):
+    _write_atomic(path, lambda f: f.write(json.dumps(content, indent=2, ensure_ascii=False).encode("utf-8")))
+
+class FlatIndex:
+    """Exact inner-product search over all stored vectors.
+
+    With unit-norm vectors the inner product is the cosine similarity. A
+    batch of queries is scored with one matrix product per chunk of
+    ``chunk_size`` vectors, so a memory-mapped index larger than RAM is
+    streamed from the page cache instead of loaded; queries are taken
+    ``query_chunk_size`` at a time to bound the score matrix.
+    """
+
+    kind = "flat"
+
+    def __init__(self, dim: int, chunk_size: int = 65536, query_chunk_size: int = 256):
+        """Initialize an empty index.
+
+        Args:
+            dim: Vector dimension
+            chunk_size: Vectors scored per matrix product during search
+            query_chunk_size: Queries searched together
+        """
+        self.dim = dim
+        self.chunk_size = chunk_size
+        self.query_chunk_size = query_chunk_size
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def add(self, vectors) -> np.ndarray:
+        """Append vectors; they get consecutive ids.
+
+        Args:
+            vectors: Vectors [N, dim]
+
+        Returns:
+            np.ndarray: Ids of the new vectors
+        """
+        vectors = _as_matrix(vectors, self.dim)
+        start = len(self)
+        self.vectors = np.concatenate([self.vectors, vectors])
+        return np.arange(start, len(self))
+
+    def search(self, queries, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the ``k`` vectors with the largest inner product per query.
+
+        Args:
+            queries: Query vectors [Q, dim]
+            k: Number of results per query
+
+        Returns:
+            tuple: Scores [Q, k] (float32) and ids [Q, k] (int64), best first;
+            missing results have score -inf and id -1
+        """
+        queries = _as_matrix(queries, self.dim)
+        if not len(self):
+            return _pad(np.zeros((len(queries), 0)), np.zeros((len(queries), 0)), k)
+        results = [self._search_chunk(queries[start:start + self.query_chunk_size], k)
+                   for start in range(0, len(queries), self.query_chunk_size)]
+        return _pad(*(np.concatenate(parts) for parts in zip(*results)), k)
+
+    def _search_chunk(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k of a chunk of queries, merged across chunks of vectors."""
+        scores = np.zeros((len(queries), 0), dtype=np.float32)
+        ids = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self), self.chunk_size):
+            chunk_scores, chunk_ids = top_k(queries @ self.vectors[start:start + self.chunk_size].T, k)
+            if not ids.shape[1]:
+                scores, ids = chunk_scores, chunk_ids + start
+                continue
+            scores, columns = top_k(np.concatenate([scores, chunk_scores], axis=1), k)
+            ids = np.take_along_axis(np.concatenate([ids, chunk_ids + start], axis=1), columns, axis=1)
+        return scores, ids
+
+    def _meta(self) -> Dict:
+        return {"chunk_size": self.chunk_size, "query_chunk_size": self.query_chunk_size}
+
+    def _save_arrays(self, path: str):
+        save_array(path, "vectors", self.vectors)
+
+    @classmethod
+    def _load(cls, path: str, meta: Dict, mmap: bool) -> "FlatIndex":
+        index = cls(meta["dim"], chunk_size=meta["chunk_size"],
+                    query_chunk_size=meta.get("query_chunk_size", 256))
+        index.vectors = load_array(path, "vectors", mmap)
+        return index
+
+    def save(self, path: str):
+        """Save the index to the directory ``path``; see ``load_index``."""
+        os.makedirs(path, exist_ok=True)
+        self._save_arrays(path)
+        # The metadata goes last: a directory with it is complete
+        save_json(os.path.join(path, INDEX_META), {
+            "format_version": INDEX_FORMAT_VERSION, "kind": self.kind,
+            "dim": self.dim, "count": len(self), **self._meta(),
+        })
+
+class IVFIndex(FlatIndex):
+    """Inverted-file index: vectors are clustered and a query scans few clusters.
+
+    Spherical k-means splits the vectors into ``nlist`` clusters, trained on
+    the first vectors added. A search scores the query against the centroids
+    and then only scans the ``nprobe`` nearest clusters, trading a little
+    recall for a scan of roughly ``nprobe / nlist`` of the vectors. Vectors
+    are stored grouped by cluster, so each probe reads one contiguous slice
+    of the (possibly memory-mapped) vector file.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, dim: int, nlist: int = 64, nprobe: int = 8, seed: int = 0,
+                 train_iterations: int = 10, chunk_size: int = 65536, query_chunk_size: int = 256):
+        """Initialize an empty, untrained index.
+
+        Args:
+            dim: Vector dimension
+            nlist: Number of clusters
+            nprobe: Clusters scanned per query by default
+            seed: Seed for k-means initialization and sampling
+            train_iterations: k-means iterations
+            chunk_size: Vectors assigned per matrix product
+            query_chunk_size: Queries searched together
+        """
+        super().__init__(dim, chunk_size=chunk_size, query_chunk_size=query_chunk_size)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+        self.train_iterations = train_iterations
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        # Original id of every stored vector and start of every cluster
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+    @property
+    def is_trained(self) -> bool:
+        return len(self.centroids) > 0
+
+    def train(self, vectors, max_samples_per_list: int = 256):
+        """Cluster a sample of ``vectors`` with spherical k-means.
+
+        Args:
+            vectors: Training vectors [N, dim]
+            max_samples_per_list: Sample at most this many vectors per cluster
+        """
+        vectors = _as_matrix(vectors, self.dim)
+        if not len(vectors):
+            raise ValueError("Cannot train an IVF index without vectors")
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), self.nlist * max_samples_per_list)
+        sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+        nlist = min(self.nlist, len(sample))
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+        for _ in range(self.train_iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            # Clusters that lost all their vectors restart from a random one
+            empty = np.bincount(assignment, minlength=nlist) == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        self.centroids = centroids.astype(np.float32)
+        self.nlist = nlist
+        self.offsets = np.zeros(nlist + 1, dtype=np.int64)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[start:start + self.chunk_size] @ self.centroids.T, axis=1)
+            for start in range(0, len(vectors), self.chunk_size)
+        ] or [np.zeros(0, dtype=np.int64)])
+
+    def add(self, vectors) -> np.ndarray:
+        """Append vectors, training the clusters first if needed.
+
+        Args:
+            vectors: Vectors [N, dim]
+
+        Returns:
+            np.ndarray: Ids of the new vectors
+        """
+        vectors = _as_matrix(vectors, self.dim)
+        if not self.is_trained:
+            self.train(vectors)
+        start = len(self)
+        new_ids = np.arange(start, start + len(vectors))
+        lists = np.concatenate([
+            np.repeat(np.arange(self.nlist), np.diff(self.offsets)),
+            self._assign(vectors),
+        ])
+        order = np.argsort(lists, kind="stable")
+        self.vectors = np.concatenate([self.vectors, vectors])[order]
+        self.ids = np.concatenate([self.ids, new_ids])[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(lists, minlength=self.nlist))])
+        return new_ids
+
+    def search(self, queries, k: int, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-``k`` inner-product search.
+
+        Args:
+            queries: Query vectors [Q, dim]
+            k: Number of results per query
+            nprobe: Clusters to scan (the index default when None)
+
+        Returns:
+            tuple: Scores [Q, k] (float32) and ids [Q, k] (int64), best first;
+            missing results have score -inf and id -1
+        """
+        queries = _as_matrix(queries, self.dim)
+        if not len(self):
+            return _pad(np.zeros((len(queries), 0)), np.zeros((len(queries), 0)), k)
+        results = [self._search_chunk(queries[start:start + self.query_chunk_size], k, nprobe or self.nprobe)
+                   for start in range(0, len(queries), self.query_chunk_size)]
+        return _pad(*(np.concatenate(parts) for parts in zip(*results)), k)
+
+    def _search_chunk(self, queries: np.ndarray, k: int, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Search a chunk of queries, one matrix product per probed cluster.
+
+        Candidate scores land in a padded [Q, candidates] matrix: each query
+        gets a column block per probe, and clusters the query does not probe
+        stay at -inf.
+        """
+        _, probes = top_k(queries @ self.centroids.T, nprobe)
+        sizes = np.diff(self.offsets)[probes]
+        block_starts = np.cumsum(sizes, axis=1) - sizes
+        scores = np.full((len(queries), int(sizes.sum(axis=1).max())), -np.inf, dtype=np.float32)
+        rows = np.zeros(scores.shape, dtype=np.int64)
+
+        flat_probes = probes.ravel()
+        order = np.argsort(flat_probes, kind="stable")
+        lists, bounds = np.unique(flat_probes[order], return_index=True)
+        for cluster, pairs in zip(lists, np.split(order, bounds[1:])):
+            start, end = self.offsets[cluster], self.offsets[cluster + 1]
+            if start == end:
+                continue
+            query_rows, probe = np.divmod(pairs, probes.shape[1])
+            columns = block_starts[query_rows, probe][:, None] + np.arange(end - start)
+            scores[query_rows[:, None], columns] = queries[query_rows] @ self.vectors[start:end].T
+            rows[query_rows[:, None], columns] = np.arange(start, end)
+
+        best, columns = top_k(scores, k)
+        ids = np.where(np.isneginf(best), -1, self.ids[np.take_along_axis(rows, columns, axis=1)])
+        return best, ids
+
+    def _meta(self) -> Dict:
+        return {"chunk_size": self.chunk_size, "nlist": self.nlist, "nprobe": self.nprobe,
+                "seed": self.seed, "train_iterations": self.train_iterations,
+                "query_chunk_size": self.query_chunk_size}
+
+    def _save_arrays(self, path: str):
+        for name in ("vectors", "ids", "offsets", "centroids"):
+            save_array(path, name, getattr(self, name))
+
+    @classmethod
+    def _load(cls, path: str, meta: Dict, mmap: bool) -> "IVFIndex":
+        index = cls(meta["dim"], nlist=meta["nlist"], nprobe=meta["nprobe"], seed=meta["seed"],
+                    train_iterations=meta["train_iterations"], chunk_size=meta["chunk_size"],
+                    query_chunk_size=meta["query_chunk_size"])
+        index.vectors = load_array(path, "vectors", mmap)
+        # The small arrays are read eagerly
+        for name in ("ids", "offsets", "centroids"):
+            setattr(index, name, load_array(path, name, mmap=False))
+        return index
+
+INDEX_TYPES = {index_type.kind: index_type for index_type in (FlatIndex, IVFIndex)}
+
+def create_index(kind: str, dim: int, **kwargs):
+    """Create an empty index of the given kind ('flat' or 'ivf')."""
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {kind!r}; expected one of {sorted(INDEX_TYPES)}")
+    return INDEX_TYPES[kind](dim, **kwargs)
+
+def load_index(path: str, mmap: bool = True):
+    """Load an index saved with ``save``.
+
+    The vector file is memory-mapped by default, so loading takes constant
+    time and the operating system pages vectors in as searches touch them;
+    several processes serving the same index share one copy in the page
+    cache. Adding vectors to a mapped index copies them into memory.
+
+    Args:
+        path: Index directory
+        mmap: Memory-map the vectors instead of reading them
+
+    Returns:
+        FlatIndex or IVFIndex: The loaded index
+
+    Raises:
+        ValueError: If the index was written by an incompatible version
+    """
+    with open(os.path.join(path, INDEX_META), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != INDEX_FORMAT_VERSION:
+        raise ValueError(f"Unsupported index format version {meta.get('format_version')} in {path}")
+    if meta.get("kind") not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {meta.get('kind')!r} in {path}")
+    return INDEX_TYPES[meta["kind"]]._load(path, meta, mmap)
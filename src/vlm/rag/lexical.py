@@ -0,0 +1,387 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+import os
+
+import numpy as np
+
+from src.vlm.rag.embedder import normalize_text
+from src.vlm.rag.index import load_array, save_array, save_json, top_k
+
+LEXICAL_FORMAT_VERSION = 1
+LEXICAL_META = "lexical.json"
+
+def _varint_sizes(values: np.ndarray) -> np.ndarray:
+    """Encoded size in bytes of every value."""
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        sizes += values >= np.uint64(1 << shift)
+    return sizes
+
+def encode_varints(values: np.ndarray) -> np.ndarray:
+    """LEB128-encode non-negative integers: 7 bits per byte, high bit = more bytes follow.
+
+    Args:
+        values: Non-negative integers [N]
+
+    Returns:
+        np.ndarray: uint8 byte stream
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = _varint_sizes(values)
+    starts = np.cumsum(sizes) - sizes
+    out = np.zeros(int(sizes.sum()), dtype=np.uint8)
+    for j in range(int(sizes.max()) if len(values) else 0):
+        rows = sizes > j
+        byte = (values[rows] >> np.uint64(7 * j)) & np.uint64(0x7F)
+        byte |= np.where(sizes[rows] > j + 1, np.uint64(0x80), np.uint64(0))
+        out[starts[rows] + j] = byte
+    return out
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """Decode a stream written by ``encode_varints``.
+
+    Args:
+        data: uint8 byte stream
+
+    Returns:
+        np.ndarray: Decoded integers (int64)
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    last = data < 0x80
+    if last.all():
+        return data.astype(np.int64)
+    ends = np.flatnonzero(last)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    sizes = ends - starts + 1
+    low = (data & 0x7F).astype(np.uint64)
+    values = low[starts]
+    for j in range(1, int(sizes.max())):
+        longer = np.flatnonzero(sizes > j)
+        values[longer] |= low[starts[longer] + j] << np.uint64(7 * j)
+    return values.astype(np.int64)
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenate ``arange(start, end)`` over all ranges without a Python loop."""
+    lengths = ends - starts
+    offsets = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths)
+
+class _Segment:
+    """Immutable postings of a batch of documents.
+
+    For every term present (sorted global ``terms``, with ``counts``
+    postings each), the document ids are stored as varint deltas (the first
+    one relative to 0) and the term frequencies as varints, starting at
+    ``doc_offsets`` / ``tf_offsets``.
+    """
+
+    __slots__ = ("terms", "counts", "doc_offsets", "docs", "tf_offsets", "tfs")
+
+    def __init__(self, terms, counts, doc_offsets, docs, tf_offsets, tfs):
+        self.terms = terms
+        self.counts = counts
+        self.doc_offsets = doc_offsets
+        self.docs = docs
+        self.tf_offsets = tf_offsets
+        self.tfs = tfs
+
+    @classmethod
+    def build(cls, term_ids: np.ndarray, doc_ids: np.ndarray, tfs: Optional[np.ndarray] = None) -> "_Segment":
+        """Compress postings.
+
+        Args:
+            term_ids: Term of every occurrence (or posting, with ``tfs``)
+            doc_ids: Document of every occurrence
+            tfs: Term frequencies of unique (term, doc) pairs; occurrences
+                are counted when None
+        """
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        low = int(doc_ids.min()) if len(doc_ids) else 0
+        span = int(doc_ids.max()) - low + 1 if len(doc_ids) else 1
+        keys = term_ids * span + (doc_ids - low)
+        if tfs is None:
+            keys, tfs = np.unique(keys, return_counts=True)
+        else:
+            order = np.argsort(keys, kind="stable")
+            keys, tfs = keys[order], np.asarray(tfs, dtype=np.int64)[order]
+        pair_terms, pair_docs = np.divmod(keys, span)
+        pair_docs += low
+        terms, first, counts = np.unique(pair_terms, return_index=True, return_counts=True)
+        deltas = np.diff(pair_docs, prepend=0)
+        deltas[first] = pair_docs[first]
+
+        def offsets(values):
+            ends = np.concatenate([[0], np.cumsum(_varint_sizes(values))])
+            return ends[np.append(first, len(values))].astype(np.int64)
+
+        return cls(terms.astype(np.int64), counts.astype(np.int64), offsets(deltas), encode_varints(deltas),
+                   offsets(tfs), encode_varints(tfs))
+
+    def postings(self, terms: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Postings of several terms, decoded together.
+
+        Args:
+            terms: Global term ids [T]
+
+        Returns:
+            tuple: Index into ``terms``, doc id and term frequency of every
+            posting of the terms present in the segment
+        """
+        slots = np.searchsorted(self.terms, terms)
+        present = slots < len(self.terms)
+        present[present] = self.terms[slots[present]] == terms[present]
+        which = np.flatnonzero(present)
+        slots = slots[which]
+        counts = self.counts[slots]
+        deltas = decode_varints(self.docs[_ranges(self.doc_offsets[slots], self.doc_offsets[slots + 1])])
+        tfs = decode_varints(self.tfs[_ranges(self.tf_offsets[slots], self.tf_offsets[slots + 1])])
+        # Prefix sums restarted at every term turn deltas back into ids
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        totals = np.cumsum(deltas)
+        docs = totals - np.concatenate([[0], totals])[starts]
+        return np.repeat(which, counts), docs, tfs
+
+    def occurrences(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """All (term, doc, tf) postings of the segment."""
+        starts = np.repeat(np.cumsum(self.counts) - self.counts, self.counts)
+        # Prefix sums restarted at every term turn deltas back into ids
+        totals = np.cumsum(decode_varints(self.docs))
+        docs = totals - np.concatenate([[0], totals])[starts]
+        return np.repeat(self.terms, self.counts), docs, decode_varints(self.tfs)
+
+    @classmethod
+    def merge(cls, segments: Sequence["_Segment"]) -> "_Segment":
+        """One segment with the postings of segments over disjoint documents."""
+        parts = [segment.occurrences() for segment in segments]
+        return cls.build(*(np.concatenate(column) for column in zip(*parts)))
+
+class BM25Index:
+    """Lexical BM25 index over sandhi-split words and phoneme n-grams.
+
+    Every document is analyzed into terms: its whitespace words, the sandhi
+    segments of words that split (``SandhiProcessor.reverse``), and the
+    phoneme n-grams of each word from ``SanskritTokenizer`` ids. N-gram terms
+    are packed into integers directly (the ids are base-``vocab_size``
+    digits), so only words need a vocabulary.
+
+    Postings are stored compressed in segments: each ``add`` writes a new
+    segment of delta- and varint-encoded doc ids and term frequencies, so
+    indexing is incremental. The newest two segments are merged while the
+    older holds at most ``merge_factor`` times the postings of the newer,
+    which keeps O(log N) segments and re-encodes every posting O(log N)
+    times. A query decodes only the postings of its own terms, rarest
+    first, up to ``max_query_postings``: the most common terms (frequent
+    phoneme n-grams and particles) carry little BM25 weight, and skipping
+    them bounds the query cost as the corpus grows.
+    """
+
+    def __init__(self, tokenizer=None, ngram: int = 3, k1: float = 1.2, b: float = 0.75,
+                 max_query_postings: int = 100000, merge_factor: int = 1):
+        """Initialize an empty index.
+
+        Args:
+            tokenizer: SanskritTokenizer for phonemes and sandhi (created when None)
+            ngram: Phoneme n-gram length (0 disables n-gram terms)
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+            max_query_postings: Postings budget of a query (the rarest term
+                is always scored)
+            merge_factor: Segment size ratio below which segments are merged
+        """
+        if tokenizer is None:
+            from src.vlm.core.tokenizer import SanskritTokenizer
+            tokenizer = SanskritTokenizer()
+        self.tokenizer = tokenizer
+        self.ngram = ngram
+        self.k1 = k1
+        self.b = b
+        self.max_query_postings = max_query_postings
+        self.merge_factor = merge_factor
+        self.base = tokenizer.vocab_size
+        # Term ids below num_ngram_terms are packed n-grams; words follow
+        self.num_ngram_terms = self.base ** ngram if ngram else 0
+        self.words: Dict[str, int] = {}
+        self._word_term_ids: Dict[str, Tuple[int, ...]] = {}
+        self.doc_lengths = np.zeros(0, dtype=np.int32)
+        self.total_length = 0
+        self.doc_freqs = np.zeros(self.num_ngram_terms, dtype=np.int64)
+        self.segments: List[_Segment] = []
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def _word_terms(self, text: str, add: bool) -> List[int]:
+        terms = []
+        for word in text.split():
+            term_ids = self._word_term_ids.get(word)
+            if term_ids is None:
+                term_ids = self._analyze_word(word, add)
+            terms.extend(term_ids)
+        return terms
+
+    def _analyze_word(self, word: str, add: bool) -> Tuple[int, ...]:
+        """Term ids of a word and its sandhi segments, memoized once all are known."""
+        pieces = self.tokenizer.sandhi_processor.reverse(word)
+        term_ids = []
+        for term in [word] + (pieces if len(pieces) > 1 else []):
+            term_id = self.words.get(term)
+            if term_id is None and add:
+                term_id = self.words[term] = self.num_ngram_terms + len(self.words)
+            if term_id is not None:
+                term_ids.append(term_id)
+        if len(term_ids) == 1 + (len(pieces) > 1) * len(pieces):
+            self._word_term_ids[word] = tuple(term_ids)
+        return tuple(term_ids)
+
+    def analyze(self, texts: Sequence[str], add: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Term ids of a batch of texts.
+
+        Args:
+            texts: Texts to analyze
+            add: Give unseen words new term ids (else they are dropped)
+
+        Returns:
+            tuple: Flat term ids and the number of terms per text
+        """
+        texts = [normalize_text(text) for text in texts]
+        words = [self._word_terms(text, add) for text in texts]
+        word_counts = np.fromiter(map(len, words), dtype=np.int64, count=len(texts))
+        word_ids = np.fromiter((t for terms in words for t in terms), dtype=np.int64, count=int(word_counts.sum()))
+        if not self.ngram:
+            return word_ids, word_counts
+
+        # N-grams of phoneme ids; special ids (spaces and unknown characters
+        # become <unk>) break words, so windows containing one are dropped
+        ids, lengths = self.tokenizer._phoneme_ids(texts)
+        owner = np.repeat(np.arange(len(texts)), lengths)
+        starts = np.arange(max(len(ids) - self.ngram + 1, 0))
+        keys = np.zeros(len(starts), dtype=np.int64)
+        valid = np.ones(len(starts), dtype=bool)
+        for j in range(self.ngram):
+            window = ids[starts + j]
+            keys = keys * self.base + window
+            valid &= (window > self.tokenizer.mask_token_id) & (owner[starts + j] == owner[starts])
+        ngram_owner = owner[starts[valid]]
+        ngram_counts = np.bincount(ngram_owner, minlength=len(texts))
+
+        owners = np.concatenate([np.repeat(np.arange(len(texts)), word_counts), ngram_owner])
+        order = np.argsort(owners, kind="stable")
+        return np.concatenate([word_ids, keys[valid]])[order], word_counts + ngram_counts
+
+    def add(self, texts: Sequence[str]) -> np.ndarray:
+        """Index a batch of texts as a new segment.
+
+        Args:
+            texts: Document texts
+
+        Returns:
+            np.ndarray: Ids of the new documents
+        """
+        start = len(self)
+        term_ids, counts = self.analyze(texts, add=True)
+        doc_ids = np.repeat(np.arange(start, start + len(texts)), counts)
+        self.doc_lengths = np.concatenate([self.doc_lengths, counts.astype(np.int32)])
+        self.total_length += int(counts.sum())
+        self.doc_freqs = np.concatenate([
+            self.doc_freqs, np.zeros(self.num_ngram_terms + len(self.words) - len(self.doc_freqs), dtype=np.int64)
+        ])
+        if len(term_ids):
+            segment = _Segment.build(term_ids, doc_ids)
+            self.doc_freqs[segment.terms] += segment.counts
+            self.segments.append(segment)
+        while len(self.segments) > 1 and \
+                self.segments[-2].counts.sum() <= self.merge_factor * self.segments[-1].counts.sum():
+            self.segments[-2:] = [_Segment.merge(self.segments[-2:])]
+        return np.arange(start, len(self))
+
+    def merge(self):
+        """Merge all segments into one."""
+        if len(self.segments) > 1:
+            self.segments = [_Segment.merge(self.segments)]
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 top-``k`` documents for a query.
+
+        Args:
+            query: Query text
+            k: Number of results
+
+        Returns:
+            tuple: Scores [k'] (float32) and doc ids [k'] (int64), best
+            first, for the k' <= k documents sharing a term with the query
+        """
+        empty = (np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64))
+        terms, _ = self.analyze([query])
+        if not self.segments or not len(terms):
+            return empty
+        terms = np.unique(terms)
+        doc_freqs = self.doc_freqs[terms]
+        order = np.argsort(doc_freqs[doc_freqs > 0], kind="stable")
+        terms, doc_freqs = terms[doc_freqs > 0][order], doc_freqs[doc_freqs > 0][order]
+        budget = max(1, int(np.searchsorted(np.cumsum(doc_freqs), self.max_query_postings, side="right")))
+        terms, doc_freqs = terms[:budget], doc_freqs[:budget]
+
+        n = len(self)
+        idf = np.log1p((n - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        parts = [segment.postings(terms) for segment in self.segments]
+        which, docs, tfs = (np.concatenate(column) for column in zip(*parts))
+        if not len(docs):
+            return empty
+        norms = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / max(self.total_length / n, 1e-9))
+        contributions = idf[which] * tfs * (self.k1 + 1) / (tfs + norms)
+
+        # Heavy queries accumulate into a dense score array, light ones sort
+        if len(docs) * 8 >= n:
+            scores = np.bincount(docs, weights=contributions, minlength=n)
+            candidates = np.flatnonzero(scores)
+            scores = scores[candidates]
+        else:
+            candidates, inverse = np.unique(docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=contributions)
+        best, columns = top_k(scores[None, :], k)
+        return best[0].astype(np.float32), candidates[columns[0]]
+
+    def save(self, path: str):
+        """Save the index (merged into one segment) to the directory ``path``."""
+        self.merge()
+        os.makedirs(path, exist_ok=True)
+        segment = self.segments[0] if self.segments else _Segment.build(
+            np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        for name in _Segment.__slots__:
+            save_array(path, name, getattr(segment, name))
+        save_array(path, "doc_lengths", self.doc_lengths)
+        save_array(path, "doc_freqs", self.doc_freqs)
+        words = sorted(self.words, key=self.words.get)
+        save_array(path, "words", np.frombuffer("\n".join(words).encode("utf-8"), dtype=np.uint8))
+        save_json(os.path.join(path, LEXICAL_META), {
+            "format_version": LEXICAL_FORMAT_VERSION, "count": len(self), "ngram": self.ngram,
+            "base": self.base, "k1": self.k1, "b": self.b,
+            "max_query_postings": self.max_query_postings, "merge_factor": self.merge_factor,
+        })
+
+    @classmethod
+    def load(cls, path: str, tokenizer=None, mmap: bool = True) -> "BM25Index":
+        """Load an index saved with ``save``; postings are memory-mapped by default.
+
+        Raises:
+            ValueError: If the index was written by an incompatible version
+                or for a tokenizer with a different vocabulary size
+        """
+        with open(os.path.join(path, LEXICAL_META), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != LEXICAL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported lexical index format version {meta.get('format_version')} in {path}")
+        index = cls(tokenizer, ngram=meta["ngram"], k1=meta["k1"], b=meta["b"],
+                    max_query_postings=meta["max_query_postings"], merge_factor=meta["merge_factor"])
+        if index.base != meta["base"]:
+            raise ValueError(f"Tokenizer vocabulary size {index.base} does not match index ({meta['base']})")
+        segment = _Segment(*(load_array(path, name, mmap) for name in _Segment.__slots__))
+        index.segments = [segment] if len(segment.terms) else []
+        index.doc_lengths = load_array(path, "doc_lengths", mmap=False)
+        index.total_length = int(index.doc_lengths.sum())
+        index.doc_freqs = load_array(path, "doc_freqs", mmap=False)
+        words = bytes(load_array(path, "words", mmap=False)).decode("utf-8")
+        index.words = {word: index.num_ngram_terms + i for i, word in enumerate(words.split("\n"))} if words else {}
+        return index
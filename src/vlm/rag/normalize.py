@@ -0,0 +1,72 @@
+import re
+import unicodedata
+
+from src.vlm.rag.embedder import normalize_text
+
+_VOWELS = {
+    "अ": "a", "आ": "ā", "इ": "i", "ई": "ī", "उ": "u", "ऊ": "ū", "ऋ": "ṛ", "ॠ": "ṝ",
+    "ऌ": "ḷ", "ॡ": "ḹ", "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au",
+}
+_VOWEL_SIGNS = {
+    "ा": "ā", "ि": "i", "ी": "ī", "ु": "u", "ू": "ū", "ृ": "ṛ", "ॄ": "ṝ",
+    "ॢ": "ḷ", "ॣ": "ḹ", "े": "e", "ै": "ai", "ो": "o", "ौ": "au",
+}
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "ṅ",
+    "च": "c", "छ": "ch", "ज": "j", "झ": "jh", "ञ": "ñ",
+    "ट": "ṭ", "ठ": "ṭh", "ड": "ḍ", "ढ": "ḍh", "ण": "ṇ",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "व": "v", "ळ": "ḷ",
+    "श": "ś", "ष": "ṣ", "स": "s", "ह": "h",
+}
+_MARKS = {"ं": "ṃ", "ः": "ḥ", "ँ": "m̐", "ऽ": "'", **{chr(0x0966 + d): str(d) for d in range(10)}}
+_VIRAMA = "्"
+_NUKTA = "़"
+
+# Spellings of the same IAST letter in other romanizations (ISO 15919 and
+# common anusvāra variants), folded to the forms used in the corpus
+_VARIANTS = [("r̥̄", "ṝ"), ("l̥̄", "ḹ"), ("r̥", "ṛ"), ("l̥", "ḷ"), ("ṁ", "ṃ")]
+_PUNCTUATION = re.compile(r"[।॥|.,;:!?\"“”‘’()\[\]{}\-–—]+")
+
+def devanagari_to_iast(text: str) -> str:
+    """Transliterate Devanagari to IAST, leaving other characters as they are."""
+    out = []
+    pending_a = False
+    for char in text:
+        if char in _VOWEL_SIGNS:
+            out.append(_VOWEL_SIGNS[char])
+            pending_a = False
+            continue
+        if char == _VIRAMA:
+            pending_a = False
+            continue
+        if char == _NUKTA:
+            continue
+        if pending_a:
+            out.append("a")
+            pending_a = False
+        if char in _CONSONANTS:
+            out.append(_CONSONANTS[char])
+            pending_a = True
+        else:
+            out.append(_VOWELS.get(char) or _MARKS.get(char) or char)
+    if pending_a:
+        out.append("a")
+    return "".join(out)
+
+def normalize_query(text: str, transliterate: bool = True) -> str:
+    """Canonical form of a query.
+
+    Queries that differ only in whitespace, case, punctuation, Unicode
+    composition or script (Devanagari versus IAST, ISO 15919 spellings) map
+    to the same string. With ``transliterate`` False the script and
+    romanization are kept, so the result can be searched in place of the
+    query against documents indexed in their own script.
+    """
+    text = unicodedata.normalize("NFC", text)
+    if transliterate:
+        text = unicodedata.normalize("NFD", devanagari_to_iast(text))
+        for variant, canonical in _VARIANTS:
+            text = text.replace(unicodedata.normalize("NFD", variant), unicodedata.normalize("NFD", canonical))
+    return normalize_text(_PUNCTUATION.sub(" ", text))
@@ -1,39 +1,261 @@
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import itertools
+import json
+import os
+
+import numpy as np
+
+from src.vlm.rag.context import tokenize_passages
+from src.vlm.rag.embedder import HashingEmbedder
+from src.vlm.rag.index import create_index, load_index, save_json
+from src.vlm.rag.lexical import LEXICAL_META, BM25Index
+from src.vlm.rag.store import DocumentStore
+
+RETRIEVER_META = "retriever.json"
+RETRIEVAL_MODES = ("hybrid", "dense", "lexical")
+
+# Index versions are unique across retrievers, so a cache keyed on one never
+# mistakes another retriever's index for its own
+_index_versions = itertools.count(1)
+
+def reciprocal_rank_fusion(rankings: Sequence[np.ndarray], k: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse ranked id lists by reciprocal rank: score(d) = sum 1 / (k + rank).
+
+    Args:
+        rankings: Ids of every ranking, best first
+        k: Rank offset damping the weight of the top ranks
+
+    Returns:
+        tuple: Fused ids and scores, best first
+    """
+    ids = np.concatenate([np.asarray(ranking, dtype=np.int64) for ranking in rankings])
+    weights = np.concatenate([1.0 / (k + 1 + np.arange(len(ranking))) for ranking in rankings])
+    unique, inverse = np.unique(ids, return_inverse=True)
+    scores = np.bincount(inverse, weights=weights)
+    order = np.argsort(-scores, kind="stable")
+    return unique[order], scores[order]
+
+@dataclass
+class RetrievalResults:
+    """Results of a batch of queries as [Q, k] arrays.
+
+    Row i holds the ids and scores of query i, best first; rows with fewer
+    than k results are padded with id -1 and score -inf. ``documents`` holds
+    the hydrated documents of every row when requested.
+    """
+    ids: np.ndarray
+    scores: np.ndarray
+    documents: Optional[List[List[Dict[str, Any]]]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def hits(self, row: int) -> List[Dict[str, Any]]:
+        """Results of one query as dicts with 'id', 'text', 'metadata' and 'score'.
+
+        Raises:
+            ValueError: If the results were not hydrated
+        """
+        if self.documents is None:
+            raise ValueError("Results were retrieved without documents; pass hydrate=True")
+        return [
+            {"id": doc_id, **document, "score": score}
+            for doc_id, score, document in zip(self.ids[row].tolist(), self.scores[row].tolist(),
+                                               self.documents[row])
+        ]
 
 class IndicRetriever:
     """Retriever for Indic knowledge bases.
-    
+
     This module implements dense retrieval from Sanskrit and Indic knowledge sources,
     enabling the VLM to augment its reasoning with external knowledge.
+
+    Documents are embedded (by default with a HashingEmbedder) into a flat
+    (exact) or IVF (approximate) inner-product index. ``save`` writes the
+    index and the documents to a directory; a retriever constructed with
+    that ``index_path`` memory-maps them back, so startup takes the same few
+    milliseconds for any corpus size.
+
+    Dense embeddings miss exact mantra matches, so documents also go into a
+    BM25Index over sandhi-split words and phoneme n-grams. Hybrid retrieval
+    fuses the dense and lexical rankings with reciprocal-rank fusion.
+
+    ``version`` changes whenever the indexed documents change, so callers
+    can invalidate anything derived from earlier results.
+
+    Indexing also tokenizes every document's context passage into the
+    document store, so generation packs stored token ids instead of
+    tokenizing retrieved text per request.
     """
-    
-    def __init__(self, index_path=None):
+
+    def __init__(self, index_path=None, embedder=None, index_type: str = "flat",
+                 nlist: int = 64, nprobe: int = 8, mmap: bool = True, lexical: bool = True,
+                 tokenizer=None, rrf_k: int = 60, fusion_depth: int = 50):
         """Initialize the retriever.
-        
+
         Args:
-            index_path: Path to the pre-built vector index
+            index_path: Path to the pre-built vector index; loaded if it
+                exists, and the default target of ``save``
+            embedder: Text embedder with ``dim`` and ``embed(texts)``; for a
+                loaded index, a HashingEmbedder matching the saved settings
+                when None
+            index_type: 'flat' for exact or 'ivf' for approximate search
+                (ignored when loading)
+            nlist: Number of IVF clusters
+            nprobe: IVF clusters scanned per query
+            mmap: Memory-map a loaded index instead of reading it
+            lexical: Keep a BM25 index for lexical and hybrid retrieval
+                (a loaded retriever has one if it was saved with one)
+            tokenizer: SanskritTokenizer of the lexical index and the stored
+                passage tokens (created when None)
+            rrf_k: Reciprocal-rank fusion constant
+            fusion_depth: Results taken from each ranking before fusion
         """
-        # TODO: Initialize retriever components
-        self.index = None
-        
-    def index_documents(self, documents: List[Dict[str, Any]]):
+        self.index_path = index_path
+        self.embedder = embedder
+        self.rrf_k = rrf_k
+        self.fusion_depth = fusion_depth
+        self.version = next(_index_versions)
+        self._tokenizer = tokenizer
+        if index_path is not None and os.path.exists(os.path.join(index_path, RETRIEVER_META)):
+            self._load(index_path, mmap, tokenizer)
+            return
+        if self.embedder is None:
+            self.embedder = HashingEmbedder()
+        options = {"nlist": nlist, "nprobe": nprobe} if index_type == "ivf" else {}
+        self.index = create_index(index_type, self.embedder.dim, **options)
+        self.lexical = BM25Index(tokenizer) if lexical else None
+        self.documents = DocumentStore()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            if self.lexical is not None:
+                self._tokenizer = self.lexical.tokenizer
+            else:
+                from src.vlm.core.tokenizer import SanskritTokenizer
+                self._tokenizer = SanskritTokenizer()
+        return self._tokenizer
+
+    def _load(self, path: str, mmap: bool, tokenizer=None):
+        with open(os.path.join(path, RETRIEVER_META), encoding="utf-8") as f:
+            meta = json.load(f)
+        if self.embedder is None:
+            if meta["embedder"].get("kind") != HashingEmbedder.kind:
+                raise ValueError(f"Index at {path} needs a {meta['embedder'].get('kind')!r} embedder")
+            self.embedder = HashingEmbedder.from_config(meta["embedder"])
+        elif getattr(self.embedder, "dim", None) != meta["embedder"]["dim"]:
+            raise ValueError(f"Embedder dimension {self.embedder.dim} does not match index dimension "
+                             f"{meta['embedder']['dim']}")
+        self.index = load_index(os.path.join(path, "index"), mmap=mmap)
+        self.documents = DocumentStore.load(os.path.join(path, "documents"), mmap=mmap)
+        lexical_path = os.path.join(path, "lexical")
+        self.lexical = None
+        if os.path.exists(os.path.join(lexical_path, LEXICAL_META)):
+            self.lexical = BM25Index.load(lexical_path, tokenizer=tokenizer, mmap=mmap)
+
+    def save(self, path: Optional[str] = None):
+        """Save the index and documents to a directory.
+
+        Args:
+            path: Target directory (``index_path`` when None)
+
+        Raises:
+            ValueError: If no path is given or configured
+        """
+        path = path or self.index_path
+        if path is None:
+            raise ValueError("No path to save the retriever to")
+        self.documents.save(os.path.join(path, "documents"))
+        self.index.save(os.path.join(path, "index"))
+        if self.lexical is not None:
+            self.lexical.save(os.path.join(path, "lexical"))
+        config = self.embedder.config() if hasattr(self.embedder, "config") else {"dim": self.embedder.dim}
+        save_json(os.path.join(path, RETRIEVER_META), {"embedder": config, "count": len(self)})
+
+    def index_documents(self, documents: List[Dict[str, Any]], batch_size: int = 4096):
         """Index a collection of documents.
-        
+
         Args:
             documents: List of document dictionaries with 'text' and 'metadata'
+            batch_size: Documents embedded at a time
         """
-        # TODO: Implement document indexing
-        pass
-    
-    def retrieve(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        documents = list(documents)
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            texts = [document["text"] for document in batch]
+            self.index.add(self.embedder.embed(texts))
+            if self.lexical is not None:
+                self.lexical.add(texts)
+            self.documents.extend(batch, tokens=tokenize_passages(self.tokenizer, batch))
+        if documents:
+            self.version = next(_index_versions)
+
+    def retrieve(self, query: str, k: int = 5, mode: str = "hybrid") -> List[Dict[str, Any]]:
         """Retrieve relevant documents for a query.
-        
+
         Args:
             query: The query string
             k: Number of documents to retrieve
-            
+            mode: 'hybrid' (reciprocal-rank fusion of both rankings),
+                'dense' or 'lexical'; hybrid falls back to dense without a
+                lexical index
+
         Returns:
-            List of retrieved documents with scores
+            List of retrieved documents with scores: dicts with 'id', 'text',
+            'metadata' and 'score' (similarity, BM25 or fused score), best first
         """
-        # TODO: Implement retrieval logic
-        return []
+        return self.retrieve_batch([query], k=k, mode=mode, hydrate=True).hits(0)
+
+    def retrieve_batch(self, queries: Sequence[str], k: int = 5, mode: str = "hybrid",
+                       hydrate: bool = False) -> RetrievalResults:
+        """Retrieve documents for many queries at once.
+
+        All queries are embedded in one batch and scored against the dense
+        index with one matrix product per chunk, with ``argpartition`` top-k
+        selection; the lexical ranking (in lexical and hybrid modes) is
+        computed per query.
+
+        Args:
+            queries: Query strings
+            k: Number of documents per query
+            mode: 'hybrid', 'dense' or 'lexical', as in ``retrieve``
+            hydrate: Also load the text and metadata of every result
+
+        Returns:
+            RetrievalResults: [Q, k] ids and scores, plus documents when hydrated
+        """
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {mode!r}; expected one of {RETRIEVAL_MODES}")
+        if mode == "lexical" and self.lexical is None:
+            raise ValueError("Retriever has no lexical index")
+        if mode == "hybrid" and self.lexical is None:
+            mode = "dense"
+        k = max(k, 0)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+        if len(self) and k and len(queries):
+            depth = k if mode != "hybrid" else max(k, self.fusion_depth)
+            if mode != "lexical":
+                dense_scores, dense_ids = self.index.search(self.embedder.embed(queries), depth)
+            if mode == "dense":
+                ids, scores = dense_ids[:, :k], dense_scores[:, :k]
+            else:
+                for row, query in enumerate(queries):
+                    row_scores, row_ids = self.lexical.search(query, depth)
+                    if mode == "hybrid":
+                        dense = dense_ids[row][dense_ids[row] >= 0]
+                        row_ids, row_scores = reciprocal_rank_fusion([dense, row_ids], k=self.rrf_k)
+                    found = min(k, len(row_ids))
+                    ids[row, :found], scores[row, :found] = row_ids[:found], row_scores[:found]
+
+        results = RetrievalResults(ids, scores)
+        if hydrate:
+            results.documents = [[self.documents[doc_id] for doc_id in row if doc_id >= 0]
+                                 for row in ids.tolist()]
+        return results
@@ -0,0 +1,136 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import os
+
+import numpy as np
+
+from src.vlm.rag.context import TOKEN_DTYPE
+from src.vlm.rag.index import load_array, save_array
+
+def _pack(items: List[bytes]) -> tuple:
+    """Concatenate byte strings into a uint8 blob plus [N + 1] offsets."""
+    lengths = np.fromiter(map(len, items), dtype=np.int64, count=len(items))
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    return np.frombuffer(b"".join(items), dtype=np.uint8), offsets
+
+class DocumentStore:
+    """Append-only store of document texts and metadata, addressed by id.
+
+    Saved as two byte blobs (UTF-8 texts and JSON metadata) with offset
+    arrays. Loaded stores memory-map the blobs, so startup does not depend on
+    corpus size and a document is only decoded when it is returned.
+
+    Documents can also carry the token ids of their context passage (see
+    ``context.tokenize_passages``), stored the same way, so passages are
+    tokenized once at indexing time rather than on every request.
+    """
+
+    def __init__(self):
+        self._texts, self._text_offsets = _pack([])
+        self._metadata, self._metadata_offsets = _pack([])
+        self._tokens = np.empty(0, dtype=TOKEN_DTYPE)
+        self._token_offsets = np.zeros(1, dtype=np.int64)
+        self._body_starts = np.empty(0, dtype=np.int64)
+        # Documents (and their tokens, if any) added since the store was loaded
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_tokens: List[Optional[Tuple[np.ndarray, int]]] = []
+
+    @property
+    def _stored(self) -> int:
+        return len(self._text_offsets) - 1
+
+    def __len__(self) -> int:
+        return self._stored + len(self._pending)
+
+    @property
+    def _stored_tokens(self) -> bool:
+        """Whether every saved document has tokens."""
+        return len(self._token_offsets) - 1 == self._stored
+
+    def extend(self, documents: Iterable[Dict[str, Any]],
+               tokens: Optional[Sequence[Tuple[np.ndarray, int]]] = None):
+        """Append documents (dicts with 'text' and optional 'metadata').
+
+        Args:
+            documents: Documents to append
+            tokens: Optional (ids, body_start) pair of every document's passage
+        """
+        documents = list(documents)
+        if tokens is not None and len(tokens) != len(documents):
+            raise ValueError(f"Got tokens for {len(tokens)} of {len(documents)} documents")
+        self._pending.extend(
+            {"text": document["text"], "metadata": document.get("metadata") or {}} for document in documents
+        )
+        self._pending_tokens.extend(
+            [(np.asarray(ids, dtype=TOKEN_DTYPE), int(start)) for ids, start in tokens]
+            if tokens is not None else [None] * len(documents)
+        )
+
+    def __getitem__(self, doc_id: int) -> Dict[str, Any]:
+        """Document ``doc_id`` as a dict with 'text' and 'metadata'."""
+        if not 0 <= doc_id < len(self):
+            raise IndexError(f"Document id {doc_id} out of range")
+        if doc_id >= self._stored:
+            return self._pending[doc_id - self._stored]
+        return {"text": self.text(doc_id), "metadata": self.metadata(doc_id)}
+
+    def text(self, doc_id: int) -> str:
+        if doc_id >= self._stored:
+            return self[doc_id]["text"]
+        start, end = self._text_offsets[doc_id:doc_id + 2]
+        return bytes(self._texts[start:end]).decode("utf-8")
+
+    def metadata(self, doc_id: int) -> Dict[str, Any]:
+        if doc_id >= self._stored:
+            return self[doc_id]["metadata"]
+        start, end = self._metadata_offsets[doc_id:doc_id + 2]
+        return json.loads(bytes(self._metadata[start:end]))
+
+    def tokens(self, doc_id: int) -> Optional[Tuple[np.ndarray, int]]:
+        """Passage ids and body start of a document, or None if it has no tokens."""
+        if not 0 <= doc_id < len(self):
+            raise IndexError(f"Document id {doc_id} out of range")
+        if doc_id >= self._stored:
+            return self._pending_tokens[doc_id - self._stored]
+        if not self._stored_tokens:
+            return None
+        start, end = self._token_offsets[doc_id:doc_id + 2]
+        return self._tokens[start:end], int(self._body_starts[doc_id])
+
+    def save(self, path: str):
+        """Save the store to the directory ``path``.
+
+        Tokens are saved only if every document has them.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name, blob, offsets, encode in (
+            ("texts", self._texts, self._text_offsets, lambda d: d["text"].encode("utf-8")),
+            ("metadata", self._metadata, self._metadata_offsets,
+             lambda d: json.dumps(d["metadata"], ensure_ascii=False).encode("utf-8")),
+        ):
+            new_blob, new_offsets = _pack([encode(document) for document in self._pending])
+            save_array(path, name, np.concatenate([blob, new_blob]))
+            save_array(path, f"{name}_offsets", np.concatenate([offsets, offsets[-1] + new_offsets[1:]]))
+        if self._stored_tokens and all(entry is not None for entry in self._pending_tokens):
+            pending = [ids for ids, _ in self._pending_tokens]
+            lengths = np.fromiter(map(len, pending), dtype=np.int64, count=len(pending))
+            save_array(path, "tokens", np.concatenate([self._tokens, *pending]).astype(TOKEN_DTYPE))
+            save_array(path, "tokens_offsets",
+                       np.concatenate([self._token_offsets, self._token_offsets[-1] + np.cumsum(lengths)]))
+            save_array(path, "tokens_body", np.concatenate(
+                [self._body_starts, [start for _, start in self._pending_tokens]]).astype(np.int64))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "DocumentStore":
+        """Load a store saved with ``save``, memory-mapping the blobs by default."""
+        store = cls()
+        store._texts = load_array(path, "texts", mmap)
+        store._text_offsets = load_array(path, "texts_offsets", mmap)
+        store._metadata = load_array(path, "metadata", mmap)
+        store._metadata_offsets = load_array(path, "metadata_offsets", mmap)
+        if os.path.exists(os.path.join(path, "tokens_body.npy")):
+            # Tokens saved with fewer documents than the texts are stale; _stored_tokens ignores them
+            store._tokens = load_array(path, "tokens", mmap)
+            store._token_offsets = load_array(path, "tokens_offsets", mmap)
+            store._body_starts = load_array(path, "tokens_body", mmap)
+        return store
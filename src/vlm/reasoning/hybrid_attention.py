@@ -1,30 +1,187 @@
+from typing import Tuple
+import warnings
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
+
+from src.vlm.core.masking import BlockMask, CSRMask, to_attention_bias
+
+def _group_index(groups: torch.Tensor, positions: torch.Tensor, num_groups: int) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Lay out positions by group in a padded [G, max group size] index.
+
+    Args:
+        groups: Group of every position [N]
+        positions: Flat positions [N]
+        num_groups: Number of groups G
+
+    Returns:
+        tuple: Index [G, M] of positions (-1 for padding) and group sizes [G]
+    """
+    order = torch.argsort(groups, stable=True)
+    sorted_groups = groups[order]
+    counts = torch.bincount(sorted_groups, minlength=num_groups)
+    starts = counts.cumsum(0) - counts
+    rank = torch.arange(len(order), device=groups.device) - starts[sorted_groups]
+    index = torch.full((num_groups, int(counts.max()) if len(order) else 0), -1,
+                       dtype=torch.long, device=groups.device)
+    index[sorted_groups, rank] = positions[order]
+    return index, counts
 
 class HybridAttention(nn.Module):
     """Hybrid attention mechanism combining neural and rule-based attention.
-    
+
     This module implements a novel attention mechanism that blends learned weights
     with rule-defined attention masks based on Śāstra principles.
+
+    Rule masks reach ``F.scaled_dot_product_attention`` as an additive bias,
+    broadcast over heads rather than expanded per head. Block-structured
+    rules (sandhi-boundary or pāda-level segments) given as a BlockMask never
+    become a dense tensor: every block is attended on its own, which also
+    skips the work for pairs of positions that the rules exclude. Arbitrary
+    sparse rules given as a CSRMask (see RuleMaskCompiler) are attended pair
+    by pair, in O(nnz) time and memory.
     """
-    
-    def __init__(self, dim, heads=8):
+
+    def __init__(self, dim, heads=8, dropout=0.0):
         super().__init__()
+        if dim % heads:
+            raise ValueError(f"dim {dim} is not divisible by heads {heads}")
         self.dim = dim
         self.heads = heads
-        # TODO: Initialize attention components
-        
+        self.head_dim = dim // heads
+        self.dropout = dropout
+        self.query_proj = nn.Linear(dim, dim)
+        self.key_proj = nn.Linear(dim, dim)
+        self.value_proj = nn.Linear(dim, dim)
+        self.out_proj = nn.Linear(dim, dim)
+
+    def _heads(self, x):
+        """[B, L, D] -> [B, H, L, Dh]"""
+        batch, length, _ = x.shape
+        return x.view(batch, length, self.heads, self.head_dim).transpose(1, 2)
+
     def forward(self, query, key, value, rule_mask=None):
         """Forward pass for hybrid attention.
-        
+
         Args:
             query: Query tensor [B, L, D]
             key: Key tensor [B, S, D]
             value: Value tensor [B, S, D]
-            rule_mask: Optional rule-based attention mask [B, L, S]
-            
+            rule_mask: Optional rule-based attention mask: a dense [B, L, S]
+                mask (e.g. the block-diagonal mask of packed sequences), any
+                other format accepted by ``to_attention_bias``, a BlockMask
+                of segment ids, or a sparse CSRMask
+
         Returns:
-            torch.Tensor: Attention output
+            torch.Tensor: Attention output [B, L, D]; with a BlockMask or
+            CSRMask, queries without keys (such as padding) attend to
+            nothing and only get the output projection bias
         """
-        # TODO: Implement hybrid attention logic
-        pass
+        dropout_p = self.dropout if self.training else 0.0
+        if isinstance(rule_mask, BlockMask):
+            out = self._block_attention(
+                self.query_proj(query), self.key_proj(key), self.value_proj(value), rule_mask, dropout_p
+            )
+            return self.out_proj(out)
+        if isinstance(rule_mask, CSRMask):
+            out = self._sparse_attention(
+                self.query_proj(query), self.key_proj(key), self.value_proj(value), rule_mask, dropout_p
+            )
+            return self.out_proj(out)
+
+        q = self._heads(self.query_proj(query))
+        k = self._heads(self.key_proj(key))
+        v = self._heads(self.value_proj(value))
+        rule_bias = to_attention_bias(rule_mask, dtype=q.dtype)
+        out = F.scaled_dot_product_attention(q, k, v, attn_mask=rule_bias, dropout_p=dropout_p)
+
+        batch, _, length, _ = out.shape
+        return self.out_proj(out.transpose(1, 2).reshape(batch, length, self.dim))
+
+    def _block_attention(self, q, k, v, mask: BlockMask, dropout_p: float):
+        """Attend within every (batch row, segment) block separately.
+
+        Projected queries and keys [B, L, D] are gathered into padded
+        [G, H, M, Dh] groups, one per block, so memory and compute scale
+        with the block sizes instead of L x S.
+        """
+        batch, length, dim = q.shape
+        query_segments, key_segments = mask.query_segments, mask.key_segments
+        self_attention = key_segments is query_segments
+        out = q.new_zeros(batch * length, dim)
+        query_positions = torch.nonzero(query_segments.flatten(), as_tuple=True)[0]
+        key_positions = query_positions if self_attention else torch.nonzero(key_segments.flatten(), as_tuple=True)[0]
+        if not len(query_positions) or not len(key_positions):
+            return out.view(batch, length, dim)
+
+        # Group ids shared by both sides; padding (segment 0) joins no group
+        num_segments = int(max(query_segments.max(), key_segments.max())) + 1
+        rows = torch.arange(batch, device=q.device)[:, None] * num_segments
+        query_keys = (rows + query_segments).flatten()[query_positions]
+        if self_attention:
+            groups, inverse = torch.unique(query_keys, return_inverse=True)
+            query_index, query_counts = _group_index(inverse, query_positions, len(groups))
+            key_index, key_counts = query_index, query_counts
+        else:
+            key_keys = (rows + key_segments).flatten()[key_positions]
+            groups, inverse = torch.unique(torch.cat([query_keys, key_keys]), return_inverse=True)
+            query_index, _ = _group_index(inverse[:len(query_positions)], query_positions, len(groups))
+            key_index, key_counts = _group_index(inverse[len(query_positions):], key_positions, len(groups))
+
+        def gather(x, index):
+            grouped = x.reshape(-1, dim).index_select(0, index.clamp_min(0).flatten())
+            return grouped.view(*index.shape, self.heads, self.head_dim).transpose(1, 2)
+
+        bias = None
+        if (key_index < 0).any():
+            bias = torch.zeros(key_index.shape, dtype=q.dtype, device=q.device)
+            bias = bias.masked_fill(key_index < 0, torch.finfo(q.dtype).min)[:, None, None, :]
+        grouped = F.scaled_dot_product_attention(
+            gather(q, query_index), gather(k, key_index), gather(v, key_index),
+            attn_mask=bias, dropout_p=dropout_p,
+        )
+
+        # Scatter back the real queries of groups that have keys
+        grouped = grouped.transpose(1, 2).reshape(*query_index.shape, dim)
+        keep = (query_index >= 0) & (key_counts > 0)[:, None]
+        out = out.index_copy(0, query_index[keep], grouped[keep])
+        return out.view(batch, length, dim)
+
+    def _sparse_attention(self, q, k, v, mask: CSRMask, dropout_p: float):
+        """Attend over the allowed (query, key) pairs of a CSR mask only.
+
+        The batch is laid out as one block-diagonal (B * L) x (B * S) sparse
+        matrix. Scores come from a sampled matrix product (SDDMM) at the
+        stored pairs, the softmax runs over the nnz scores of every row, and
+        the output is a sparse-dense product (SpMM), so every step is O(nnz).
+        """
+        batch, length, dim = q.shape
+        source = k.size(1)
+        rows = mask.row_indices()
+        cols = torch.div(rows, length, rounding_mode="floor") * source + mask.indices
+        size = (batch * length, batch * source)
+        # [B, L, D] -> [H, B * L, Dh]
+        split = lambda x: x.reshape(-1, self.heads, self.head_dim).transpose(0, 1).contiguous()
+        q, k, v = split(q * self.head_dim ** -0.5), split(k), split(v)
+
+        zeros = _csr(mask.indptr, cols, q.new_zeros(mask.nnz), size)
+        scores = torch.stack([torch.sparse.sampled_addmm(zeros, q[h], k[h].t()).values()
+                              for h in range(self.heads)], dim=1)
+        index = rows[:, None].expand_as(scores)
+        row_max = scores.new_full((batch * length, self.heads), float("-inf"))
+        row_max = row_max.scatter_reduce(0, index, scores, "amax").detach()
+        weights = (scores - row_max.index_select(0, rows)).exp()
+        totals = scores.new_zeros(batch * length, self.heads).index_add(0, rows, weights)
+        weights = weights / totals.index_select(0, rows)
+        if dropout_p:
+            weights = F.dropout(weights, dropout_p)
+
+        out = torch.stack([torch.sparse.mm(_csr(mask.indptr, cols, weights[:, h], size), v[h])
+                           for h in range(self.heads)], dim=1)
+        return out.view(batch, length, dim)
+
+def _csr(indptr, indices, values, size):
+    """Sparse CSR tensor, without the beta-support warning."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.sparse_csr_tensor(indptr, indices, values, size=size)
@@ -0,0 +1,291 @@
+from typing import List, Optional, Sequence, Tuple, Union
+import re
+
+import numpy as np
+import torch
+
+from src.utils.cache import LRUCache
+from src.vlm.core.masking import BlockMask, CSRMask
+
+# Grammatical relations a compiled mask can allow attention along
+MASK_RULES = ("word", "compound", "subject_verb")
+
+_PIECE = re.compile(r"\s+|\S+")
+
+class RuleStructure:
+    """Token-level grammatical structure of one text.
+
+    Positions count phoneme tokens from 0, without special tokens. Allowed
+    attention is kept as ranges: query ``rows[i]`` may attend to keys
+    ``starts[i] .. starts[i] + sizes[i] - 1``. ``csr`` caches the compiled
+    rows of the untruncated text (special tokens included) as per-row entry
+    counts and column indices.
+    """
+
+    __slots__ = ("num_tokens", "segment_ids", "unit_ids", "rows", "starts", "sizes", "csr")
+
+    def __init__(self, num_tokens: int, segment_ids: np.ndarray, unit_ids: np.ndarray,
+                 rows: np.ndarray, starts: np.ndarray, sizes: np.ndarray):
+        self.num_tokens = num_tokens
+        self.segment_ids = segment_ids
+        self.unit_ids = unit_ids
+        self.rows = rows
+        self.starts = starts
+        self.sizes = sizes
+        self.csr: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+def _ranges_per_token(starts: np.ndarray, sizes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Rows, starts and sizes letting every token of each span see the whole span."""
+    rows = np.repeat(starts, sizes) + _offsets(sizes)
+    return rows, np.repeat(starts, sizes), np.repeat(sizes, sizes)
+
+def _offsets(sizes: np.ndarray) -> np.ndarray:
+    """0 .. size - 1 for every size, concatenated."""
+    return np.arange(int(sizes.sum())) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+class RuleMaskCompiler:
+    """Compile grammatical structure into sparse attention masks.
+
+    Every text is split into orthographic units (whitespace-separated), each
+    unit into words by sandhi reversal, and units are parsed by the grammar
+    engine. The resulting rules allow attention
+
+    - ``word``: within a word (sandhi-split segment),
+    - ``compound``: between the words of one unit (compound or sandhi group),
+    - ``subject_verb``: between nominative nouns and verbs of the sentence,
+
+    and ``<s>`` / ``</s>`` are global tokens. The structure of each text is
+    computed once and cached; batches are then assembled with array
+    operations into a CSRMask aligned with ``batch_encode_fast``, or into
+    word/compound BlockMasks.
+    """
+
+    def __init__(self, tokenizer=None, engine=None, rules: Sequence[str] = MASK_RULES,
+                 cache_size: int = 65536, config=None):
+        """Initialize the compiler.
+
+        Args:
+            tokenizer: SanskritTokenizer used for token positions (created when None)
+            engine: AshtadhyayiEngine used for parses (created when None)
+            rules: Relations to allow attention along, from MASK_RULES
+            cache_size: Maximum number of cached text structures
+            config: Optional VLMConfig; the engine created when ``engine`` is
+                None loads its ``grammar_rules_path``
+
+        Raises:
+            ValueError: If an unknown rule is requested
+        """
+        unknown = set(rules) - set(MASK_RULES)
+        if unknown:
+            raise ValueError(f"Unknown mask rules: {sorted(unknown)}")
+        if tokenizer is None:
+            from src.vlm.core.tokenizer import SanskritTokenizer
+            tokenizer = SanskritTokenizer()
+        if engine is None:
+            from src.vlm.grammar.ashtadhyayi import AshtadhyayiEngine
+            engine = AshtadhyayiEngine() if config is None else AshtadhyayiEngine.from_config(config)
+        self.tokenizer = tokenizer
+        self.engine = engine
+        self.rules = tuple(rules)
+        self.structure_cache = LRUCache(maxsize=cache_size, name="rule_masks.structure")
+
+    def structure(self, text: str) -> RuleStructure:
+        """Grammatical structure of a text (cached per text)."""
+        return self.structure_cache.get_or_compute(text, lambda: self._structure_uncached(text))
+
+    def _structure_uncached(self, text: str) -> RuleStructure:
+        sandhi = self.tokenizer.sandhi_processor
+        # Pieces are whitespace runs (segment and unit 0) or sandhi-split words
+        pieces, segments, units = [], [], []
+        num_segments = num_units = 0
+        for match in _PIECE.finditer(text):
+            piece = match.group()
+            if piece.isspace():
+                pieces.append(piece)
+                segments.append(0)
+                units.append(0)
+                continue
+            num_units += 1
+            for segment in sandhi.reverse(piece) or [piece]:
+                num_segments += 1
+                pieces.append(segment)
+                segments.append(num_segments)
+                units.append(num_units)
+
+        # Sandhi splits and whitespace fall between phonemes, so the pieces
+        # tokenize to exactly the tokens of the whole text
+        _, lengths = self.tokenizer._phoneme_ids(pieces) if pieces else (None, np.zeros(0, dtype=np.int64))
+        segment_ids = np.repeat(np.asarray(segments, dtype=np.int64), lengths)
+        unit_ids = np.repeat(np.asarray(units, dtype=np.int64), lengths)
+        num_tokens = int(lengths.sum())
+
+        piece_starts = np.cumsum(lengths) - lengths
+        is_word = np.asarray(segments, dtype=np.int64) > 0
+        spans = [_ranges_per_token(piece_starts[~is_word], lengths[~is_word])]
+        if "word" in self.rules:
+            spans.append(_ranges_per_token(piece_starts[is_word], lengths[is_word]))
+        else:
+            # Every token still sees itself
+            rows = np.arange(num_tokens)
+            spans.append((rows, rows, np.ones(num_tokens, dtype=np.int64)))
+
+        unit_starts, unit_sizes = self._unit_spans(unit_ids)
+        if "compound" in self.rules and len(unit_starts):
+            words_per_unit = np.bincount(np.asarray(units)[is_word], minlength=len(unit_starts) + 1)[1:]
+            compound = words_per_unit > 1
+            spans.append(_ranges_per_token(unit_starts[compound], unit_sizes[compound]))
+        if "subject_verb" in self.rules and len(unit_starts):
+            parse = self.engine.parse_sentence(text)
+            pos, case = parse.values("pos"), parse.values("case")
+            subjects = [i for i, (p, c) in enumerate(zip(pos, case)) if p == "noun" and c == "nominative"]
+            verbs = [i for i, p in enumerate(pos) if p == "verb"]
+            for left, right in ((subjects, verbs), (verbs, subjects)):
+                if not left or not right:
+                    continue
+                # Every token of a unit on the left sees each unit on the right
+                left, right = np.asarray(left), np.asarray(right)
+                pairs_left = np.repeat(left, len(right))
+                pairs_right = np.tile(right, len(left))
+                sizes = unit_sizes[pairs_left]
+                spans.append((
+                    np.repeat(unit_starts[pairs_left], sizes) + _offsets(sizes),
+                    np.repeat(unit_starts[pairs_right], sizes),
+                    np.repeat(unit_sizes[pairs_right], sizes),
+                ))
+
+        rows, starts, sizes = (np.concatenate(parts).astype(np.int64) for parts in zip(*spans))
+        return RuleStructure(num_tokens, segment_ids, unit_ids, rows, starts, sizes)
+
+    @staticmethod
+    def _unit_spans(unit_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Token start and size of every unit, indexed by unit id - 1."""
+        num_units = int(unit_ids.max(initial=0))
+        tokens = np.flatnonzero(unit_ids)
+        sizes = np.bincount(unit_ids[tokens] - 1, minlength=num_units)
+        starts = np.full(num_units, 0, dtype=np.int64)
+        firsts = np.unique(unit_ids[tokens] - 1, return_index=True)
+        starts[firsts[0]] = tokens[firsts[1]]
+        return starts, sizes
+
+    def _layout(self, structures: List[RuleStructure], max_length: Optional[int],
+                padding: Union[bool, str]) -> Tuple[np.ndarray, int]:
+        """Kept phoneme tokens per text and the padded width, as in ``batch_encode_fast``."""
+        kept = np.fromiter((s.num_tokens for s in structures), dtype=np.int64, count=len(structures))
+        if max_length is not None:
+            kept = np.minimum(kept, max(max_length - 2, 0))
+        if padding == "max_length" and max_length is not None:
+            width = max_length
+        else:
+            width = int(kept.max(initial=0)) + 2
+        return kept, width
+
+    def compile(self, texts: Sequence[str], max_length: Optional[int] = None,
+                padding: Union[bool, str] = True) -> CSRMask:
+        """Compile a CSR attention mask for a batch of texts.
+
+        Rows and columns line up with ``tokenizer.batch_encode_fast(texts,
+        max_length, padding)`` (with special tokens); truncated tokens and
+        padding get no entries.
+
+        Args:
+            texts: Texts of the batch
+            max_length: Maximum sequence length including special tokens
+            padding: True pads to the longest text, "max_length" to ``max_length``
+
+        Returns:
+            CSRMask: Mask of shape (B, width, width)
+        """
+        structures = [self.structure(text) for text in texts]
+        kept, width = self._layout(structures, max_length, padding)
+
+        # Compile the texts not seen before (or truncated) together
+        rows = [None] * len(texts)
+        missing = [b for b, (s, n) in enumerate(zip(structures, kept)) if s.csr is None or n < s.num_tokens]
+        if missing:
+            counts, columns = self._expand([structures[b] for b in missing], kept[missing])
+            pieces = np.split(columns, np.cumsum(counts.sum(axis=1))[:-1])
+            for i, b in enumerate(missing):
+                rows[b] = (counts[i, :kept[b] + 2], pieces[i])
+                if kept[b] == structures[b].num_tokens:
+                    structures[b].csr = rows[b]
+        rows = [row or s.csr for row, s in zip(rows, structures)]
+
+        counts = np.zeros((len(texts), width), dtype=np.int64)
+        for b, (row_counts, _) in enumerate(rows):
+            counts[b, :len(row_counts)] = row_counts
+        indptr = np.zeros(len(texts) * width + 1, dtype=np.int64)
+        np.cumsum(counts.ravel(), out=indptr[1:])
+        indices = np.concatenate([columns for _, columns in rows]) if rows else np.zeros(0, dtype=np.int64)
+        return CSRMask(torch.from_numpy(indptr), torch.from_numpy(indices), (len(texts), width, width))
+
+    @staticmethod
+    def _expand(structures: List[RuleStructure], kept: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Expand the ranges of several texts into sorted, unique CSR entries.
+
+        Returns:
+            tuple: Entry counts per row [N, max(kept) + 2] and the column
+            indices of all rows, concatenated in row order
+        """
+        batch = len(structures)
+        width = int(kept.max()) + 2
+
+        # Phoneme token ranges, shifted past <s> and clipped to the kept tokens
+        counts = np.fromiter((len(s.rows) for s in structures), dtype=np.int64, count=batch)
+        owner = np.repeat(np.arange(batch), counts)
+        rows = np.concatenate([s.rows for s in structures])
+        starts = np.concatenate([s.starts for s in structures])
+        ends = starts + np.concatenate([s.sizes for s in structures])
+        limit = kept[owner]
+        ends = np.minimum(ends, limit)
+        keep = (rows < limit) & (ends > starts)
+        owner, rows, starts, ends = owner[keep], rows[keep] + 1, starts[keep] + 1, ends[keep] + 1
+
+        # <s> and </s> see every kept token and are seen by all of them
+        lengths = kept + 2
+        sep = kept + 1
+        token_owner = np.repeat(np.arange(batch), kept)
+        token_rows = _offsets(kept) + 1
+        special = np.arange(batch)
+        owner = np.concatenate([owner, token_owner, token_owner, special, special])
+        rows = np.concatenate([rows, token_rows, token_rows, np.zeros(batch, dtype=np.int64), sep])
+        starts = np.concatenate([starts, np.zeros(len(token_rows), dtype=np.int64), sep[token_owner],
+                                 np.zeros(2 * batch, dtype=np.int64)])
+        ends = np.concatenate([ends, np.ones(len(token_rows), dtype=np.int64), sep[token_owner] + 1,
+                               lengths, lengths])
+
+        # Expand the ranges and sort them into unique (row, column) entries
+        sizes = ends - starts
+        flat_rows = np.repeat(owner * width + rows, sizes)
+        columns = np.repeat(starts, sizes) + _offsets(sizes)
+        keys = np.unique(flat_rows * width + columns)
+        counts = np.bincount(keys // width, minlength=batch * width).reshape(batch, width)
+        return counts, keys % width
+
+    def block_mask(self, texts: Sequence[str], level: str = "word", max_length: Optional[int] = None,
+                   padding: Union[bool, str] = True) -> BlockMask:
+        """Compile word- or compound-level blocks for a batch of texts.
+
+        ``<s>``, ``</s>`` and whitespace tokens each form a block of their own.
+
+        Args:
+            texts: Texts of the batch
+            level: "word" (sandhi-split words) or "compound" (orthographic units)
+            max_length: Maximum sequence length including special tokens
+            padding: True pads to the longest text, "max_length" to ``max_length``
+
+        Returns:
+            BlockMask: Segment ids aligned with ``batch_encode_fast``
+        """
+        if level not in ("word", "compound"):
+            raise ValueError(f"Unknown block level {level!r}")
+        structures = [self.structure(text) for text in texts]
+        kept, width = self._layout(structures, max_length, padding)
+        segments = np.zeros((len(texts), width), dtype=np.int64)
+        for b, (structure, n) in enumerate(zip(structures, kept)):
+            ids = (structure.segment_ids if level == "word" else structure.unit_ids)[:n]
+            # Renumber so whitespace and special tokens get blocks of their own
+            starts = np.concatenate(([True], ids[1:] != ids[:-1])) | (ids == 0) if n else np.zeros(0, dtype=bool)
+            segments[b, 1:n + 1] = np.cumsum(starts) + 1
+            segments[b, 0] = 1
+            segments[b, n + 1] = (segments[b, n] if n else 1) + 1
+        return BlockMask(torch.from_numpy(segments))
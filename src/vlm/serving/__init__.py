@@ -0,0 +1 @@
+# Inference serving for VLM
@@ -0,0 +1,362 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, List, Optional, Sequence
+import asyncio
+import itertools
+import time
+
+import torch
+
+from src.vlm.core.kv_cache import KVCache
+from src.vlm.core.sampling import select_next_tokens
+
+@dataclass
+class RequestMetrics:
+    """Timings of one request, in seconds from its arrival."""
+    queue_time: float = 0.0
+    time_to_first_token: Optional[float] = None
+    total_time: float = 0.0
+    num_tokens: int = 0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        return self.num_tokens / self.total_time if self.total_time else 0.0
+
+# Finished requests kept for the latency percentiles of ServingMetrics
+METRICS_WINDOW = 10000
+
+@dataclass
+class ServingMetrics:
+    """Aggregate metrics of a serving engine.
+
+    Counters cover every request served; queue time and time-to-first-token
+    statistics cover the most recent ``METRICS_WINDOW`` requests, so a
+    long-running engine keeps a fixed amount of per-request state.
+    """
+    requests: Deque[RequestMetrics] = field(default_factory=lambda: deque(maxlen=METRICS_WINDOW))
+    completed: int = 0
+    tokens: int = 0
+    steps: int = 0
+    busy_time: float = 0.0
+    batch_rows: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Generated tokens per second of decoding."""
+        return self.tokens / self.busy_time if self.busy_time else 0.0
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.batch_rows / self.steps if self.steps else 0.0
+
+    def record(self, request: RequestMetrics):
+        """Count a finished request and keep its timings in the window."""
+        self.completed += 1
+        self.requests.append(request)
+
+    def summary(self) -> Dict[str, float]:
+        """Request count, throughput and queue time / time-to-first-token percentiles."""
+        result = {
+            "requests": self.completed,
+            "tokens": self.tokens,
+            "throughput_tokens_per_sec": self.throughput,
+            "mean_batch_size": self.mean_batch_size,
+        }
+        for name, values in (
+            ("queue_time", [m.queue_time for m in self.requests]),
+            ("time_to_first_token", [m.time_to_first_token for m in self.requests
+                                     if m.time_to_first_token is not None]),
+        ):
+            values = sorted(values)
+            for label, q in (("mean", None), ("p50", 0.5), ("p95", 0.95)):
+                if not values:
+                    stat = 0.0
+                elif q is None:
+                    stat = sum(values) / len(values)
+                else:
+                    stat = values[min(len(values) - 1, int(q * len(values)))]
+                result[f"{name}_{label}"] = stat
+        return result
+
+class GenerationStream:
+    """Tokens of one request, streamed as they are generated.
+
+    Iterate with ``async for``; ``result()`` waits for the full sequence.
+    Closing the stream cancels the request.
+    """
+
+    def __init__(self, request_id: int, input_ids: List[int], max_new_tokens: int,
+                 do_sample: bool, temperature: float, top_k: int, top_p: float,
+                 eos_token_id: Optional[int]):
+        self.request_id = request_id
+        self.input_ids = input_ids
+        self.max_new_tokens = max_new_tokens
+        self.do_sample = do_sample
+        self.temperature = temperature
+        self.top_k = top_k
+        self.top_p = top_p
+        self.eos_token_id = eos_token_id
+        self.tokens: List[int] = []
+        self.metrics = RequestMetrics()
+        self.cancelled = False
+        self.finished = False
+        self._arrival = time.perf_counter()
+        self._queue: "asyncio.Queue" = asyncio.Queue()
+
+    def _push(self, token: int):
+        if not self.tokens:
+            self.metrics.time_to_first_token = time.perf_counter() - self._arrival
+        self.tokens.append(token)
+        self._queue.put_nowait(token)
+
+    def _finish(self, error: Optional[BaseException] = None):
+        self.finished = True
+        self.metrics.total_time = time.perf_counter() - self._arrival
+        self.metrics.num_tokens = len(self.tokens)
+        self._queue.put_nowait(error)
+
+    def __aiter__(self) -> AsyncIterator[int]:
+        return self._iterate()
+
+    async def _iterate(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    async def result(self) -> List[int]:
+        """Wait for the request to finish and return its generated tokens."""
+        async for _ in self:
+            pass
+        return self.tokens
+
+    def close(self):
+        """Cancel the request; it leaves the running batch at the next step."""
+        self.cancelled = True
+
+class ContinuousBatchingEngine:
+    """Asyncio serving engine around VLMCore with continuous batching.
+
+    Incoming requests wait in a queue and join the running batch at the next
+    decoding step: their prompts are encoded together, their KV caches merged
+    into the running one, and finished or cancelled rows are dropped after
+    every step. Each row keeps its own position and sampling settings, so
+    short queries never wait for a whole batch to drain.
+
+    Model calls run on a single worker thread, which keeps the event loop
+    free to accept requests and stream tokens while the CPU decodes.
+    """
+
+    def __init__(self, model, max_batch_size: int = 32, max_new_tokens: int = 64,
+                 eos_token_id: Optional[int] = None, generator: Optional[torch.Generator] = None):
+        """Initialize the engine.
+
+        Args:
+            model: A VLMCore (in eval mode after ``start``)
+            max_batch_size: Maximum number of rows decoded together
+            max_new_tokens: Default generation limit of a request
+            eos_token_id: Default end token (the model config's when None)
+            generator: Optional random generator for sampling
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_new_tokens = max_new_tokens
+        self.eos_token_id = model.config.eos_token_id if eos_token_id is None else eos_token_id
+        self.generator = generator
+        self.metrics = ServingMetrics()
+
+        self._ids = itertools.count()
+        self._pending: "asyncio.Queue[GenerationStream]" = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        # Running batch: one stream per cache row, plus the last token of every row
+        self._active: List[GenerationStream] = []
+        self._cache: Optional[KVCache] = None
+        self._last: Optional[torch.Tensor] = None
+
+    async def start(self):
+        """Start the decoding loop on the running event loop."""
+        if self._task is not None:
+            return
+        self.model.eval()
+        self._pending = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vlm-serving")
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the loop; unfinished requests end with a CancelledError."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        error = asyncio.CancelledError("Serving engine stopped")
+        while not self._pending.empty():
+            self._active.append(self._pending.get_nowait())
+        self._fail(error)
+
+    async def __aenter__(self) -> "ContinuousBatchingEngine":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def submit(self, input_ids: Sequence[int], max_new_tokens: Optional[int] = None,
+               do_sample: bool = False, temperature: float = 1.0, top_k: int = 0,
+               top_p: float = 1.0, eos_token_id: Optional[int] = None) -> GenerationStream:
+        """Queue a request and return its token stream.
+
+        Args:
+            input_ids: Prompt token ids
+            max_new_tokens: Generation limit (the engine default when None)
+            do_sample: Sample instead of greedy decoding
+            temperature: Sampling temperature
+            top_k: Top-k filter (0 disables)
+            top_p: Nucleus filter (1.0 disables)
+            eos_token_id: End token (the engine default when None)
+
+        Returns:
+            GenerationStream: Async iterator over the generated tokens
+
+        Raises:
+            RuntimeError: If the engine is not started
+            ValueError: If the prompt is empty or too long for the model
+        """
+        if self._task is None:
+            raise RuntimeError("Serving engine is not started")
+        input_ids = [int(token) for token in input_ids]
+        if not input_ids or len(input_ids) > self.model.config.max_position_embeddings:
+            raise ValueError(f"Prompt length {len(input_ids)} outside 1..{self.model.config.max_position_embeddings}")
+        if max_new_tokens is None:
+            max_new_tokens = self.max_new_tokens
+        # Decoder positions hold the start token plus every generated token
+        max_new_tokens = min(max_new_tokens, self.model.config.max_position_embeddings - 1)
+        stream = GenerationStream(
+            next(self._ids), input_ids, max_new_tokens, do_sample, temperature, top_k, top_p,
+            self.eos_token_id if eos_token_id is None else eos_token_id,
+        )
+        self._pending.put_nowait(stream)
+        return stream
+
+    async def generate(self, input_ids: Sequence[int], **kwargs) -> List[int]:
+        """Submit a request and wait for all of its tokens."""
+        return await self.submit(input_ids, **kwargs).result()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._active:
+                # Idle: sleep until a request arrives
+                self._admit([await self._pending.get()])
+            admitted = []
+            while len(self._active) + len(admitted) < self.max_batch_size and not self._pending.empty():
+                admitted.append(self._pending.get_nowait())
+            self._admit(admitted)
+            if not self._active:
+                continue
+
+            start = time.perf_counter()
+            try:
+                tokens = await loop.run_in_executor(self._executor, self._step)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                self._fail(error)
+                continue
+            self.metrics.busy_time += time.perf_counter() - start
+            self.metrics.steps += 1
+            self.metrics.batch_rows += len(tokens)
+            self._emit(tokens)
+
+    def _admit(self, streams: List[GenerationStream]):
+        """Record queue times; prompts are prefilled by the next step."""
+        now = time.perf_counter()
+        for stream in streams:
+            if stream.cancelled:
+                stream._finish()
+                self.metrics.record(stream.metrics)
+                continue
+            stream.metrics.queue_time = now - stream._arrival
+            self._active.append(stream)
+
+    @torch.no_grad()
+    def _prefill(self, streams: List[GenerationStream]) -> KVCache:
+        """Encode new prompts together and build their cache."""
+        model = self.model
+        length = max(len(stream.input_ids) for stream in streams)
+        input_ids = torch.full((len(streams), length), model.config.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(streams), length), dtype=torch.long)
+        for row, stream in enumerate(streams):
+            input_ids[row, :len(stream.input_ids)] = torch.tensor(stream.input_ids)
+            attention_mask[row, :len(stream.input_ids)] = 1
+        encoder_hidden = model.encode(input_ids, attention_mask)
+        return model.init_cache(encoder_hidden, attention_mask, capacity=8)
+
+    @torch.no_grad()
+    def _step(self) -> List[int]:
+        """Decode one token for every active row (runs on the worker thread)."""
+        streams = list(self._active)
+        rows = 0 if self._cache is None else self._cache.batch_size
+        new = streams[rows:]
+        start_token = self.model.config.decoder_start_token_id
+        if new:
+            cache = self._prefill(new)
+            self._cache = cache if self._cache is None else KVCache.merge([self._cache, cache])
+            starts = torch.full((len(new),), start_token, dtype=torch.long)
+            self._last = starts if self._last is None else torch.cat([self._last, starts])
+
+        logits = self.model.decode_step(self._last[:, None], self._cache)[:, -1]
+        if any(stream.do_sample for stream in streams):
+            tokens = select_next_tokens(
+                logits,
+                do_sample=torch.tensor([s.do_sample for s in streams]),
+                temperature=torch.tensor([s.temperature for s in streams]),
+                top_k=torch.tensor([s.top_k for s in streams]),
+                top_p=torch.tensor([s.top_p for s in streams]),
+                generator=self.generator,
+            )
+        else:
+            tokens = select_next_tokens(logits)
+        self._last = tokens
+        return tokens.tolist()
+
+    def _emit(self, tokens: List[int]):
+        """Stream the new tokens and drop finished or cancelled rows."""
+        keep = []
+        for row, (stream, token) in enumerate(zip(self._active, tokens)):
+            if stream.cancelled:
+                done = True
+            else:
+                stream._push(token)
+                self.metrics.tokens += 1
+                done = token == stream.eos_token_id or len(stream.tokens) >= stream.max_new_tokens
+            if done:
+                stream._finish()
+                self.metrics.record(stream.metrics)
+            else:
+                keep.append(row)
+
+        if len(keep) < len(self._active):
+            self._active = [self._active[row] for row in keep]
+            if keep:
+                self._cache = self._cache.select(keep)
+                self._last = self._last[keep]
+            else:
+                self._cache = self._last = None
+
+    def _fail(self, error: BaseException):
+        """End every active request with an error."""
+        for stream in self._active:
+            stream._finish(error)
+        self._active = []
+        self._cache = self._last = None
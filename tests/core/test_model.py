@@ -0,0 +1,160 @@
+import pytest
+import torch
+from src.vlm.core.kv_cache import KVCache
+from src.vlm.core.masking import block_diagonal_mask
+from src.vlm.core.model import VLMCore, VLMCoreConfig
+from src.vlm.core.sampling import filter_logits, select_next_tokens
+from src.utils.config import VLMConfig
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    config = VLMCoreConfig(vocab_size=60, hidden_size=32, num_hidden_layers=2, num_attention_heads=4,
+                           intermediate_size=64, max_position_embeddings=64)
+    return VLMCore(config).eval()
+
+@pytest.fixture
+def batch():
+    generator = torch.Generator().manual_seed(1)
+    input_ids = torch.randint(3, 60, (3, 7), generator=generator)
+    attention_mask = torch.ones_like(input_ids)
+    attention_mask[1, 5:] = 0
+    return input_ids, attention_mask
+
+def test_forward_loss_and_backward(model, batch):
+    """Test that labels give a loss that backpropagates."""
+    input_ids, attention_mask = batch
+    labels = input_ids.masked_fill(attention_mask == 0, -100)
+    model.train()
+    try:
+        outputs = model(input_ids=input_ids, attention_mask=attention_mask, labels=labels)
+        outputs.loss.backward()
+    finally:
+        model.eval()
+        model.zero_grad()
+    assert outputs.logits.shape == (3, 7, 60)
+    assert torch.isfinite(outputs.loss)
+
+def test_packed_forward(model):
+    """Test that verses packed in one row match running them separately."""
+    first, second = torch.tensor([[5, 6, 7]]), torch.tensor([[8, 9]])
+    packed = torch.cat([first, second], dim=1)
+    mask = block_diagonal_mask(torch.tensor([[1, 1, 1, 2, 2]]))
+    positions = torch.tensor([[0, 1, 2, 0, 1]])
+    logits = model(input_ids=packed, attention_mask=mask, position_ids=positions, labels=packed).logits
+    assert torch.allclose(logits[:, :3], model(input_ids=first, labels=first).logits, atol=1e-5)
+    assert torch.allclose(logits[:, 3:], model(input_ids=second, labels=second).logits, atol=1e-5)
+
+def test_packed_forward_with_separate_decoder_packing(model):
+    """Test that packed decoder rows only attend to their own packed source."""
+    sources = [torch.tensor([[5, 6, 7]]), torch.tensor([[8, 9]])]
+    targets = [torch.tensor([[1, 11]]), torch.tensor([[1, 12, 13, 14]])]
+    sequence_ids = torch.tensor([[1, 1, 1, 2, 2, 0]])
+    decoder_sequence_ids = torch.tensor([[1, 1, 2, 2, 2, 2, 0]])
+    input_ids = torch.cat(sources + [torch.zeros(1, 1, dtype=torch.long)], dim=1)
+    decoder_input_ids = torch.cat(targets + [torch.zeros(1, 1, dtype=torch.long)], dim=1)
+    kwargs = dict(input_ids=input_ids, attention_mask=block_diagonal_mask(sequence_ids),
+                  position_ids=torch.tensor([[0, 1, 2, 0, 1, 0]]), decoder_input_ids=decoder_input_ids)
+    
+    logits = model(sequence_ids=sequence_ids, decoder_sequence_ids=decoder_sequence_ids, **kwargs).logits
+    for (source, target), span in zip(zip(sources, targets), (slice(0, 2), slice(2, 6))):
+        expected = model(input_ids=source, decoder_input_ids=target).logits
+        assert torch.allclose(logits[:, span], expected, atol=1e-5)
+    with pytest.raises(ValueError):
+        model(**kwargs)
+
+def test_cached_decoding_matches_full_forward(model, batch):
+    """Test that decoding in chunks through the cache gives the full-forward logits."""
+    input_ids, attention_mask = batch
+    decoder_ids = torch.randint(3, 60, (3, 9), generator=torch.Generator().manual_seed(2))
+    cache = model.init_cache(model.encode(input_ids, attention_mask), attention_mask, capacity=2)
+    with torch.no_grad():
+        chunks = [model.decode_step(decoder_ids[:, :4], cache)]
+        chunks += [model.decode_step(decoder_ids[:, i:i + 1], cache) for i in range(4, 9)]
+        full = model(input_ids=input_ids, attention_mask=attention_mask, decoder_input_ids=decoder_ids).logits
+    assert torch.allclose(torch.cat(chunks, dim=1), full, atol=1e-5)
+    assert cache.lengths.tolist() == [9, 9, 9]
+    assert cache.capacity >= 9
+
+def test_generate_with_and_without_cache(model, batch):
+    """Test that greedy generation does not depend on the cache."""
+    input_ids, attention_mask = batch
+    cached = model.generate(input_ids, max_length=12, attention_mask=attention_mask, eos_token_id=-1)
+    uncached = model.generate(input_ids, max_length=12, attention_mask=attention_mask, eos_token_id=-1,
+                              use_cache=False)
+    assert cached.shape == (3, 12)
+    assert (cached[:, 0] == model.config.decoder_start_token_id).all()
+    assert torch.equal(cached, uncached)
+
+def test_generate_stops_at_eos(model, batch):
+    """Test that finished rows are padded and generation stops once all finish."""
+    input_ids, attention_mask = batch
+    greedy = model.generate(input_ids, max_length=12, attention_mask=attention_mask, eos_token_id=-1)
+    eos = int(greedy[0, 1])
+    stopped = model.generate(input_ids, max_length=12, attention_mask=attention_mask, eos_token_id=eos)
+
+    ends = [row.index(eos) + 1 if eos in row else 12 for row in greedy[:, 1:].tolist()]
+    assert stopped.size(1) == max(ends) + (max(ends) < 12)
+    for row, end in enumerate(ends):
+        assert torch.equal(stopped[row, :end + 1], greedy[row, :end + 1])
+        assert (stopped[row, end + 1:] == model.config.pad_token_id).all()
+
+def test_sampling_is_reproducible(model, batch):
+    """Test top-k/top-p sampling with a seeded generator."""
+    input_ids, _ = batch
+    sample = lambda: model.generate(input_ids, max_length=8, do_sample=True, top_k=5, top_p=0.9,
+                                    generator=torch.Generator().manual_seed(3))
+    assert torch.equal(sample(), sample())
+
+def test_filter_logits():
+    """Test the top-k and top-p filters, with scalar and per-row settings."""
+    logits = torch.log(torch.tensor([[0.5, 0.3, 0.15, 0.05], [0.05, 0.15, 0.3, 0.5]]))
+    kept = lambda filtered: torch.isfinite(filtered).tolist()
+
+    assert kept(filter_logits(logits, top_k=2)) == [[True, True, False, False], [False, False, True, True]]
+    assert kept(filter_logits(logits, top_p=0.7)) == [[True, True, False, False], [False, False, True, True]]
+    assert kept(filter_logits(logits, top_p=0.1)) == [[True, False, False, False], [False, False, False, True]]
+    assert kept(filter_logits(logits, top_k=torch.tensor([1, 0]), top_p=torch.tensor([1.0, 0.9]))) == [
+        [True, False, False, False], [False, True, True, True]
+    ]
+    assert torch.equal(filter_logits(logits), logits)
+
+def test_select_next_tokens_per_row():
+    """Test mixing greedy and sampled rows in one batch."""
+    logits = torch.tensor([[0.0, 5.0, 1.0], [0.0, 0.0, 9.0]])
+    assert select_next_tokens(logits).tolist() == [1, 2]
+    tokens = select_next_tokens(logits, do_sample=torch.tensor([False, True]), top_k=1,
+                                generator=torch.Generator().manual_seed(0))
+    assert tokens.tolist() == [1, 2]
+
+def test_cache_select_and_merge(model, batch):
+    """Test that rows keep decoding correctly after being regrouped."""
+    input_ids, attention_mask = batch
+    encoder_hidden = model.encode(input_ids, attention_mask)
+    decoder_ids = torch.randint(3, 60, (3, 6), generator=torch.Generator().manual_seed(4))
+    with torch.no_grad():
+        full = model(input_ids=input_ids, attention_mask=attention_mask, decoder_input_ids=decoder_ids).logits
+
+        # Row 2 starts late and with a shorter prompt, then joins rows 0 and 1
+        early = model.init_cache(encoder_hidden[:2], attention_mask[:2], capacity=4)
+        model.decode_step(decoder_ids[:2, :3], early)
+        late = model.init_cache(model.encode(input_ids[2:, :5]), attention_mask[2:, :5], capacity=8)
+        model.decode_step(decoder_ids[2:, :1], late)
+        merged = KVCache.merge([early.select([1, 0]), late])
+        assert merged.lengths.tolist() == [3, 3, 1]
+
+        step = torch.stack([decoder_ids[1, 3], decoder_ids[0, 3], decoder_ids[2, 1]])[:, None]
+        logits = model.decode_step(step, merged)
+
+    short = model(input_ids=input_ids[2:, :5], attention_mask=attention_mask[2:, :5],
+                  decoder_input_ids=decoder_ids[2:, :2]).logits
+    assert torch.allclose(logits[0, 0], full[1, 3], atol=1e-5)
+    assert torch.allclose(logits[1, 0], full[0, 3], atol=1e-5)
+    assert torch.allclose(logits[2, 0], short[0, 1], atol=1e-5)
+
+def test_accepts_vlm_config():
+    """Test building the model from the project-wide VLMConfig."""
+    model = VLMCore(VLMConfig(vocab_size=60, hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+                              intermediate_size=32))
+    assert isinstance(model.config, VLMCoreConfig)
+    assert model.config.vocab_size == 60 and model.config.is_encoder_decoder
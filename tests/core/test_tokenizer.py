@@ -38,3 +38,73 @@ def test_token_to_id_conversion():
     except NotImplementedError:
         # If the method is not implemented yet, this is acceptable
         assert True
+
+def test_convert_tokens_to_string_applies_sandhi():
+    """Test that decoding joins tokens through the sandhi junction table."""
+    tokenizer = SanskritTokenizer()
+    
+    assert tokenizer.convert_tokens_to_string([]) == ""
+    assert tokenizer.convert_tokens_to_string(["rama", "iva"]) == "rameva"
+    assert tokenizer.convert_tokens_to_string(list("agnim")) == "agnim"
+
+def test_batch_encode_fast_matches_tokenizer():
+    """Test that the batched encoder produces the standard encoding."""
+    tokenizer = SanskritTokenizer()
+    texts = ["agnim īḷe purohitaṃ", "", "नमस्ते", "rāmaḥ vanam gacchati"]
+    
+    fast = tokenizer.batch_encode_fast(texts, padding=False)
+    for text, ids, mask in zip(texts, fast["input_ids"], fast["attention_mask"]):
+        assert ids.tolist() == tokenizer(text)["input_ids"]
+        assert mask.tolist() == [1] * len(ids)
+    
+    padded = tokenizer.batch_encode_fast(texts, max_length=8, padding="max_length")
+    reference = tokenizer(texts, max_length=8, padding="max_length", truncation=True)
+    assert padded["input_ids"].tolist() == reference["input_ids"]
+    assert padded["attention_mask"].tolist() == reference["attention_mask"]
+
+def test_batch_encode_fast_tensors():
+    """Test that the batched encoder can return padded PyTorch tensors."""
+    tokenizer = SanskritTokenizer()
+    encoded = tokenizer.batch_encode_fast(["agni", "a"], return_tensors="pt")
+    
+    assert isinstance(encoded["input_ids"], torch.Tensor)
+    assert encoded["input_ids"].shape == (2, 6)
+    assert encoded["attention_mask"].sum().item() == 9
+
+def test_longest_match_phonemes():
+    """Test that multi-codepoint phonemes are emitted as single tokens."""
+    tokenizer = SanskritTokenizer()
+    
+    assert tokenizer._tokenize("bhadraṃ") == ["bh", "a", "d", "r", "a", "ṃ"]
+    assert tokenizer._tokenize("khaiau") == ["kh", "ai", "au"]
+    assert tokenizer._convert_token_to_id("kh") == tokenizer.vocab["kh"]
+
+def test_batch_encode_fast_digraphs():
+    """Test that the array path merges digraphs exactly like _tokenize."""
+    import random
+    
+    tokenizer = SanskritTokenizer()
+    rng = random.Random(0)
+    alphabet = ["a", "i", "u", "k", "h", "g", "ai", "au", "kh", "ṭ", "d", " ", "ā", "e"]
+    texts = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+             for _ in range(300)]
+    texts += ["", "kh", "", "a", "h"]
+    
+    expected = [tokenizer(text)["input_ids"] for text in texts]
+    fast = tokenizer.batch_encode_fast(texts, padding=False)
+    assert [ids.tolist() for ids in fast["input_ids"]] == expected
+    
+    tokenizer._array_path_exact = False
+    fallback = tokenizer.batch_encode_fast(texts, padding=False)
+    assert [ids.tolist() for ids in fallback["input_ids"]] == expected
+
+def test_decode_round_trips_words():
+    """Test that decoding encoded IAST words returns them unchanged."""
+    tokenizer = SanskritTokenizer()
+    words = ["ratna", "ratnadhātamam", "agnim", "īḷe", "purohitaṃ", "yajñasya", "ṛtvijam",
+             "uccaiḥ", "tattvam", "sanna", "kṛṣṇaḥ", "śaṅkara", "paṇḍita", "devaiśca",
+             "mahaujasam", "saccit", "ujjvala", "aṭṭa", "gaṅgā", "vāṅmaya"]
+    
+    for word in words:
+        ids = tokenizer(word)["input_ids"]
+        assert tokenizer.decode(ids, skip_special_tokens=True) == word
@@ -0,0 +1,62 @@
+import pytest
+import torch
+from torch.utils.data import DataLoader
+from src.data.batching import DynamicPaddingCollator, LengthBucketBatchSampler
+from src.data.vedic_dataset import VedicDataset
+from src.vlm.core.tokenizer import SanskritTokenizer
+
+def test_collator_pads_to_longest():
+    """Test that the collator pads to the longest item in the batch."""
+    collate = DynamicPaddingCollator(pad_token_id=0, pad_to_multiple_of=None)
+    batch = collate([
+        {"input_ids": torch.tensor([1, 5, 2], dtype=torch.uint16)},
+        {"input_ids": torch.tensor([1, 5, 6, 7, 2])},
+    ])
+    
+    assert batch["input_ids"].dtype == torch.long
+    assert batch["input_ids"].tolist() == [[1, 5, 2, 0, 0], [1, 5, 6, 7, 2]]
+    assert batch["attention_mask"].tolist() == [[1, 1, 1, 0, 0], [1, 1, 1, 1, 1]]
+    assert batch["labels"].tolist() == [[1, 5, 2, -100, -100], [1, 5, 6, 7, 2]]
+
+def test_sampler_covers_every_index_once():
+    """Test that each epoch yields every index exactly once."""
+    lengths = [(i * 37) % 50 + 1 for i in range(200)]
+    sampler = LengthBucketBatchSampler(lengths, batch_size=8, bucket_size=40)
+    
+    for _ in range(2):
+        batches = list(sampler)
+        assert sorted(i for b in batches for i in b) == list(range(200))
+        assert all(len(b) <= 8 for b in batches)
+
+def test_sampler_respects_token_budget():
+    """Test that token-budget batches never exceed the padded budget."""
+    lengths = [(i * 37) % 50 + 1 for i in range(200)]
+    sampler = LengthBucketBatchSampler(lengths, max_tokens=120, shuffle=False)
+    
+    batches = list(sampler)
+    assert sorted(i for b in batches for i in b) == list(range(200))
+    for batch in batches:
+        assert len(batch) == 1 or max(lengths[i] for i in batch) * len(batch) <= 120
+
+def test_bucketing_reduces_padding():
+    """Test that bucketed batches carry fewer pad tokens than random batches."""
+    tokenizer = SanskritTokenizer()
+    texts = ["a" * (i % 60 + 1) for i in range(240)]
+    dataset = VedicDataset(texts, tokenizer, max_length=512, padding=False)
+    collate = DynamicPaddingCollator(tokenizer.pad_token_id)
+    
+    bucketed = DataLoader(dataset, collate_fn=collate,
+                          batch_sampler=LengthBucketBatchSampler(dataset.lengths, batch_size=16))
+    plain = DataLoader(dataset, batch_size=16, shuffle=True, collate_fn=collate)
+    
+    padded = lambda loader: sum(batch["input_ids"].numel() for batch in loader)
+    assert padded(bucketed) < padded(plain) < len(texts) * 512
+    assert sum(batch["attention_mask"].sum().item() for batch in bucketed) == dataset.lengths.sum()
+
+def test_dataset_lengths_match_items():
+    """Test that precomputed lengths equal the lengths of the truncated items."""
+    tokenizer = SanskritTokenizer()
+    texts = ["agnim īḷe purohitaṃ", "", "a" * 100, "dharmakṣetre kurukṣetre"]
+    dataset = VedicDataset(texts, tokenizer, max_length=16, padding=False)
+    
+    assert dataset.lengths.tolist() == [len(dataset[i]["input_ids"]) for i in range(len(texts))]
@@ -0,0 +1,48 @@
+import pickle
+
+import numpy as np
+import pytest
+import torch
+from src.data.memmap_dataset import MemmapVedicDataset, compile_token_ids, compile_vedic_dataset
+from src.vlm.core.tokenizer import SanskritTokenizer
+
+TEXTS = [
+    "agnim īḷe purohitaṃ",
+    "yajñasya devam ṛtvijam",
+    "",
+    "hotāraṃ ratnadhātamam",
+]
+
+def test_compile_and_read_back(tmp_path):
+    """Test that compiled items match the tokenizer output."""
+    tokenizer = SanskritTokenizer()
+    prefix = str(tmp_path / "rv")
+    
+    assert compile_vedic_dataset(TEXTS, tokenizer, prefix, batch_size=3) == len(TEXTS)
+    dataset = MemmapVedicDataset(prefix)
+    
+    assert len(dataset) == len(TEXTS)
+    for text, item in zip(TEXTS, dataset):
+        assert item["input_ids"].dtype == torch.uint16
+        assert item["input_ids"].long().tolist() == tokenizer(text)["input_ids"]
+    assert dataset.lengths.tolist() == [len(tokenizer(t)["input_ids"]) for t in TEXTS]
+
+def test_items_are_views_of_the_mapping(tmp_path):
+    """Test that items share memory with the mapped file."""
+    prefix = str(tmp_path / "ids")
+    compile_token_ids([[1, 5, 6, 2], [1, 7, 2]], prefix)
+    dataset = MemmapVedicDataset(prefix, max_length=2)
+    
+    item = dataset[0]["input_ids"]
+    assert item.tolist() == [1, 5]
+    assert item.data_ptr() == dataset._tokens.ctypes.data
+    assert dataset[-1]["input_ids"].tolist() == [1, 7]
+    
+    restored = pickle.loads(pickle.dumps(dataset))
+    assert restored._tokens is None
+    assert restored[1]["input_ids"].tolist() == [1, 7]
+
+def test_compile_rejects_large_ids(tmp_path):
+    """Test that ids outside the uint16 range are rejected."""
+    with pytest.raises(ValueError):
+        compile_token_ids([[1, 70000]], str(tmp_path / "bad"))
@@ -0,0 +1,73 @@
+import pytest
+import torch
+from torch.utils.data import DataLoader
+from src.data.batching import DynamicPaddingCollator
+from src.data.packing import PackedVedicDataset, pack_lengths
+from src.data.vedic_dataset import VedicDataset
+from src.vlm.core.masking import block_diagonal_mask, to_attention_bias
+from src.vlm.core.tokenizer import SanskritTokenizer
+
+def test_pack_lengths_fits_every_item_once():
+    """Test that best-fit packing places each item once within capacity."""
+    lengths = [(i * 29) % 40 + 2 for i in range(300)]
+    bins = pack_lengths(lengths, 64)
+    
+    assert sorted(i for b in bins for i in b) == list(range(300))
+    assert all(sum(lengths[i] for i in b) <= 64 for b in bins)
+    assert len(bins) < len(lengths) / 2
+
+def test_packed_items_keep_verses_apart():
+    """Test position ids, labels and the block-diagonal mask of packed items."""
+    tokenizer = SanskritTokenizer()
+    texts = ["agnim īḷe", "devam", "hotāraṃ ratnadhātamam", "sa"]
+    dataset = VedicDataset(texts, tokenizer, max_length=32, padding=False)
+    packed = PackedVedicDataset(dataset, max_length=32)
+    
+    seen = 0
+    for item in packed:
+        sequence_ids = item["sequence_ids"]
+        mask = item["attention_mask"]
+        assert mask.shape == (32, 32)
+        assert torch.equal(mask, block_diagonal_mask(sequence_ids))
+        for number in sequence_ids.unique().tolist():
+            if number == 0:
+                continue
+            span = (sequence_ids == number).nonzero().flatten()
+            assert item["position_ids"][span].tolist() == list(range(len(span)))
+            assert item["input_ids"][span][-1].item() == tokenizer.sep_token_id
+            assert not mask[span][:, sequence_ids != number].any()
+            seen += 1
+        assert (item["labels"][sequence_ids == 0] == -100).all()
+    assert seen == len(texts)
+
+def test_packed_items_collate():
+    """Test that the padding collator batches packed items and their 2-D masks."""
+    tokenizer = SanskritTokenizer()
+    texts = ["agnim īḷe", "devam", "hotāraṃ ratnadhātamam", "sa"]
+    packed = PackedVedicDataset(VedicDataset(texts, tokenizer, max_length=16, padding=False), max_length=16)
+    loader = DataLoader(packed, batch_size=len(packed),
+                        collate_fn=DynamicPaddingCollator(pad_to_multiple_of=24))
+    batch = next(iter(loader))
+    
+    assert batch["input_ids"].shape == batch["position_ids"].shape == (len(packed), 24)
+    assert batch["attention_mask"].shape == (len(packed), 24, 24)
+    assert batch["attention_mask"].dtype == torch.bool
+    for row, item in enumerate(packed):
+        assert torch.equal(batch["attention_mask"][row], block_diagonal_mask(batch["sequence_ids"][row]))
+        assert torch.equal(batch["labels"][row, :16], item["labels"])
+        assert (batch["labels"][row, 16:] == -100).all()
+
+def test_attention_bias_formats():
+    """Test that padding and block masks normalize to additive biases."""
+    padding = torch.tensor([[1, 1, 0]])
+    bias = to_attention_bias(padding)
+    assert bias.shape == (1, 1, 1, 3)
+    assert bias[0, 0, 0, 0] == 0 and bias[0, 0, 0, 2] < -1e30
+    
+    block = block_diagonal_mask(torch.tensor([[1, 1, 2, 0]]))
+    bias = to_attention_bias(block)
+    assert bias.shape == (1, 1, 4, 4)
+    assert bias[0, 0, 0, 1] == 0 and bias[0, 0, 0, 2] < -1e30
+    
+    with pytest.raises(ValueError):
+        to_attention_bias(torch.ones(1, 1, 1, 1, 1))
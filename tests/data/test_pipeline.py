@@ -0,0 +1,60 @@
+import os
+import pytest
+from src.data.pipeline import plan_shards, read_token_ids, tokenize_corpus
+from src.vlm.core.tokenizer import SanskritTokenizer
+
+VERSES = [
+    "agnim īḷe purohitaṃ yajñasya devam ṛtvijam",
+    "agniḥ pūrvebhir ṛṣibhir īḍyo nūtanair uta",
+    "agninā rayim aśnavat poṣam eva dive dive",
+    "agne yaṃ yajñam adhvaraṃ viśvataḥ paribhūr asi",
+]
+
+def _write_corpus(tmp_path, copies):
+    """Write a few corpus files and return their paths and verses in order."""
+    paths, verses = [], []
+    for i in range(copies):
+        path = tmp_path / f"mandala_{i}.txt"
+        lines = [f"{verse} {i} {j}" for j, verse in enumerate(VERSES * 5)]
+        path.write_text("\n".join(lines) + "\n\n", encoding="utf-8")
+        paths.append(str(path))
+        verses.extend(lines)
+    return paths, verses
+
+def test_plan_shards_covers_files(tmp_path):
+    """Test that shards tile every input file."""
+    paths, _ = _write_corpus(tmp_path, 2)
+    shards = plan_shards(paths, shard_bytes=100)
+    
+    for path in paths:
+        ranges = [(start, end) for p, start, end in shards if p == path]
+        assert ranges[0][0] == 0
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_tokenize_corpus_preserves_order(tmp_path, num_workers):
+    """Test that parallel tokenization matches sequential encoding in order."""
+    paths, verses = _write_corpus(tmp_path, 3)
+    output = str(tmp_path / "ids.txt")
+    
+    stats = tokenize_corpus(paths, output, num_workers=num_workers,
+                            shard_bytes=333, progress=None)
+    
+    tokenizer = SanskritTokenizer()
+    expected = [tokenizer(verse)["input_ids"] for verse in verses]
+    assert list(read_token_ids(output)) == expected
+    assert sum(s.lines for s in stats) == len(verses)
+    assert sum(s.tokens for s in stats) == sum(map(len, expected))
+
+def test_tokenize_corpus_leaves_other_files_alone(tmp_path):
+    """Test that shards go to a private directory that is removed afterwards."""
+    paths, verses = _write_corpus(tmp_path, 1)
+    output = str(tmp_path / "ids.txt")
+    (tmp_path / "ids.txt.shards").mkdir()
+    (tmp_path / "ids.txt.shards" / "keep").write_text("x")
+    before = set(os.listdir(tmp_path))
+    
+    tokenize_corpus(paths, output, num_workers=1, shard_bytes=333, progress=None)
+    
+    assert (tmp_path / "ids.txt.shards" / "keep").read_text() == "x"
+    assert set(os.listdir(tmp_path)) == before | {"ids.txt"}
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+from torch.utils.data import DataLoader
+from src.data.batching import DynamicPaddingCollator
+from src.data.streaming import StreamingVedicDataset
+from src.vlm.core.tokenizer import SanskritTokenizer
+
+def _write_corpus(tmp_path):
+    """Write a small sharded corpus and return all of its texts."""
+    texts = []
+    shard_dir = tmp_path / "rigveda"
+    shard_dir.mkdir()
+    for i in range(3):
+        lines = [f"agnim īḷe purohitaṃ {i} {j}" for j in range(20)]
+        (shard_dir / f"part_{i}.txt").write_text("\n".join(lines) + "\n\n", encoding="utf-8")
+        texts += lines
+    records = [{"text": f"yajñasya devam {j}", "id": j} for j in range(15)]
+    (tmp_path / "extra.jsonl").write_text(
+        "\n".join(json.dumps(r, ensure_ascii=False) for r in records), encoding="utf-8")
+    (tmp_path / "notes.md").write_text("not a shard", encoding="utf-8")
+    return texts + [r["text"] for r in records]
+
+def test_streams_every_text_once(tmp_path):
+    """Test that a single process streams every text exactly once."""
+    texts = _write_corpus(tmp_path)
+    tokenizer = SanskritTokenizer()
+    dataset = StreamingVedicDataset(str(tmp_path), tokenizer, shuffle_buffer=8, seed=1)
+    
+    streamed = [tuple(item["input_ids"].tolist()) for item in dataset]
+    expected = [tuple(tokenizer(text)["input_ids"]) for text in texts]
+    assert sorted(streamed) == sorted(expected)
+    assert streamed != expected
+
+def test_shuffle_depends_on_epoch(tmp_path):
+    """Test that set_epoch changes the shuffled order."""
+    _write_corpus(tmp_path)
+    dataset = StreamingVedicDataset(str(tmp_path), SanskritTokenizer(), shuffle_buffer=16)
+    
+    first = [tuple(item["input_ids"].tolist()) for item in dataset]
+    dataset.set_epoch(1)
+    second = [tuple(item["input_ids"].tolist()) for item in dataset]
+    assert first != second and sorted(first) == sorted(second)
+
+@pytest.mark.parametrize("num_workers", [2, 5])
+def test_workers_read_disjoint_shares(tmp_path, num_workers):
+    """Test that file- and line-level worker sharding cover the corpus once."""
+    texts = _write_corpus(tmp_path)
+    tokenizer = SanskritTokenizer()
+    dataset = StreamingVedicDataset(str(tmp_path), tokenizer, shuffle_buffer=4)
+    loader = DataLoader(dataset, batch_size=4, num_workers=num_workers,
+                        collate_fn=DynamicPaddingCollator(tokenizer.pad_token_id))
+    
+    streamed = []
+    for batch in loader:
+        for ids, mask in zip(batch["input_ids"], batch["attention_mask"]):
+            streamed.append(tuple(ids[mask.bool()].tolist()))
+    expected = [tuple(tokenizer(text)["input_ids"]) for text in texts]
+    assert sorted(streamed) == sorted(expected)
@@ -0,0 +1,130 @@
+import random
+
+import pytest
+from src.vlm.grammar.ashtadhyayi import AshtadhyayiEngine
+
+SENTENCES = [
+    "rāmaḥ vanam gacchati",
+    "devāḥ yajñam rakṣanti",
+    "aham pustakam paṭhāmi",
+    "gacchati rāma vanam",
+    "rakṣanti deva",
+    "sītā",
+    "",
+    "agnim īḷe purohitaṃ",
+]
+
+def _reference(text):
+    """Endswith-chain implementation the compiled engine replaces."""
+    words = text.split()
+    valid = False
+    if len(words) >= 3:
+        last = words[-1]
+        if last.endswith('ti') or last.endswith('nti'):
+            valid = any(w.endswith('ḥ') or w.endswith('m') for w in words[:-1])
+    if not valid and len(words) <= 2:
+        valid = any(w.endswith(e) for w in words for e in ['ḥ', 'm', 'ām', 'ā', 'ti', 'nti'])
+    
+    corrected = list(words)
+    if len(corrected) >= 2 and not corrected[-1].endswith(('ti', 'nti')):
+        for i, word in enumerate(corrected[:-1]):
+            if word.endswith(('ti', 'nti')):
+                corrected.append(corrected.pop(i))
+                break
+    for i, word in enumerate(corrected):
+        if word.endswith('a') and i < len(corrected) - 1:
+            corrected[i] = word + 'ḥ'
+    
+    parsed = []
+    for word in words:
+        entry = {"text": word}
+        if word.endswith('ti') or word.endswith('nti'):
+            entry.update(pos="verb", tense="present",
+                         number="plural" if word.endswith('nti') else "singular")
+        elif word.endswith('ḥ'):
+            entry.update(pos="noun", case="nominative", gender="masculine")
+        elif word.endswith('m'):
+            entry.update(pos="noun", case="accusative")
+        else:
+            entry["pos"] = "unknown"
+        parsed.append(entry)
+    
+    return valid, ' '.join(corrected), {"sentence": text, "words": parsed}
+
+def _random_sentences(count):
+    rng = random.Random(0)
+    stems = ["rāma", "deva", "vana", "sītā", "gaccha", "rakṣa", "agni", "yajña"]
+    endings = ["", "ḥ", "m", "ti", "nti", "ām", "ā", "a"]
+    return [" ".join(rng.choice(stems) + rng.choice(endings) for _ in range(rng.randint(0, 5)))
+            for _ in range(count)]
+
+def test_compiled_engine_matches_reference():
+    """Test that validate/correct/parse keep their behaviour after compilation."""
+    engine = AshtadhyayiEngine()
+    
+    for text in SENTENCES + _random_sentences(500):
+        valid, corrected, parsed = _reference(text)
+        assert engine.validate(text) == valid
+        assert engine.correct(text) == corrected
+        assert engine.parse_sentence(text).to_dict() == parsed
+        analysis = engine.analyze(text)
+        analysis["parse"] = analysis["parse"].to_dict()
+        assert analysis == {"valid": valid, "corrected": corrected, "parse": parsed}
+
+def test_suffix_lookup_returns_longest_first():
+    """Test that one trie lookup returns every applicable rule."""
+    engine = AshtadhyayiEngine()
+    
+    rule_ids = [rule.rule_id for rule in engine.compiled.lookup("rakṣanti")]
+    assert rule_ids == ["word_classes/verb_present_pl", "word_classes/verb_present_sg"]
+    
+    rule_ids = [rule.rule_id for rule in engine.compiled.lookup("rāma")]
+    assert "case_endings/masculine/nom_sg" in rule_ids
+    assert engine.analyze_word("rāma").correction.apply("rāma") == "rāmaḥ"
+    assert engine.compiled.lookup("xyz") == []
+
+def test_unindexed_rules_are_matched_by_pattern():
+    """Test that junction rules are still found by their compiled patterns."""
+    engine = AshtadhyayiEngine()
+    
+    rule_ids = [rule.rule_id for rule in engine.compiled.match("devaiti")]
+    assert "sandhi/vowel_sandhi/1" in rule_ids
+    assert all(rule.suffix is None for rule in engine.compiled.unindexed)
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_batch_apis_match_single_calls(num_workers):
+    """Test that batch results equal per-sentence calls, with deduplication."""
+    engine = AshtadhyayiEngine()
+    sentences = (SENTENCES + _random_sentences(300)) * 3
+    
+    mask = engine.validate_batch(sentences, num_workers=num_workers, chunksize=50)
+    assert mask.dtype == bool
+    assert mask.tolist() == [engine.validate(s) for s in sentences]
+    
+    ids, corrections = engine.correct_batch(sentences, num_workers=num_workers, chunksize=50)
+    assert [corrections[i] for i in ids] == [engine.correct(s) for s in sentences]
+    assert len(corrections) <= len(set(sentences))
+    
+    ids, parses = engine.parse_batch(sentences, num_workers=num_workers, chunksize=50)
+    assert [parses[i] for i in ids] == [engine.parse_sentence(s) for s in sentences]
+    assert len(parses) == len(set(sentences))
+    assert all(parse.vocab is engine.parse_vocab for parse in parses)
+
+def test_batch_apis_handle_empty_input():
+    """Test that empty batches return empty arrays."""
+    engine = AshtadhyayiEngine()
+    
+    assert engine.validate_batch([]).shape == (0,)
+    ids, corrections = engine.correct_batch([])
+    assert len(ids) == 0 and corrections == []
+
+def test_analysis_cache_is_bounded_in_bytes():
+    """Test that long sentences cannot grow the analysis cache past its memory cap."""
+    engine = AshtadhyayiEngine(cache_bytes=64 * 1024)
+    sentences = [" ".join(["rāmaḥ vanam gacchati"] * 30) + f" {i}" for i in range(200)]
+    
+    for sentence in sentences:
+        assert engine.validate(sentence) == engine.validate(sentence)
+    stats = engine.analysis_cache.stats()
+    assert 0 < stats.bytes <= 64 * 1024
+    assert stats.entries < len(sentences) and stats.evictions > 0
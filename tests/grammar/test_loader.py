@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+from src.utils.config import VLMConfig
+from src.vlm.grammar import loader
+from src.vlm.grammar.ashtadhyayi import AshtadhyayiEngine
+from src.vlm.grammar.loader import default_cache_path, load_rule_base, read_rule_file
+
+def _builtin_rule_file(tmp_path, name="rules.json"):
+    """Write the engine's built-in rule base to a JSON rule file."""
+    engine = AshtadhyayiEngine()
+    path = str(tmp_path / name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"rules": engine.rules, "meta_rules": engine.meta_rules}, f, ensure_ascii=False)
+    return path
+
+def test_loaded_engine_matches_builtin(tmp_path):
+    """Test that an engine loaded from a file behaves like the built-in one."""
+    path = _builtin_rule_file(tmp_path)
+    builtin = AshtadhyayiEngine()
+    loaded = AshtadhyayiEngine(rules_path=path)
+
+    assert loaded.meta_rules == builtin.meta_rules
+    assert len(loaded.compiled) == len(builtin.compiled)
+    for text in ["rāmaḥ vanam gacchati", "gacchati rāma vanam", "sītā"]:
+        assert loaded.analyze(text) == builtin.analyze(text)
+
+def test_cache_is_reused_and_invalidated(tmp_path, monkeypatch):
+    """Test that the cache skips compilation until the rule file changes."""
+    path = _builtin_rule_file(tmp_path)
+    rules, _, compiled = load_rule_base(path)
+    assert os.path.exists(default_cache_path(path))
+
+    calls = []
+    real = loader.CompiledRuleBase
+    monkeypatch.setattr(loader, "CompiledRuleBase", lambda *args: calls.append(args) or real(*args))
+
+    cached_rules, _, cached = load_rule_base(path)
+    assert calls == []
+    assert cached_rules == rules
+    assert [r.rule_id for r in cached.lookup("gacchanti")] == [r.rule_id for r in compiled.lookup("gacchanti")]
+    assert cached.by_id["word_classes/noun_accusative"].pattern.search("vanam")
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"rules": {"word_classes": {"x": {"pattern": "x$"}}}}, f)
+    _, _, rebuilt = load_rule_base(path)
+    assert len(calls) == 1
+    assert list(rebuilt.by_id) == ["word_classes/x"]
+
+def test_corrupt_cache_is_rebuilt(tmp_path):
+    """Test that a damaged cache file falls back to compiling the rules."""
+    path = _builtin_rule_file(tmp_path)
+    cache_path = str(tmp_path / "rules.cache")
+    load_rule_base(path, cache_path=cache_path)
+
+    with open(cache_path, "r+b") as f:
+        header = len(loader._header(b"\0" * 32))
+        f.seek(header)
+        f.write(b"garbage")
+    _, _, compiled = load_rule_base(path, cache_path=cache_path)
+    assert len(compiled) == len(AshtadhyayiEngine().compiled)
+
+def test_bare_rules_and_yaml(tmp_path):
+    """Test the bare-mapping layout and YAML rule files."""
+    yaml = pytest.importorskip("yaml")
+    path = str(tmp_path / "rules.yaml")
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump({"word_classes": [{"pattern": "ti$", "pos": "verb", "id": "3.4.78"}]}, f)
+
+    rules, meta_rules = read_rule_file(path)
+    assert meta_rules == {}
+    engine = AshtadhyayiEngine.from_config(VLMConfig(grammar_rules_path=path))
+    assert engine.analyze_word("gacchati").is_verb
+    assert engine.compiled.by_id["word_classes/0"].attributes["id"] == "3.4.78"
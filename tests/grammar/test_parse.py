@@ -0,0 +1,50 @@
+import pickle
+
+import pytest
+from src.vlm.grammar.ashtadhyayi import AshtadhyayiEngine
+from src.vlm.grammar.parse import ParseVocabulary
+from src.vlm.grammar.rules import CompiledRuleBase
+
+def test_columns_and_word_views():
+    """Test the code columns, decoded values and per-word views."""
+    engine = AshtadhyayiEngine()
+    parsed = engine.parse_sentence("rāmaḥ vanam gacchanti sītā")
+
+    assert len(parsed) == 4
+    assert parsed.values("pos") == ["noun", "noun", "verb", None]
+    assert parsed.values("case") == ["nominative", "accusative", None, None]
+    codes = parsed.codes("pos")
+    assert codes[0] == codes[1] != codes[2] and codes[3] == 0
+
+    word = parsed[2]
+    assert (word.text, word.pos, word.number, word.tense, word.case) == (
+        "gacchanti", "verb", "plural", "present", None
+    )
+    assert parsed[-1].pos == "unknown"
+    assert tuple(w.text for w in parsed) == parsed.words
+    assert word.to_dict() == {"text": "gacchanti", "pos": "verb", "tense": "present", "number": "plural"}
+    with pytest.raises(IndexError):
+        parsed[4]
+
+def test_codes_are_deterministic_and_picklable():
+    """Test that engines built from the same rules agree on codes."""
+    first, second = AshtadhyayiEngine(), AshtadhyayiEngine()
+    text = "devāḥ yajñam rakṣanti"
+    parsed = first.parse_sentence(text)
+
+    assert bytes(parsed.codes("case")) == bytes(second.parse_sentence(text).codes("case"))
+    restored = pickle.loads(pickle.dumps(parsed))
+    assert restored == parsed
+    assert restored.to_dict() == parsed.to_dict()
+
+def test_empty_sentence():
+    """Test that an empty sentence parses to no words."""
+    parsed = AshtadhyayiEngine().parse_sentence("")
+    assert len(parsed) == 0
+    assert parsed.to_dict() == {"sentence": "", "words": []}
+
+def test_vocabulary_limit():
+    """Test that a field with too many values is rejected."""
+    rules = {"word_classes": {f"c{i}": {"pattern": f"x{i}$", "case": f"case{i}"} for i in range(256)}}
+    with pytest.raises(ValueError, match="255"):
+        ParseVocabulary(CompiledRuleBase(rules).rules)
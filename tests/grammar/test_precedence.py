@@ -0,0 +1,100 @@
+import pickle
+
+import pytest
+from src.vlm.grammar.ashtadhyayi import AshtadhyayiEngine
+from src.vlm.grammar.rules import CompiledRuleBase
+
+META_RULES = {"proximity": {"priority": 1}, "specificity": {"priority": 2}}
+
+def _engine(rules, meta_rules=META_RULES):
+    engine = AshtadhyayiEngine()
+    engine.rules = rules
+    engine.meta_rules = meta_rules
+    engine.compile_rules()
+    return engine
+
+def _ids(rules):
+    return [rule.rule_id for rule in rules]
+
+def test_specificity_then_para():
+    """Test that the longer suffix wins, then the later sūtra."""
+    compiled = CompiledRuleBase({"g": {
+        "general": {"pattern": "a$", "replacement": "aḥ", "id": "7.1.1"},
+        "later": {"pattern": "a$", "replacement": "am", "id": "7.1.9"},
+        "specific": {"pattern": "ta$", "replacement": "taḥ", "id": "6.1.1"},
+    }}, META_RULES)
+
+    assert _ids(compiled.resolve("gata")) == ["g/specific", "g/later", "g/general"]
+    assert compiled.winner("rāma").rule_id == "g/later"
+    assert compiled.winner("vanam") is None
+
+def test_tripadi_is_asiddha():
+    """Test that tripādī rules come last and in sūtra order."""
+    compiled = CompiledRuleBase({"g": {
+        "t2": {"pattern": "ta$", "replacement": "da", "id": "8.4.2"},
+        "t1": {"pattern": "a$", "replacement": "ā", "id": "8.2.1"},
+        "early": {"pattern": "a$", "replacement": "aḥ", "id": "1.1.1"},
+    }}, META_RULES)
+
+    assert _ids(compiled.resolve("gata")) == ["g/early", "g/t1", "g/t2"]
+
+def test_unindexed_rules_merge_by_rank():
+    """Test that regex-only rules are merged into the precedence order."""
+    compiled = CompiledRuleBase({"g": {
+        "junction": {"pattern": "a([iī])", "replacement": r"e", "id": "6.1.87"},
+        "suffix": {"pattern": "ti$", "replacement": "nti", "id": "3.4.78"},
+    }}, META_RULES)
+
+    # Proximity (anchored first) outranks para
+    assert _ids(compiled.resolve("gaiti")) == ["g/suffix", "g/junction"]
+    assert _ids(compiled.resolve("gai")) == ["g/junction"]
+
+def test_overrides():
+    """Test explicit overrides, including the rejected cases."""
+    rules = {"g": {
+        "general": {"pattern": "ta$", "replacement": "taḥ", "id": "6.1.1"},
+        "exception": {"pattern": "a$", "replacement": "am", "id": "6.1.2", "overrides": ["6.1.1"]},
+    }}
+    assert _ids(CompiledRuleBase(rules, META_RULES).resolve("gata")) == ["g/exception", "g/general"]
+
+    rules["g"]["general"]["overrides"] = "g/exception"
+    with pytest.raises(ValueError, match="cycle"):
+        CompiledRuleBase(rules, META_RULES)
+
+    with pytest.raises(ValueError, match="asiddha"):
+        CompiledRuleBase({"g": {
+            "early": {"pattern": "a$", "replacement": "aḥ", "id": "1.1.1"},
+            "late": {"pattern": "a$", "replacement": "ā", "id": "8.2.1", "overrides": "1.1.1"},
+        }})
+
+    with pytest.raises(ValueError, match="unknown"):
+        CompiledRuleBase({"g": {"r": {"pattern": "a$", "overrides": "9.9.9"}}})
+
+def test_precedence_survives_pickling():
+    """Test that the ranked lists are restored from the compact pickle state."""
+    compiled = AshtadhyayiEngine().compiled
+    restored = pickle.loads(pickle.dumps(compiled))
+
+    for word in ["gacchanti", "rāma", "sītā", "vanam", "agnim"]:
+        assert _ids(restored.resolve(word)) == _ids(compiled.resolve(word))
+
+def test_derivation_trace():
+    """Test derivations and the rules recorded in trace mode."""
+    engine = _engine({"g": {
+        "guna": {"pattern": "i$", "replacement": "e", "id": "7.3.84"},
+        "ayadi": {"pattern": "e$", "replacement": "ay", "id": "6.1.78"},
+        "rutva": {"pattern": "s$", "replacement": "r", "id": "8.2.66"},
+        "class": {"pattern": "y$", "pos": "noun"},
+    }})
+
+    assert engine.derive("agni") == "agnay"
+    form, trace = engine.derive("agni", trace=True)
+    assert form == "agnay"
+    assert [(step["sutra"], step["before"], step["after"]) for step in trace] == [
+        ("7.3.84", "agni", "agne"),
+        ("6.1.78", "agne", "agnay"),
+    ]
+
+    assert engine.derive("agnis") == "agnir"
+    assert engine.derive("agni", groups=("other",)) == "agni"
+    assert engine.derive("agni", max_steps=1) == "agne"
@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+import torch
+from src.vlm.core.model import VLMCore, VLMCoreConfig
+from src.vlm.rag.context import Passage, pack_context
+from src.vlm.rag.generator import RAGGenerator
+from src.vlm.rag.normalize import devanagari_to_iast, normalize_query
+from src.vlm.rag.retriever import IndicRetriever
+
+DOCUMENTS = [
+    {"text": "dharmakṣetre kurukṣetre samavetā yuyutsavaḥ", "metadata": {"source": "gītā", "verse": "1.1"}},
+    {"text": "karmaṇy evādhikāras te mā phaleṣu kadācana", "metadata": {"source": "gītā", "verse": "2.47"}},
+    {"text": "vṛddhir ādaic", "metadata": {"source": "aṣṭādhyāyī", "sūtra": "1.1.1"}},
+    {"text": "iko yaṇ aci"},
+]
+
+@pytest.fixture
+def generator():
+    retriever = IndicRetriever()
+    retriever.index_documents(DOCUMENTS)
+    return RAGGenerator(None, retriever)
+
+def test_normalize_query():
+    """Test that spelling variants of a query share one normalized form."""
+    assert devanagari_to_iast("धर्मक्षेत्रे कुरुक्षेत्रे") == "dharmakṣetre kurukṣetre"
+    assert devanagari_to_iast("अग्निमीळे पुरोहितं ॥१॥") == "agnimīḷe purohitaṃ ॥1॥"
+    forms = ["धर्मक्षेत्रे कुरुक्षेत्रे ।", " Dharmakṣetre  kurukṣetre,", "dharmakṣetre kurukṣetre"]
+    assert {normalize_query(form) for form in forms} == {"dharmakṣetre kurukṣetre"}
+    assert normalize_query("saṁskr̥tam") == normalize_query("संस्कृतम्") == "saṃskṛtam"
+    assert normalize_query(forms[0], transliterate=False) == "धर्मक्षेत्रे कुरुक्षेत्रे"
+    assert normalize_query(forms[1], transliterate=False) == "dharmakṣetre kurukṣetre"
+
+def test_query_and_context_caches(generator):
+    """Test that repeated and respelled queries hit both cache levels."""
+    ids, scores = generator.retrieve("karmaṇy evādhikāras te", num_docs=2)
+    assert ids[0] == 1 and len(ids) == len(scores) == 2
+    assert generator.retrieve("  KARMAṆY evādhikāras te ", num_docs=2) == (ids, scores)
+    # Other scripts are searched as written, so they get their own entry
+    devanagari = generator.retrieve("कर्मण्य् एवाधिकारस् ते", num_docs=2)
+    assert list(devanagari[0]) == [hit["id"] for hit in generator.retriever.retrieve("कर्मण्य् एवाधिकारस् ते", k=2)]
+    assert generator.retrieve("कर्मण्य् एवाधिकारस् ते ।", num_docs=2) == devanagari
+    assert generator.retrieve("karmaṇy evādhikāras te", num_docs=3)[0][:2] == ids
+
+    passage = generator.contexts([ids[0]])[0]
+    assert passage.text == "[gītā 2.47] karmaṇy evādhikāras te mā phaleṣu kadācana"
+    assert passage.ids.tolist() == generator.tokenizer._phoneme_ids([passage.text])[0].tolist()
+    assert generator._format_context(list(ids)) == generator._format_context(
+        generator.retriever.retrieve("karmaṇy evādhikāras te", k=2))
+    assert generator._format_context([DOCUMENTS[3]]) == "iko yaṇ aci"
+
+    stats = generator.cache_stats()
+    assert (stats["queries"].hits, stats["queries"].misses) == (2, 3)
+    assert stats["contexts"].misses == 2 and stats["contexts"].hits >= 2
+    assert stats["queries"].hit_rate == 0.4
+
+def test_cached_results_depend_only_on_the_key():
+    """Test that spellings sharing a cache entry get what the retriever finds for them."""
+    retriever = IndicRetriever()
+    retriever.index_documents([{"text": "karmaṇy evādhikāras te mā phaleṣu kadācana"},
+                               {"text": "कर्मण्येवाधिकारस्ते मा फलेषु कदाचन"},
+                               {"text": "karmaṇyevādhikāraste"}])
+    generator = RAGGenerator(None, retriever)
+    queries = ["karmaṇyevādhikāraste", "कर्मण्येवाधिकारस्ते", "KARMAṆYEVĀDHIKĀRASTE ,", "कर्मण्येवाधिकारस्ते ।"]
+    
+    results = [generator.retrieve(query, num_docs=2)[0] for query in queries]
+    assert results[0][0] == 2 and results[1][0] == 1
+    for query, ids in zip(queries, results):
+        assert list(ids) == [hit["id"] for hit in retriever.retrieve(normalize_query(query, transliterate=False), k=2)]
+    assert results[2] == results[0] and results[3] == results[1]
+    assert generator.cache_stats()["queries"].hits == 2
+
+def test_index_change_invalidates(generator):
+    """Test that indexing new documents clears cached results."""
+    generator.retrieve("iko yaṇ aci", num_docs=1)
+    generator.contexts([3])
+    generator.retriever.index_documents([{"text": "iko yaṇ aci iti sūtram"}])
+    # The caches are cleared on their next use
+    ids, _ = generator.retrieve("iko yaṇ aci", num_docs=2)
+    assert set(ids) == {3, 4}
+    assert generator.cache_stats()["queries"].misses == 2
+    assert len(generator.query_cache) == 1 and len(generator.context_cache) == 0
+
+def test_ttl_expiry(generator):
+    """Test that cached results expire after the ttl."""
+    now = [0.0]
+    generator.query_cache.clock = lambda: now[0]
+    generator.query_cache.ttl = 10.0
+    generator.retrieve("vṛddhir ādaic")
+    now[0] = 5.0
+    generator.retrieve("vṛddhir ādaic")
+    now[0] = 11.0
+    generator.retrieve("vṛddhir ādaic")
+    stats = generator.cache_stats()["queries"]
+    assert (stats.hits, stats.misses, stats.expirations) == (1, 2, 1)
+
+def test_pack_context():
+    """Test budgeted packing with deduplication of overlapping passages."""
+    verse = np.arange(5, 45)
+    passages = [
+        Passage("a", np.concatenate([[9, 9], verse[:30]]), body_start=2),
+        Passage("b", np.concatenate([[8], verse[10:40]]), body_start=1),
+        Passage("c", verse[35:]),
+        Passage("d", np.arange(45, 60)),
+        Passage("e", np.arange(50, 55)),
+    ]
+    # The second passage mostly repeats the first; the fourth does not fit
+    ids, packed = pack_context(passages, max_tokens=44, separator_id=2)
+    assert packed == [0, 2, 4]
+    assert ids.tolist() == [9, 9, *range(5, 35), 2, *range(40, 45), 2, *range(50, 55)]
+    assert len(ids) == 44 and ids.dtype == np.int64
+    ids, packed = pack_context(passages, max_tokens=10, separator_id=2)
+    assert packed == [0] and ids.tolist() == [9, 9, *range(5, 13)]
+    assert pack_context(passages[1:2] * 2, max_tokens=100, separator_id=2)[1] == [0]
+
+def test_generate_packs_stored_tokens(generator, monkeypatch):
+    """Test that generation packs stored passage ids without tokenizing documents."""
+    torch.manual_seed(0)
+    config = VLMCoreConfig(vocab_size=60, hidden_size=32, num_hidden_layers=2, num_attention_heads=4,
+                           intermediate_size=64, max_position_embeddings=48)
+    model = VLMCore(config).eval()
+    prompts = []
+
+    def generate(input_ids, **kwargs):
+        prompts.append(input_ids[0].tolist())
+        return VLMCore.generate(model, input_ids, **kwargs)
+
+    monkeypatch.setattr(model, "generate", generate)
+    generator.model = model
+    generator.retriever.index_documents([DOCUMENTS[1]])
+    tokenizer = generator.tokenizer
+    query = "karmaṇy evādhikāras te"
+    query_ids = tokenizer._phoneme_ids([query])[0].tolist()
+    passage = generator.contexts([1])[0]
+
+    tokenize = tokenizer._phoneme_ids
+
+    def tokenize_query_only(texts):
+        assert texts == [query], "documents were tokenized on the request path"
+        return tokenize(texts)
+
+    monkeypatch.setattr(tokenizer, "_phoneme_ids", tokenize_query_only)
+    assert isinstance(generator.generate(query, max_length=8, num_docs=3), str)
+
+    prompt = prompts[0]
+    assert len(prompt) == 48
+    assert prompt[:len(query_ids) + 2] == [tokenizer.cls_token_id, *query_ids, tokenizer.sep_token_id]
+    # The best passage is truncated to the budget; its duplicate (id 4) is skipped
+    assert prompt[len(query_ids) + 2:-1] == passage.ids[:48 - len(query_ids) - 3].tolist()
+    assert generator._format_context([1, 4]) == passage.text
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from src.vlm.rag.embedder import HashingEmbedder
+from src.vlm.rag.index import FlatIndex, IVFIndex, create_index, load_index, top_k
+
+def unit_vectors(n, dim=32, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_top_k_matches_sort():
+    """Test that argpartition selection returns sorted top scores."""
+    scores = np.random.default_rng(1).standard_normal((4, 50))
+    values, columns = top_k(scores, 5)
+    assert np.array_equal(columns, np.argsort(-scores, axis=1)[:, :5])
+    assert np.array_equal(values, np.take_along_axis(scores, columns, axis=1))
+    assert top_k(scores, 80)[0].shape == (4, 50)
+
+def test_flat_is_exact_across_chunks():
+    """Test that chunked flat search equals brute force and pads short results."""
+    vectors, queries = unit_vectors(300), unit_vectors(7, seed=1)
+    index = FlatIndex(32, chunk_size=64)
+    index.add(vectors[:100])
+    assert np.array_equal(index.add(vectors[100:]), np.arange(100, 300))
+    scores, ids = index.search(queries, 10)
+    assert np.array_equal(ids, np.argsort(-(queries @ vectors.T), axis=1)[:, :10])
+    assert np.allclose(scores, np.sort(queries @ vectors.T, axis=1)[:, ::-1][:, :10], atol=1e-6)
+
+    small = FlatIndex(32)
+    small.add(vectors[:3])
+    scores, ids = small.search(queries[:1], 5)
+    assert ids[0, 3:].tolist() == [-1, -1] and np.isneginf(scores[0, 3:]).all()
+    with pytest.raises(ValueError):
+        small.add(np.zeros((2, 16)))
+
+def test_ivf_recall_and_ids():
+    """Test that IVF finds exact matches and approaches flat search with all probes."""
+    vectors = unit_vectors(2000)
+    index = IVFIndex(32, nlist=16, nprobe=4)
+    index.add(vectors[:1500])
+    index.add(vectors[1500:])
+    assert len(index) == 2000 and sorted(index.ids.tolist()) == list(range(2000))
+
+    _, ids = index.search(vectors[:50], 1)
+    assert np.array_equal(ids[:, 0], np.arange(50))
+    queries = unit_vectors(20, seed=2)
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :10]
+    _, ids = index.search(queries, 10, nprobe=16)
+    assert np.array_equal(ids, exact)
+
+@pytest.mark.parametrize("kind", ["flat", "ivf"])
+def test_save_and_mmap_load(tmp_path, kind):
+    """Test that a saved index memory-maps back with identical results."""
+    embedder = HashingEmbedder(dim=64)
+    texts = [f"rāmo vanaṃ gacchati {i} dharmaḥ" for i in range(200)]
+    index = create_index(kind, 64, **({"nlist": 8} if kind == "ivf" else {}))
+    index.add(embedder.embed(texts))
+    queries = embedder.embed(["rāmo vanaṃ 17", "dharmaḥ 150"])
+    expected = index.search(queries, 5)
+    index.save(str(tmp_path))
+
+    loaded = load_index(str(tmp_path))
+    assert type(loaded) is type(index) and isinstance(loaded.vectors, np.memmap)
+    for got, want in zip(loaded.search(queries, 5), expected):
+        assert np.array_equal(got, want)
+    # Adding to a mapped index copies it into memory
+    loaded.add(embedder.embed(["navaḥ"]))
+    assert len(loaded) == 201 and not isinstance(loaded.vectors, np.memmap)
+    assert len(load_index(str(tmp_path), mmap=False)) == 200
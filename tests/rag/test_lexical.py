@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from benchmarks.corpus import RIGVEDA_1_1
+from src.vlm.rag.lexical import BM25Index, decode_varints, encode_varints
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    from src.vlm.core.tokenizer import SanskritTokenizer
+    return SanskritTokenizer()
+
+def test_varint_round_trip():
+    """Test that varints round-trip and small values take one byte."""
+    values = np.array([0, 1, 127, 128, 300, 2**35 + 7, 5])
+    encoded = encode_varints(values)
+    assert np.array_equal(decode_varints(encoded), values)
+    assert len(encode_varints(np.arange(128))) == 128
+    assert len(decode_varints(np.zeros(0, dtype=np.uint8))) == 0
+
+def test_incremental_matches_bulk(tokenizer):
+    """Test that indexing in small batches scores like one bulk add."""
+    bulk = BM25Index(tokenizer)
+    bulk.add(RIGVEDA_1_1)
+    incremental = BM25Index(tokenizer, merge_factor=1)
+    for start in range(0, len(RIGVEDA_1_1), 2):
+        incremental.add(RIGVEDA_1_1[start:start + 2])
+    assert 1 < len(incremental.segments) < 5
+
+    for query in ("agnim īḷe purohitaṃ", "dive dive", "devo devebhir"):
+        for got, want in zip(incremental.search(query, 5), bulk.search(query, 5)):
+            assert np.allclose(got, want)
+    incremental.merge()
+    assert len(incremental.segments) == 1
+    assert np.array_equal(incremental.search("dive dive", 5)[1], bulk.search("dive dive", 5)[1])
+
+def test_exact_and_partial_matches(tokenizer):
+    """Test BM25 ranking on whole words, sandhi pieces and unseen queries."""
+    index = BM25Index(tokenizer)
+    index.add(RIGVEDA_1_1)
+    scores, ids = index.search("agnim īḷe purohitaṃ", 3)
+    assert ids[0] == 0 and scores[0] > 2 * scores[1]
+    # An inflected form still shares phoneme n-grams with the verse
+    assert index.search("purohitam", 1)[1][0] == 0
+    assert index.search("ratnadhātamam", 1)[1].tolist() == [0]
+    assert len(index.search("धर्म", 3)[1]) == 0
+    assert len(BM25Index(tokenizer).search("agnim", 3)[1]) == 0
+
+def test_save_and_load(tmp_path, tokenizer):
+    """Test that a saved index maps back and keeps indexing."""
+    index = BM25Index(tokenizer)
+    index.add(RIGVEDA_1_1[:5])
+    index.add(RIGVEDA_1_1[5:])
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path), tokenizer=tokenizer)
+    assert isinstance(loaded.segments[0].docs, np.memmap) and len(loaded) == len(RIGVEDA_1_1)
+    for got, want in zip(loaded.search("sa naḥ piteva", 3), index.search("sa naḥ piteva", 3)):
+        assert np.allclose(got, want)
+    assert loaded.add(["navam sūktam"]).tolist() == [len(RIGVEDA_1_1)]
+    assert loaded.search("navam sūktam", 1)[1].tolist() == [len(RIGVEDA_1_1)]
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from src.vlm.rag.embedder import HashingEmbedder
+from src.vlm.rag.retriever import IndicRetriever
+
+DOCUMENTS = [
+    {"text": "dharmakṣetre kurukṣetre samavetā yuyutsavaḥ", "metadata": {"source": "gītā", "verse": "1.1"}},
+    {"text": "karmaṇy evādhikāras te mā phaleṣu kadācana", "metadata": {"source": "gītā", "verse": "2.47"}},
+    {"text": "vṛddhir ādaic", "metadata": {"source": "aṣṭādhyāyī", "sūtra": "1.1.1"}},
+    {"text": "iko yaṇ aci", "metadata": {"source": "aṣṭādhyāyī", "sūtra": "6.1.77"}},
+    {"text": "धर्मक्षेत्रे कुरुक्षेत्रे समवेता युयुत्सवः"},
+]
+
+def test_embedder_similarity():
+    """Test that embeddings are unit-norm and reflect n-gram overlap."""
+    embedder = HashingEmbedder(dim=128)
+    vectors = embedder.embed(["Rāmo  vanam", "rāmo vanam", "iko yaṇ aci", ""])
+    assert vectors.shape == (4, 128) and vectors.dtype == np.float32
+    assert np.allclose(vectors[0], vectors[1])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1) and not vectors[3].any()
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf"])
+def test_retrieve(index_type):
+    """Test that queries find the matching documents with their metadata."""
+    retriever = IndicRetriever(index_type=index_type, nlist=2, nprobe=2)
+    assert retriever.retrieve("iko yaṇ") == []
+    retriever.index_documents(DOCUMENTS)
+
+    results = retriever.retrieve("iko yaṇ aci", k=2)
+    assert len(results) == 2 and results[0]["id"] == 3
+    assert results[0]["metadata"] == {"source": "aṣṭādhyāyī", "sūtra": "6.1.77"}
+    assert results[0]["score"] >= results[1]["score"]
+    assert retriever.retrieve("धर्मक्षेत्रे", k=1)[0]["metadata"] == {}
+    assert len(retriever.retrieve("dharma", k=10)) == len(DOCUMENTS)
+
+def test_hybrid_modes():
+    """Test that lexical search finds exact matches and hybrid fuses both rankings."""
+    retriever = IndicRetriever()
+    retriever.index_documents(DOCUMENTS)
+    lexical = retriever.retrieve("mā phaleṣu kadācana", k=2, mode="lexical")
+    assert lexical[0]["id"] == 1 and lexical[0]["score"] > 0
+    dense = retriever.retrieve("mā phaleṣu kadācana", k=2, mode="dense")
+    hybrid = retriever.retrieve("mā phaleṣu kadācana", k=2)
+    assert hybrid[0]["id"] == 1 and hybrid[0]["score"] == pytest.approx(2 / 61)
+    assert {r["id"] for r in hybrid} <= {r["id"] for r in lexical + dense}
+    with pytest.raises(ValueError):
+        retriever.retrieve("vṛddhir", mode="sparse")
+    with pytest.raises(ValueError):
+        IndicRetriever(lexical=False).retrieve("vṛddhir", mode="lexical")
+
+@pytest.mark.parametrize("mode", ["dense", "lexical", "hybrid"])
+def test_retrieve_batch_matches_single_queries(mode):
+    """Test that batched retrieval returns padded arrays equal to per-query results."""
+    retriever = IndicRetriever(index_type="ivf", nlist=2, nprobe=2)
+    retriever.index_documents(DOCUMENTS)
+    queries = ["iko yaṇ aci", "kurukṣetre", "vṛddhir", "धर्मक्षेत्रे", "xyz"]
+    results = retriever.retrieve_batch(queries, k=3, mode=mode)
+    assert results.ids.shape == results.scores.shape == (5, 3) and results.documents is None
+    with pytest.raises(ValueError):
+        results.hits(0)
+
+    hydrated = retriever.retrieve_batch(queries, k=5, mode=mode, hydrate=True)
+    for row, query in enumerate(queries):
+        # Batched matrix products can round differently, so near-ties may swap
+        single = retriever.retrieve(query, k=5, mode=mode)
+        batched = hydrated.hits(row)
+        assert len(batched) == len(single)
+        assert {hit["id"] for hit in batched} == {hit["id"] for hit in single}
+        if mode != "hybrid":
+            assert [hit["score"] for hit in batched] == pytest.approx([hit["score"] for hit in single], abs=1e-6)
+        assert (hydrated.ids[row, len(single):] == -1).all()
+        assert np.isneginf(hydrated.scores[row, len(single):]).all()
+    assert hydrated.hits(0)[0]["id"] == 3
+    assert retriever.retrieve_batch([], k=3).ids.shape == (0, 3)
+    assert retriever.retrieve_batch(queries, k=0).ids.shape == (5, 0)
+
+def test_save_and_reload(tmp_path):
+    """Test that a saved retriever reloads from index_path and keeps growing."""
+    path = str(tmp_path / "kb")
+    retriever = IndicRetriever(index_path=path, embedder=HashingEmbedder(dim=64))
+    retriever.index_documents(DOCUMENTS[:3])
+    retriever.save()
+    expected = retriever.retrieve("kurukṣetre", k=3)
+
+    loaded = IndicRetriever(index_path=path)
+    assert loaded.embedder.dim == 64 and len(loaded) == 3
+    assert loaded.retrieve("kurukṣetre", k=3) == expected
+    loaded.index_documents(DOCUMENTS[3:])
+    loaded.save()
+    reloaded = IndicRetriever(index_path=path)
+    assert len(reloaded) == 5 and reloaded.retrieve("iko yaṇ aci", k=1)[0]["id"] == 3
+    assert reloaded.retrieve("iko yaṇ aci", k=1, mode="lexical")[0]["id"] == 3
+    # Passage tokens are stored with the documents
+    ids, body_start = reloaded.documents.tokens(3)
+    tokens, _ = reloaded.tokenizer._phoneme_ids(["[aṣṭādhyāyī 6.1.77] iko yaṇ aci"])
+    assert ids.tolist() == tokens.tolist() and body_start == len(tokens) - len("iko yaṇ aci")
+    with pytest.raises(ValueError):
+        IndicRetriever(index_path=path, embedder=HashingEmbedder(dim=32))
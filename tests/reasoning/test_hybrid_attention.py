@@ -0,0 +1,75 @@
+import pytest
+import torch
+from src.vlm.core.masking import BlockMask, CSRMask, to_attention_bias
+from src.vlm.reasoning.hybrid_attention import HybridAttention
+
+@pytest.fixture
+def attention():
+    torch.manual_seed(0)
+    return HybridAttention(dim=32, heads=4).eval()
+
+def test_no_mask_and_dense_mask(attention):
+    """Test the unmasked path and that a dense mask blocks the masked keys."""
+    x = torch.randn(2, 6, 32)
+    assert attention(x, x, x).shape == (2, 6, 32)
+
+    mask = torch.ones(2, 6, 6, dtype=torch.bool)
+    mask[:, :, 4:] = False
+    changed = x.clone()
+    changed[:, 4:] = torch.randn(2, 2, 32)
+    # The masked keys/values do not affect the output
+    assert torch.allclose(attention(x, changed, changed, mask), attention(x, x, x, mask), atol=1e-6)
+
+def test_block_mask_matches_dense(attention):
+    """Test that block attention equals attention with the materialized mask."""
+    x = torch.randn(3, 10, 32, requires_grad=True)
+    block = BlockMask.from_boundaries(
+        torch.tensor([[0, 0, 1, 0, 0, 1, 0, 0, 0, 1]] * 3, dtype=torch.bool),
+        padding=torch.tensor([[1] * 10, [1] * 7 + [0] * 3, [1] * 9 + [0]]),
+    )
+    dense = block.to_dense()
+    expected = attention(x, x, x, dense)
+    actual = attention(x, x, x, block)
+
+    real = block.query_segments != 0
+    assert torch.allclose(actual[real], expected[real], atol=1e-5)
+    assert torch.equal(actual[~real], attention.out_proj.bias.expand(int((~real).sum()), -1))
+
+    grad, = torch.autograd.grad(actual[real].sum(), x)
+    expected_grad, = torch.autograd.grad(expected[real].sum(), x)
+    assert torch.allclose(grad, expected_grad, atol=1e-5)
+
+def test_block_cross_attention(attention):
+    """Test segments that differ between queries and keys, including a query block without keys."""
+    query, memory = torch.randn(1, 5, 32), torch.randn(1, 4, 32)
+    block = BlockMask(torch.tensor([[1, 1, 2, 3, 3]]), torch.tensor([[1, 2, 2, 0]]))
+    actual = attention(query, memory, memory, block)
+    expected = attention(query, memory, memory, block.to_dense())
+    assert torch.allclose(actual[:, :3], expected[:, :3], atol=1e-5)
+    assert torch.equal(actual[0, 3:], attention.out_proj.bias.expand(2, -1))
+
+def test_block_mask_constructors():
+    """Test pāda-length blocks and the dense fallback of to_attention_bias."""
+    block = BlockMask.from_lengths([[2, 3], [4]], total=6)
+    assert block.query_segments.tolist() == [[1, 1, 2, 2, 2, 0], [1, 1, 1, 1, 0, 0]]
+    assert block.shape == (2, 6, 6)
+    bias = to_attention_bias(block)
+    assert bias.shape == (2, 1, 6, 6)
+    assert bias[0, 0, 0, 1] == 0 and bias[0, 0, 0, 2] < -1e30
+
+def test_csr_mask_matches_dense(attention):
+    """Test that sparse attention over a CSR mask equals dense masked attention."""
+    x = torch.randn(2, 7, 32, requires_grad=True)
+    dense = torch.rand(2, 7, 7, generator=torch.Generator().manual_seed(0)) < 0.4
+    dense[:, :, 0] = True
+    dense[1, 6] = False
+    sparse = CSRMask.from_dense(dense)
+    assert sparse.nnz == int(dense.sum()) and torch.equal(sparse.to_dense(), dense)
+
+    actual, expected = attention(x, x, x, sparse), attention(x, x, x, dense)
+    assert torch.allclose(actual[:, :6], expected[:, :6], atol=1e-5)
+    assert torch.equal(actual[1, 6], attention.out_proj.bias)
+
+    grad, = torch.autograd.grad(actual[:, :6].sum(), x)
+    expected_grad, = torch.autograd.grad(expected[:, :6].sum(), x)
+    assert torch.allclose(grad, expected_grad, atol=1e-5)
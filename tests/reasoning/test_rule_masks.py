@@ -0,0 +1,89 @@
+import pytest
+import torch
+from src.vlm.reasoning.rule_masks import RuleMaskCompiler
+
+@pytest.fixture(scope="module")
+def compiler():
+    return RuleMaskCompiler()
+
+def token_span(compiler, text, word):
+    """Positions (after <s>) of the tokens of a whitespace word in a text."""
+    structure = compiler.structure(text)
+    units = structure.unit_ids.tolist()
+    unit = text.split().index(word) + 1
+    return [i + 1 for i, u in enumerate(units) if u == unit]
+
+def test_mask_aligns_with_encoding(compiler):
+    """Test that the mask covers exactly the encoded tokens."""
+    texts = ["rāmaḥ vanam gacchati", "devālayaḥ tatheti"]
+    mask = compiler.compile(texts)
+    encoded = compiler.tokenizer.batch_encode_fast(texts)
+    dense = mask.to_dense()
+
+    assert mask.shape == (2,) + encoded["input_ids"].shape[1:] * 2
+    real = torch.from_numpy(encoded["attention_mask"]).bool()
+    assert torch.equal(dense.any(-1), real)
+    assert torch.equal(dense.any(-2), real)
+    # <s> and </s> are global
+    assert dense[0, 0, real[0]].all() and dense[0, real[0], 0].all()
+
+def test_grammatical_relations(compiler):
+    """Test word, compound and subject-verb attention."""
+    text = "rāmaḥ vanam gacchati"
+    dense = compiler.compile([text]).to_dense()[0]
+    subject, obj, verb = (token_span(compiler, text, w) for w in text.split())
+
+    assert dense[subject][:, subject].all()
+    assert dense[subject][:, verb].all() and dense[verb][:, subject].all()
+    assert not dense[obj][:, verb].any() and not dense[subject][:, obj].any()
+
+    # devālayaḥ splits into two words that form one compound
+    text = "devālayaḥ tatheti"
+    compound = token_span(compiler, text, "devālayaḥ")
+    assert len(set(compiler.structure(text).segment_ids[:len(compound)].tolist())) == 2
+    assert compiler.compile([text]).to_dense()[0][compound][:, compound].all()
+    words_only = RuleMaskCompiler(compiler.tokenizer, compiler.engine, rules=("word",))
+    assert not words_only.compile([text]).to_dense()[0][compound][:, compound].all()
+
+def test_truncation_and_cache(compiler):
+    """Test truncated batches and that structures are computed once per text."""
+    texts = ["rāmaḥ vanam gacchati"] * 3
+    compiler.structure_cache.reset_stats()
+    mask = compiler.compile(texts, max_length=8, padding="max_length")
+    assert mask.shape == (3, 8, 8)
+    assert compiler.structure_cache.stats().misses <= 1
+
+    encoded = compiler.tokenizer.batch_encode_fast(texts, max_length=8, padding="max_length")
+    assert torch.equal(mask.to_dense().any(-1), torch.from_numpy(encoded["attention_mask"]).bool())
+    assert (mask.indices < 8).all()
+
+def test_block_masks(compiler):
+    """Test word- and compound-level block masks."""
+    texts = ["devālayaḥ tatheti", "rāmaḥ"]
+    words = compiler.block_mask(texts, level="word").query_segments
+    compounds = compiler.block_mask(texts, level="compound").query_segments
+    assert words.shape == compounds.shape == (2, 18)
+    # <s>, devā|layaḥ (two words, one compound), space, tathe|ti, </s>
+    assert len(set(words[0].tolist())) == 7 and len(set(compounds[0].tolist())) == 5
+    assert words[1].tolist()[:8] == [1, 2, 2, 2, 2, 2, 3, 0]
+    with pytest.raises(ValueError):
+        compiler.block_mask(texts, level="sentence")
+
+def test_unknown_rule():
+    """Test that unknown relations are rejected."""
+    with pytest.raises(ValueError):
+        RuleMaskCompiler(rules=("word", "anvaya"))
+
+def test_engine_from_config(compiler, tmp_path):
+    """Test that the compiler's engine loads the configured rule file."""
+    import json
+    from src.utils.config import VLMConfig
+    
+    path = str(tmp_path / "rules.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"word_classes": [{"pattern": "ti$", "pos": "verb"}]}, f)
+    configured = RuleMaskCompiler(compiler.tokenizer, config=VLMConfig(grammar_rules_path=path))
+    
+    assert len(configured.engine.compiled) == 1
+    assert configured.engine.analyze_word("gacchati").is_verb
+    assert len(RuleMaskCompiler(compiler.tokenizer, config=VLMConfig()).engine.compiled) == len(compiler.engine.compiled)
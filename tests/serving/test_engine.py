@@ -0,0 +1,99 @@
+import asyncio
+from collections import deque
+
+import pytest
+import torch
+from src.vlm.core.model import VLMCore, VLMCoreConfig
+from src.vlm.serving.engine import ContinuousBatchingEngine, RequestMetrics, ServingMetrics
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    # A wide initialization keeps greedy outputs from collapsing to one token
+    config = VLMCoreConfig(vocab_size=60, hidden_size=32, num_hidden_layers=2, num_attention_heads=4,
+                           intermediate_size=64, max_position_embeddings=64, initializer_range=0.3)
+    return VLMCore(config).eval()
+
+def reference(model, prompt, max_new_tokens, eos_token_id=-1):
+    sequence = model.generate(torch.tensor([prompt]), max_length=max_new_tokens + 1, eos_token_id=eos_token_id)
+    return [token for token in sequence[0, 1:].tolist() if token != model.config.pad_token_id]
+
+def test_matches_per_request_generate(model):
+    """Test that rows joining and leaving the batch decode like lone requests."""
+    generator = torch.Generator().manual_seed(0)
+    prompts = [torch.randint(3, 60, (n,), generator=generator).tolist() for n in (3, 7, 5, 9, 4, 6)]
+    limits = [4, 6, 8, 10, 3, 5]
+
+    async def serve():
+        async with ContinuousBatchingEngine(model, max_batch_size=3, eos_token_id=-1) as engine:
+            streams = [engine.submit(p, max_new_tokens=n) for p, n in zip(prompts, limits)]
+            return await asyncio.gather(*(stream.result() for stream in streams)), engine.metrics
+
+    results, metrics = asyncio.run(serve())
+    for prompt, limit, tokens in zip(prompts, limits, results):
+        assert tokens == reference(model, prompt, limit)
+
+    summary = metrics.summary()
+    assert summary["requests"] == 6 and summary["tokens"] == sum(limits)
+    assert 1 < summary["mean_batch_size"] <= 3
+    assert summary["throughput_tokens_per_sec"] > 0
+    assert summary["time_to_first_token_p95"] >= summary["queue_time_p50"] >= 0
+
+def test_streaming_and_eos(model):
+    """Test that tokens stream one by one and eos ends a request."""
+    prompt = [5, 9, 14, 20]
+    greedy = reference(model, prompt, 8)
+    eos = greedy[2]
+
+    async def serve():
+        async with ContinuousBatchingEngine(model, max_new_tokens=8, eos_token_id=eos) as engine:
+            stream = engine.submit(prompt)
+            streamed = [token async for token in stream]
+            return streamed, stream
+
+    streamed, stream = asyncio.run(serve())
+    assert streamed == greedy[:greedy.index(eos) + 1]
+    assert stream.finished and stream.metrics.num_tokens == len(streamed)
+    assert 0 <= stream.metrics.queue_time <= stream.metrics.time_to_first_token <= stream.metrics.total_time
+
+def test_cancel_and_stop(model):
+    """Test closing a stream early and stopping with requests in flight."""
+    async def serve():
+        engine = ContinuousBatchingEngine(model, max_new_tokens=40, eos_token_id=-1)
+        with pytest.raises(RuntimeError):
+            engine.submit([5, 6])
+        await engine.start()
+        cancelled = engine.submit([5, 6, 7])
+        async for _ in cancelled:
+            cancelled.close()
+        other = engine.submit([8, 9], do_sample=True, top_k=5)
+        await asyncio.sleep(0)
+        await engine.stop()
+        with pytest.raises(asyncio.CancelledError):
+            await other.result()
+        return cancelled
+
+    cancelled = asyncio.run(serve())
+    assert 1 <= len(cancelled.tokens) < 40
+
+def test_rejects_bad_prompts(model):
+    """Test that empty and over-long prompts are rejected."""
+    async def serve():
+        async with ContinuousBatchingEngine(model) as engine:
+            with pytest.raises(ValueError):
+                engine.submit([])
+            with pytest.raises(ValueError):
+                engine.submit([5] * 65)
+
+    asyncio.run(serve())
+
+def test_metrics_keep_a_bounded_window():
+    """Test that request counts are exact while only recent timings are kept."""
+    metrics = ServingMetrics(requests=deque(maxlen=3))
+    for queue_time in range(10):
+        metrics.record(RequestMetrics(queue_time=float(queue_time)))
+
+    assert len(metrics.requests) == 3
+    summary = metrics.summary()
+    assert summary["requests"] == 10
+    assert summary["queue_time_mean"] == 8.0
@@ -17,7 +17,7 @@ def test_end_to_end_simple_case():
     config = VLMConfig()
     tokenizer = SanskritTokenizer()
     model = VLMCore(config)
-    grammar_engine = AshtadhyayiEngine()
+    grammar_engine = AshtadhyayiEngine.from_config(config)
     retriever = IndicRetriever()
     generator = RAGGenerator(model, retriever)
     
@@ -37,7 +37,7 @@ def test_grammar_validation_integration():
     # Initialize components
     config = VLMConfig()
     model = VLMCore(config)
-    grammar_engine = AshtadhyayiEngine()
+    grammar_engine = AshtadhyayiEngine.from_config(config)
     
     # Test text - will need to be updated when implementation is complete
     text = "रामः वनं गच्छति"  # 'Rama goes to the forest'
@@ -0,0 +1,141 @@
+import multiprocessing
+import pickle
+import threading
+
+import pytest
+from src.utils.cache import LRUCache, cache_stats, clear_caches, configure_caches
+from src.vlm.grammar.ashtadhyayi import AshtadhyayiEngine
+from src.vlm.grammar.sandhi import SandhiProcessor
+
+def test_lru_eviction_and_stats():
+    """Test that the least recently used entry is evicted first."""
+    cache = LRUCache(maxsize=2, name="test.lru")
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.get_or_compute("c", lambda: pytest.fail("recomputed")) == 3
+    assert cache.get_or_compute("d", lambda: 4) == 4
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.entries) == (2, 2, 2, 2)
+    assert stats.hit_rate == 0.5
+
+def test_memory_cap():
+    """Test that entries are evicted to stay under max_bytes."""
+    cache = LRUCache(maxsize=None, max_bytes=2000, name="test.bytes")
+    for i in range(100):
+        cache.put(i, "x" * 100)
+    stats = cache.stats()
+    assert 0 < stats.bytes <= 2000
+    assert stats.entries < 100
+    assert stats.evictions == 100 - stats.entries
+
+    unbounded = LRUCache(maxsize=None, name="test.bytes")
+    for i in range(100):
+        unbounded.put(i, "x" * 100)
+    unbounded.resize(maxsize=10, max_bytes=2000)
+    assert len(unbounded) <= 10
+    assert 0 < unbounded.stats().bytes <= 2000
+
+def test_ttl_expiry():
+    """Test that entries expire ttl seconds after they are stored."""
+    now = [0.0]
+    cache = LRUCache(maxsize=10, name="test.ttl", ttl=5.0, clock=lambda: now[0])
+    cache.put("a", 1)
+    now[0] = 3.0
+    cache.put("b", 2)
+    assert cache.get("a") == 1 and "a" in cache
+
+    now[0] = 6.0
+    assert "a" not in cache and cache.get("a") is None
+    assert cache.get_or_compute("b", lambda: pytest.fail("recomputed")) == 2
+    now[0] = 9.0
+    assert cache.get_or_compute("b", lambda: 3) == 3
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.expirations, stats.entries) == (2, 2, 2, 1)
+    assert pickle.loads(pickle.dumps(cache)).ttl == 5.0
+
+def test_registry():
+    """Test process-wide stats, configuration and clearing by name."""
+    first = LRUCache(name="test.registry")
+    second = LRUCache(name="test.registry")
+    first.put("a", 1)
+    second.put("b", 2)
+    first.get("a")
+
+    stats = cache_stats()["test.registry"]
+    assert (stats.hits, stats.entries) == (1, 2)
+
+    configure_caches("test.registry", maxsize=0)
+    assert len(first) == len(second) == 0
+    first.resize(maxsize=10)
+    first.put("a", 1)
+    clear_caches("test.registry")
+    assert len(first) == 0
+
+def test_threads():
+    """Test concurrent use from several threads."""
+    cache = LRUCache(maxsize=50, name="test.threads")
+
+    def work(offset):
+        for i in range(2000):
+            key = (i + offset) % 80
+            assert cache.get_or_compute(key, lambda: key * 2) == key * 2
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats.hits + stats.misses == 8 * 2000
+    assert len(cache) == 50
+
+def test_pickle_keeps_configuration_only():
+    """Test that pickled caches (e.g. in spawned workers) start empty."""
+    cache = LRUCache(maxsize=7, max_bytes=1000, name="test.pickle")
+    cache.put("a", 1)
+    restored = pickle.loads(pickle.dumps(cache))
+    assert (restored.maxsize, restored.max_bytes, restored.name) == (7, 1000, "test.pickle")
+    assert len(restored) == 0
+    restored.put("b", 2)
+    assert restored.get("b") == 2
+
+def _child_lookup(cache, queue):
+    queue.put((cache.get("warm"), cache.get_or_compute("new", lambda: 5)))
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_fork_while_locked():
+    """Test that a child forked while the lock is held can still use the cache."""
+    cache = LRUCache(name="test.fork")
+    cache.put("warm", 1)
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    with cache._lock:
+        child = context.Process(target=_child_lookup, args=(cache, queue))
+        child.start()
+    assert queue.get(timeout=30) == (1, 5)
+    child.join(timeout=30)
+
+def test_analysis_caches():
+    """Test that cached analyses are returned as independent, current results."""
+    processor = SandhiProcessor()
+    text = "agnim īḷe purohitaṃ"
+    first = processor.reverse(text)
+    first.append("mutated")
+    assert processor.reverse(text) == processor.automaton.split(text)
+    assert processor.split_cache.stats().hits == 1
+
+    engine = AshtadhyayiEngine()
+    sentence = "gacchati rāma vanam"
+    assert engine.correct(sentence) == "rāmaḥ vanam gacchati"
+    assert engine.correct(sentence) == "rāmaḥ vanam gacchati"
+    assert engine.analysis_cache.stats().hits == 1
+    del engine.rules["word_classes"]
+    engine.compile_rules()
+    assert engine.parse_sentence(sentence)[0].pos == "unknown"